@@ -0,0 +1,66 @@
+"""
+Failure isolation for bulk upserts.
+
+When a batch upsert fails, the batch is split in halves recursively until the
+offending rows are isolated: every good half is still written in bulk, and only the
+"poison" rows (with their server error) end up in a rejects file.
+
+One bad row in a batch of N costs about 2*log2(N) extra requests instead of N.
+
+Usage:
+    rejects = RejectLog('doc/Restored_TruthQuizData.csv.rejects.jsonl')
+    written, failed = upsert_bisect(supabase, rows, rejects=rejects)
+"""
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+
+class RejectLog:
+    """Append-only JSONL file of rows the server refused (thread-safe, created lazily)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, row, error):
+        record = {
+            'q_id': row.get('q_id'),
+            'error': str(error),
+            'rejected_at': datetime.now(timezone.utc).isoformat(),
+            'row': row,
+        }
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.count += 1
+
+
+def rejects_path_for(source_path):
+    """Default rejects file next to the source CSV."""
+    return f"{os.path.splitext(source_path)[0]}.rejects.jsonl"
+
+
+def upsert_bisect(supabase, rows, table='questions', on_conflict='q_id', rejects=None):
+    """
+    Upsert `rows`; on failure, bisect until single bad rows are isolated.
+    Returns (written, failed) row counts. Failed rows go to `rejects` if given.
+    """
+    if not rows:
+        return 0, 0
+    try:
+        response = supabase.table(table).upsert(rows, on_conflict=on_conflict).execute()
+        return (len(response.data) if response.data else 0), 0
+    except Exception as e:
+        if len(rows) == 1:
+            print(f"    x Rejected {rows[0].get(on_conflict)}: {e}")
+            if rejects is not None:
+                rejects.add(rows[0], e)
+            return 0, 1
+
+    mid = len(rows) // 2
+    written_a, failed_a = upsert_bisect(supabase, rows[:mid], table, on_conflict, rejects)
+    written_b, failed_b = upsert_bisect(supabase, rows[mid:], table, on_conflict, rejects)
+    return written_a + written_b, failed_a + failed_b
@@ -0,0 +1,10 @@
+"""
+CPU micro-benchmarks for the data-prep hot paths (CSV parsing, payload building,
+CodeName expansion and matching, length analysis) over synthetic banks.
+
+    python doc/bench                         # 10k rows, all cases, appended to the history
+    python doc/bench --size 100k --check     # exit 1 if a case regressed vs. earlier runs
+    python doc/bench --size 1m --cases csv_parse,payload --repeat 1
+
+Results go to doc/build/bench_history.json (one entry per run, not committed).
+"""
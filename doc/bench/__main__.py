@@ -0,0 +1,139 @@
+"""
+Benchmark runner: python doc/bench [--size 10k|100k|1m] [--cases a,b] [--check]
+
+A run times every case on a synthetic bank (half Truth, half Balance rows), appends
+the result to the history file and compares each case with the median of the last
+--window runs of the same size on the same Python. A case regresses when it is more
+than --threshold times slower and at least MIN_DELTA seconds slower (timer noise).
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+# `python doc/bench` puts doc/bench on sys.path; the scripts it measures live in doc/
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DOC_DIR not in sys.path:
+    sys.path.insert(0, DOC_DIR)
+
+from bench.synthetic import SIZES, ensure_bank  # noqa: E402
+from bench.cases import CASES, Bank, run_case  # noqa: E402
+
+HISTORY_PATH = os.path.join(DOC_DIR, 'build', 'bench_history.json')
+THRESHOLD = 1.25
+WINDOW = 5
+MIN_DELTA = 0.005
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(history, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=DOC_DIR, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def baseline(history, rows, python, name, window=WINDOW):
+    """Median best-time of `name` over the last `window` comparable runs, or None."""
+    times = [entry['results'][name]['seconds'] for entry in history
+             if entry['rows'] == rows and entry['python'] == python and name in entry['results']][-window:]
+    if not times:
+        return None
+    times.sort()
+    return times[len(times) // 2]
+
+
+def find_regressions(history, entry, threshold=THRESHOLD, window=WINDOW):
+    """[(case, seconds, baseline, ratio)] for cases slower than threshold x baseline."""
+    found = []
+    for name, result in entry['results'].items():
+        base = baseline(history, entry['rows'], entry['python'], name, window)
+        if not base:
+            continue
+        ratio = result['seconds'] / base
+        if ratio > threshold and result['seconds'] - base >= MIN_DELTA:
+            found.append((name, result['seconds'], base, ratio))
+    return found
+
+
+def parse_size(value):
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data-prep hot paths on synthetic banks.")
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help="Total rows: 10k, 100k, 1m or a number (default 10k)")
+    parser.add_argument('--cases', help="Comma-separated cases (default all: " + ", ".join(CASES) + ")")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the best one counts (default 3)")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic bank seed (default 0)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help=f"Regression ratio (default {THRESHOLD})")
+    parser.add_argument('--window', type=int, default=WINDOW, help=f"Earlier runs to compare with (default {WINDOW})")
+    parser.add_argument('--check', action='store_true', help="Exit 1 if any case regressed")
+    parser.add_argument('--no-save', action='store_true', help="Do not append this run to the history")
+    args = parser.parse_args()
+
+    names = args.cases.split(',') if args.cases else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    per_type = args.size // 2
+    print(f"📦 Synthetic bank: {per_type} Truth + {args.size - per_type} Balance rows (seed {args.seed})")
+    bank = Bank({'T': ensure_bank('T', per_type, args.seed), 'B': ensure_bank('B', args.size - per_type, args.seed)})
+
+    history = load_history()
+    entry = {
+        'when': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'rows': args.size,
+        'seed': args.seed,
+        'results': {},
+    }
+    for name in names:
+        result = run_case(name, bank, args.repeat)
+        entry['results'][name] = result
+        base = baseline(history, entry['rows'], entry['python'], name, args.window)
+        rate = result['items'] / result['seconds'] if result['seconds'] else float('inf')
+        versus = f"  ({result['seconds'] / base:.2f}x baseline)" if base else ""
+        print(f"  {name:<16} {result['seconds'] * 1000:10.1f} ms  {rate:14,.0f} items/s{versus}")
+
+    regressions = find_regressions(history, entry, args.threshold, args.window)
+    if not args.no_save:
+        history.append(entry)
+        save_history(history)
+        print(f"📝 Recorded in {HISTORY_PATH}")
+
+    for name, seconds, base, ratio in regressions:
+        print(f"  ❌ {name}: {seconds * 1000:.1f} ms vs {base * 1000:.1f} ms baseline ({ratio:.2f}x)")
+    if regressions:
+        print(f"{len(regressions)} cases slower than {args.threshold}x the baseline.")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("✅ No regressions.")
+
+if __name__ == "__main__":
+    main()
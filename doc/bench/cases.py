@@ -0,0 +1,162 @@
+"""
+Benchmark cases for the data-prep hot paths.
+
+A case is fn(bank, timer) -> number of items processed. Only the code inside
+`with timer:` is measured, so cases can read their input in untimed chunks and
+memory stays bounded at 1M rows. Memoized helpers (codename.parse, code_tuple, ...)
+are cleared before every run, so each run sees a cold process like a real import.
+"""
+import time
+from collections import OrderedDict
+
+import codename
+import question_loader
+from question_loader import QuestionCsv, QuestionRecord
+from codename import CodeIndex, candidate_codes, expand_levels
+from code_coverage import RELATIONSHIPS
+from analyze_question_length import find_long_questions
+
+CHUNK = 20000
+CASES = OrderedDict()
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def clear_caches():
+    for fn in (codename.parse, codename._level_variants, codename.candidate_codes, question_loader.code_tuple):
+        fn.cache_clear()
+
+
+class Timer:
+    """Accumulates the wall time spent inside `with timer:` blocks."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed += time.perf_counter() - self._start
+        return False
+
+
+class Bank:
+    """Synthetic Truth + Balance CSVs ({'T': path, 'B': path}) read in chunks."""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.index = None          # CodeIndex left by codename_index for codename_match
+
+    def chunks(self, chunk=CHUNK):
+        """Yield (q_type, [row dict, ...]) in chunks of up to `chunk` rows."""
+        for q_type, path in self.paths.items():
+            with QuestionCsv(path) as source:
+                rows = []
+                for row in source:
+                    rows.append(row)
+                    if len(rows) >= chunk:
+                        yield q_type, rows
+                        rows = []
+                if rows:
+                    yield q_type, rows
+
+    def payload_chunks(self, chunk=CHUNK):
+        for q_type, rows in self.chunks(chunk):
+            yield q_type, [QuestionRecord.from_row(row, q_type).payload() for row in rows]
+
+
+@case('csv_parse')
+def csv_parse(bank, timer):
+    n = 0
+    with timer:
+        for path in bank.paths.values():
+            with QuestionCsv(path) as source:
+                for _ in source:
+                    n += 1
+    return n
+
+
+@case('payload')
+def payload(bank, timer):
+    # question_loader's CSV row -> upsert payload (the old _prepare_row_data)
+    n = 0
+    for q_type, rows in bank.chunks():
+        with timer:
+            for row in rows:
+                QuestionRecord.from_row(row, q_type).payload()
+        n += len(rows)
+    return n
+
+
+@case('expand_levels')
+def expand(bank, timer):
+    n = 0
+    for _, rows in bank.chunks():
+        cells = [row.get('CodeName', '') for row in rows]
+        with timer:
+            for cell in cells:
+                expand_levels(cell)
+        n += len(cells)
+    return n
+
+
+@case('codename_index')
+def codename_index(bank, timer):
+    index = CodeIndex()
+    for _, payloads in bank.payload_chunks():
+        with timer:
+            for p in payloads:
+                index.add(p['q_id'], p['code_names'])
+    bank.index = index
+    return len(index)
+
+
+@case('codename_match')
+def codename_match(bank, timer):
+    # Every board query the app can send (code_coverage's relationship x gender x level grid)
+    index = bank.index
+    if index is None:
+        index = CodeIndex()
+        for _, payloads in bank.payload_chunks():
+            for p in payloads:
+                index.add(p['q_id'], p['code_names'])
+    queries = [(h, g, rel, sub, level)
+               for (rel, sub), (levels, pairs) in RELATIONSHIPS.items()
+               for h, g in pairs for level in levels]
+    with timer:
+        for h, g, rel, sub, level in queries:
+            codes = candidate_codes(h, g, rel, sub, level, include_any=True)
+            for prefix in ('B', 'T'):
+                index.match(codes, prefix)
+    return len(queries) * 2
+
+
+@case('length_analyzer')
+def length_analyzer(bank, timer):
+    n = 0
+    for _, payloads in bank.payload_chunks():
+        with timer:
+            find_long_questions(payloads)
+        n += len(payloads)
+    return n
+
+
+def run_case(name, bank, repeat=3):
+    """{'seconds': best, 'median': median, 'items': n} over `repeat` cold runs."""
+    times = []
+    items = 0
+    for _ in range(repeat):
+        clear_caches()
+        timer = Timer()
+        items = CASES[name](bank, timer)
+        times.append(timer.elapsed)
+    times.sort()
+    return {'seconds': round(times[0], 6), 'median': round(times[len(times) // 2], 6), 'items': items}
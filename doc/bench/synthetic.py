@@ -0,0 +1,114 @@
+"""
+Synthetic question banks in the real CSV schemas (TruthQuizData_v2.csv /
+BalanceQuizData_v2.csv) for the benchmarks.
+
+Rows are deterministic for a (type, rows, seed) triple. Text is built from a fixed
+vocabulary of Hangul "words" so lengths and the share of over-long questions look
+like the real banks (content ~20-30 chars, a tail past the 45-char limit). About
+half of the rows carry the '*-*-*-*-*' catch-all code, like the Balance bank; the
+rest get one relationship code from code_coverage.RELATIONSHIPS, a fifth of them
+already expanded to all five levels.
+
+Generated files are cached under doc/build/bench/ and reused.
+"""
+import os
+import csv
+import random
+
+from codename import ANY_CODE, expand_levels
+from code_coverage import RELATIONSHIPS
+
+DOC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(DOC_DIR, 'build', 'bench')
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Column order of doc/TruthQuizData_v2.csv and doc/BalanceQuizData_v2.csv
+VARIANT_COLUMNS = ['var_m_f', 'var_f_m', 'var_m_m', 'var_f_f']
+HEADERS = {
+    'T': (['CodeName', 'Order', 'q_id', 'content', 'answers'] + VARIANT_COLUMNS
+          + ['content_en', 'answers_en'] + [c + '_en' for c in VARIANT_COLUMNS]),
+    'B': (['CodeName', 'Order', 'q_id', 'content', 'choice_a', 'choice_b'] + VARIANT_COLUMNS
+          + ['content_en', 'choice_a_en', 'choice_b_en'] + [c + '_en' for c in VARIANT_COLUMNS]),
+}
+PREFIXES = {'T': 'TFaL1', 'B': 'BDcL3'}
+VARIANT_PREFIXES = ('누나/동생은', '오빠/동생은', '형/동생은', '언니/동생은')
+
+
+class TextSource:
+    """Random Korean/English sentences over a small seeded vocabulary."""
+
+    def __init__(self, rng, vocab=400):
+        self.rng = rng
+        self.ko = [''.join(chr(0xAC00 + rng.randrange(11172)) for _ in range(rng.randint(1, 4)))
+                   for _ in range(vocab)]
+        self.en = [''.join(chr(97 + rng.randrange(26)) for _ in range(rng.randint(2, 9)))
+                   for _ in range(vocab)]
+
+    def korean(self, lo, hi):
+        return ' '.join(self.rng.choices(self.ko, k=self.rng.randint(lo, hi)))
+
+    def english(self, lo, hi):
+        return ' '.join(self.rng.choices(self.en, k=self.rng.randint(lo, hi)))
+
+
+def _codes(rng):
+    relationships = list(RELATIONSHIPS.items())
+    while True:
+        if rng.random() < 0.5:
+            yield ANY_CODE
+            continue
+        (rel, sub), (levels, pairs) = rng.choice(relationships)
+        mp, cp = rng.choice(pairs) if rng.random() < 0.5 else ('*', '*')
+        code = f"{mp}-{cp}-{rel}-{sub}-L{rng.choice(levels)}"
+        yield ",".join(expand_levels(code)) if rng.random() < 0.2 else code
+
+
+def generate_rows(q_type, rows, seed=0):
+    """Yield `rows` CSV row dicts of type 'T' or 'B' in the v2 schema."""
+    rng = random.Random(f"{q_type}:{seed}")
+    text = TextSource(rng)
+    codes = _codes(rng)
+    for n in range(1, rows + 1):
+        # Sequences roll over into the next year, so every q_id stays valid and unique
+        year, seq = 26 + (n - 1) // 99999, (n - 1) % 99999 + 1
+        content = text.korean(3, 12) + '?'
+        row = {
+            'CodeName': next(codes),
+            'Order': f"{PREFIXES[q_type]}-{n:05d}",
+            'q_id': f"{q_type}{year}-{seq:05d}",
+            'content': content,
+            'content_en': text.english(4, 16) + '?',
+        }
+        if q_type == 'T':
+            row['answers'] = ','.join(text.korean(1, 1) for _ in range(3))
+            row['answers_en'] = ','.join(text.english(1, 1) for _ in range(3))
+        else:
+            row['choice_a'] = text.korean(1, 4)
+            row['choice_b'] = text.korean(1, 4)
+            row['choice_a_en'] = text.english(1, 4)
+            row['choice_b_en'] = text.english(1, 4)
+        # Roughly a third of the bank has gender variants, like the v2 files
+        if rng.random() < 0.35:
+            for column, prefix in zip(VARIANT_COLUMNS, VARIANT_PREFIXES):
+                row[column] = f"{prefix} {content}"
+                row[column + '_en'] = row['content_en']
+        yield row
+
+
+def bank_path(q_type, rows, seed=0, directory=CACHE_DIR):
+    return os.path.join(directory, f"{q_type}_{rows}_{seed}.csv")
+
+
+def ensure_bank(q_type, rows, seed=0, directory=CACHE_DIR):
+    """Path of the cached synthetic CSV, generating it first if needed."""
+    path = bank_path(q_type, rows, seed, directory)
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS[q_type])
+        writer.writeheader()
+        writer.writerows(generate_rows(q_type, rows, seed))
+    os.replace(tmp, path)
+    return path
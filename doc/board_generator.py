@@ -0,0 +1,215 @@
+"""
+Board generator: weighted random sampling without replacement over the matched pool.
+
+Reference implementation of the board RPCs: get_board_questions
+(supabase/migrations/20261018_board_questions_rpc.sql) draws one type, and get_board
+(20261019_board_rpc.sql) draws both and deals them like split_board(). For a game
+cell (host/guest gender, Rel, Sub, Level):
+
+- the pool is every published question whose code_names overlap the app's candidate
+  codes (codename.candidate_codes, including the '*-*-*-*-*' safety net);
+- each question is weighted by how specific its best matching code is
+  (WEIGHT_BASE ** number of non-wildcard MP/CP/Sub parts), so exact matches come up
+  more often but wildcard questions still appear;
+- Efraimidis-Spirakis sampling: key = ln(u) / w, take the k largest keys;
+- questions the pair has already seen (logs, action 'select_question') only fill the
+  board when the unseen pool runs out, as the app's 30-day history filter does;
+- main board and reserve are split ~52% Truth / 48% Balance like GameSession.fillList,
+  falling back to the other type when one runs short (split_board).
+
+Rows carry only BOARD_COLUMNS (what GameSession._parseSingleQuestion reads).
+
+    python doc/board_generator.py --mirror --cell M F B Ar 3
+    python doc/board_generator.py --mirror --bench 5000
+    python doc/board_generator.py --csv doc/BalanceQuizData_20280128.csv doc/TruthQuizData_20260128.csv --bench 5000
+"""
+import math
+import time
+import heapq
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from codename import CodeIndex, candidate_codes, parse, WILDCARD
+
+BOARD_COLUMNS = 'id,q_id,type,content,content_en,details,details_en,gender_variants,gender_variants_en'
+SOURCE_COLUMNS = BOARD_COLUMNS + ',code_names,is_published'
+BOARD_SIZE = 25
+RESERVE_SIZE = 25
+TRUTH_RATIO = 0.52
+WEIGHT_BASE = 2.0
+SEEN_DAYS = 30
+SEEN_ACTION = 'select_question'
+
+
+def code_weight(code):
+    """WEIGHT_BASE ** (non-wildcard MP / CP / Sub parts); '*-*-*-*-*' weighs 1."""
+    parsed = parse(code)
+    if parsed is None:
+        return 1.0
+    specific = sum(1 for part in (parsed.mp, parsed.cp, parsed.sub) if part != WILDCARD)
+    return WEIGHT_BASE ** specific
+
+
+def split_board(truth, balance, size=BOARD_SIZE, reserve=RESERVE_SIZE, truth_ratio=TRUTH_RATIO):
+    """
+    Deal draw-ordered Truth and Balance items into {'main': [...], 'reserve': [...]}:
+    per part, ceil(count * truth_ratio) Truth slots then Balance slots, each taking
+    the other type once its own runs out.
+    """
+    truth = list(reversed(truth))
+    balance = list(reversed(balance))
+
+    def fill(count):
+        t_count = math.ceil(count * truth_ratio)
+        picked = []
+        for want, first, second in ((t_count, truth, balance), (count - t_count, balance, truth)):
+            for _ in range(want):
+                source = first or second
+                if source:
+                    picked.append(source.pop())
+        return picked
+
+    return {'main': fill(size), 'reserve': fill(reserve)}
+
+
+class BoardGenerator:
+    """Holds the slim question rows, a CodeIndex and per-cell pools (built on first use)."""
+
+    def __init__(self, rows, rng=None):
+        self.rng = rng or random.Random()
+        self.rows = {}
+        self.codes = {}
+        index_rows = []
+        for row in rows:
+            q_id = row.get('q_id')
+            if not q_id or row.get('is_published') is False:
+                continue
+            self.codes[q_id] = tuple(row.get('code_names') or ())
+            self.rows[q_id] = {k: row.get(k) for k in BOARD_COLUMNS.split(',')}
+            index_rows.append((q_id, self.codes[q_id]))
+        self.index = CodeIndex(index_rows)
+        self._pools = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def pool(self, codes, type_prefix):
+        """(q_ids, inverse weights) matching `codes`, cached per (codes, prefix)."""
+        key = (codes, type_prefix)
+        cached = self._pools.get(key)
+        if cached is None:
+            wanted = set(codes)
+            ids = self.index.match(codes, type_prefix)
+            inverse = [1.0 / max(code_weight(c) for c in self.codes[q_id] if c in wanted) for q_id in ids]
+            cached = self._pools[key] = (ids, inverse)
+        return cached
+
+    def sample(self, codes, type_prefix, k, seen=frozenset()):
+        """Up to k q_ids drawn without replacement, unseen first, in draw order."""
+        ids, inverse = self.pool(codes, type_prefix)
+        rnd = self.rng.random
+        # ln(u) / w with u in (0, 1]; larger is better
+        keys = [math.log(1.0 - rnd()) * inv for inv in inverse]
+        if seen:
+            fresh = [i for i, q_id in enumerate(ids) if q_id not in seen]
+            stale = [i for i, q_id in enumerate(ids) if q_id in seen]
+        else:
+            fresh, stale = range(len(ids)), ()
+        picked = heapq.nlargest(k, fresh, key=keys.__getitem__)
+        if len(picked) < k and stale:
+            picked += heapq.nlargest(k - len(picked), stale, key=keys.__getitem__)
+        return [ids[i] for i in picked]
+
+    def board(self, host_gender, guest_gender, rel, sub, level, seen=frozenset(),
+              size=BOARD_SIZE, reserve=RESERVE_SIZE, truth_ratio=TRUTH_RATIO):
+        """{'main': [row, ...], 'reserve': [row, ...]} with no question repeated."""
+        codes = candidate_codes(host_gender, guest_gender, rel, sub, level, include_any=True)
+        total = size + reserve
+        truth = self.sample(codes, 'T', total, seen)
+        balance = self.sample(codes, 'B', total, seen)
+        board = split_board(truth, balance, size, reserve, truth_ratio)
+        return {part: [self.rows[q_id] for q_id in ids] for part, ids in board.items()}
+
+
+def fetch_seen(supabase, user_ids, days=SEEN_DAYS):
+    """q_ids either player selected in the last `days` days (logs.detail->>'q_id')."""
+    from supabase_client import scan_table
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+    def where(query):
+        return query.eq('action', SEEN_ACTION).in_('user_id', list(user_ids)).gte('created_at', since)
+
+    seen = set()
+    for row in scan_table(supabase, 'id,detail', table='logs', key='id', where=where):
+        q_id = (row.get('detail') or {}).get('q_id')
+        if q_id:
+            seen.add(q_id)
+    return frozenset(seen)
+
+
+def load_rows(args):
+    if args.csv:
+        from question_loader import iter_payloads
+        rows = []
+        for path in args.csv:
+            rows.extend(iter_payloads(path, 'Truth' if 'Truth' in path else 'Balance'))
+        return rows
+    from mirror import client_for
+    from supabase_client import scan_table
+    return list(scan_table(client_for(['--mirror'] if args.mirror else []), SOURCE_COLUMNS))
+
+
+def benchmark(generator, boards=5000, seed=11):
+    """Boards/s over random cells from code_coverage.RELATIONSHIPS (pool caches warm)."""
+    from code_coverage import RELATIONSHIPS
+    rng = random.Random(seed)
+    cells = []
+    for (rel, sub), (levels, pairs) in RELATIONSHIPS.items():
+        for level in levels:
+            for host, guest in pairs:
+                cells.append((host, guest, rel, sub, level))
+    for cell in cells:
+        generator.board(*cell)
+
+    picks = [rng.choice(cells) for _ in range(boards)]
+    started = time.perf_counter()
+    for cell in picks:
+        generator.board(*cell)
+    elapsed = time.perf_counter() - started
+    return boards / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate weighted random, repeat-aware boards.")
+    parser.add_argument('--mirror', action='store_true', help="Read the local SQLite mirror")
+    parser.add_argument('--csv', nargs='+', metavar='PATH', help="Read CSV banks instead of a database")
+    parser.add_argument('--cell', nargs=5, metavar=('HOST', 'GUEST', 'REL', 'SUB', 'LEVEL'),
+                        help="Print one board, e.g. --cell M F B Ar 3")
+    parser.add_argument('--seen-users', nargs='+', metavar='UUID', help="Skip questions these players saw (from logs)")
+    parser.add_argument('--bench', type=int, metavar='N', help="Generate N boards and report boards/s")
+    parser.add_argument('--seed', type=int, help="Fixed RNG seed")
+    args = parser.parse_args()
+
+    generator = BoardGenerator(load_rows(args), random.Random(args.seed))
+    print(f"Loaded {len(generator)} published questions.")
+
+    if args.cell:
+        seen = frozenset()
+        if args.seen_users:
+            from supabase_client import get_client
+            seen = fetch_seen(get_client(), args.seen_users)
+            print(f"Excluding {len(seen)} recently seen questions.")
+        host, guest, rel, sub, level = args.cell
+        board = generator.board(host, guest, rel, sub, int(level.lstrip('L')), seen=seen)
+        for part in ('main', 'reserve'):
+            print(f"\n--- {part} ({len(board[part])}) ---")
+            for row in board[part]:
+                print(f"{row['q_id']}: {(row.get('content') or '')[:40]}")
+
+    if args.bench:
+        rate = benchmark(generator, args.bench)
+        print(f"⏱  {rate:.0f} boards/s ({BOARD_SIZE} + {RESERVE_SIZE} questions each)")
+
+if __name__ == "__main__":
+    main()
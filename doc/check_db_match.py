@@ -1,30 +1,20 @@
-import os
-from dotenv import load_dotenv
-from supabase import create_client, Client
+from mirror import client_for
+from codename import candidate_codes
 
-load_dotenv(dotenv_path='app/.env')
-
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_ANON_KEY")
-
-if not url or not key:
-    print("Error: Supabase URL or Key not found in app/.env")
+try:
+    # --mirror: read the local SQLite mirror instead of Supabase
+    supabase = client_for()
+except RuntimeError as e:
+    print(f"Error: {e}")
     exit(1)
 
-supabase: Client = create_client(url, key)
-
-# Test Candidate Codes - Standard Pattern
-candidates = [
-    "F-F-B-Ar-L2",
-    "F-F-B-*-L2",
-    "F-F-B-Ar-*",
-    "F-F-B-*-*"
-]
+# Test Candidate Codes - same lattice the app sends for F/F, 고향친구 (B-Ar), L2
+candidates = list(candidate_codes('F', 'F', 'B', 'Ar', 2))
 
 print(f"Testing overlaps with candidates: {candidates}")
 
 try:
-    response = supabase.table('questions').select("*").overlaps('code_names', candidates).execute()
+    response = supabase.table('questions').select("q_id, content, code_names").overlaps('code_names', candidates).execute()
     
     print(f"Found {len(response.data)} matches.")
     
@@ -0,0 +1,166 @@
+"""
+Batch checkpoint journal for resumable imports.
+
+Every batch the server confirmed is appended to a JSONL journal as
+(input file SHA-256, [start, end) payload range). A rerun with the same journal
+skips every batch whose rows are already covered and uploads only the rest, so a
+network drop or a laptop sleep costs the remaining work, not the whole import.
+Keys are file contents, not names: an edited CSV gets a new hash and is imported
+again in full. Batch sizes may differ between runs (coverage is checked per row
+range, not per batch).
+
+Named steps (the migration's delete of all B/T rows) are journaled the same way and
+never repeated while the journal exists. A run that finished cleanly removes its
+journal; an interrupted one leaves it in doc/build/checkpoints/<name>.jsonl until a
+rerun completes (or --restart discards it).
+
+    checkpoint = Checkpoint('fix_and_import')
+    import_files(FILES, supabase, checkpoint=checkpoint)     # parallel_import.py
+    checkpoint.finish()
+
+A batch counts as confirmed only when every row was written; batches with rejected
+rows (or a dropped connection mid-bisect) are sent again on the next run, which is
+safe because uploads are upserts on q_id.
+"""
+import os
+import json
+import bisect
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build', 'checkpoints')
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _add_range(ranges, start, end):
+    """Insert [start, end) into a sorted list of disjoint ranges, merging neighbours.
+
+    >>> r = []
+    >>> for s, e in [(0, 50), (100, 150), (50, 100), (200, 210)]:
+    ...     _add_range(r, s, e)
+    >>> r
+    [(0, 150), (200, 210)]
+    """
+    i = bisect.bisect_left(ranges, (start, end))
+    if i > 0 and ranges[i - 1][1] >= start:
+        i -= 1
+        start = ranges[i][0]
+    j = i
+    while j < len(ranges) and ranges[j][0] <= end:
+        end = max(end, ranges[j][1])
+        j += 1
+    ranges[i:j] = [(start, end)]
+
+
+def _covers(ranges, start, end):
+    """True if [start, end) lies inside one range.
+
+    >>> _covers([(0, 150), (200, 210)], 100, 150), _covers([(0, 150)], 140, 160)
+    (True, False)
+    """
+    i = bisect.bisect_right(ranges, (start, float('inf'))) - 1
+    return i >= 0 and ranges[i][0] <= start and end <= ranges[i][1]
+
+
+class Checkpoint:
+    """Append-only journal of confirmed batches and finished steps (thread-safe)."""
+
+    def __init__(self, name, directory=CHECKPOINT_DIR):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self._ranges = {}
+        self._aliases = {}
+        self._steps = set()
+        self._lock = threading.Lock()
+        self.resumed = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Last line cut short by the crash we are recovering from
+                    continue
+                self._apply(record)
+        return bool(self._ranges or self._steps)
+
+    def _apply(self, record):
+        event = record.get('event')
+        if event == 'batch':
+            _add_range(self._ranges.setdefault(record['sha256'], []), record['start'], record['end'])
+        elif event == 'alias':
+            self._aliases[record['sha256']] = record['same_as']
+        elif event == 'step':
+            self._steps.add(record['step'])
+
+    def _append(self, record):
+        record['at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(record)
+
+    def resolve(self, key):
+        seen = set()
+        while key in self._aliases and key not in seen:
+            seen.add(key)
+            key = self._aliases[key]
+        return key
+
+    def covered(self, key, start, end):
+        """True if payload rows [start, end) of the file with hash `key` were confirmed."""
+        with self._lock:
+            return _covers(self._ranges.get(self.resolve(key), []), start, end)
+
+    def confirmed_rows(self, key):
+        with self._lock:
+            return sum(end - start for start, end in self._ranges.get(self.resolve(key), []))
+
+    def record(self, key, start, end, source=None):
+        """Journal rows [start, end) of file `key` as written."""
+        self._append({'event': 'batch', 'sha256': self.resolve(key), 'start': start, 'end': end, 'file': source})
+
+    def alias(self, key, same_as, source=None):
+        """File `key` yields the same payloads as `same_as` (a reader rewrote its input)."""
+        if key != same_as and self.resolve(key) != self.resolve(same_as):
+            self._append({'event': 'alias', 'sha256': key, 'same_as': self.resolve(same_as), 'file': source})
+
+    def step_done(self, step):
+        with self._lock:
+            return step in self._steps
+
+    def mark_step(self, step):
+        self._append({'event': 'step', 'step': step})
+
+    def describe(self):
+        batches = sum(len(ranges) for ranges in self._ranges.values())
+        rows = sum(end - start for ranges in self._ranges.values() for start, end in ranges)
+        steps = f", steps done: {', '.join(sorted(self._steps))}" if self._steps else ''
+        return f"{rows} rows in {batches} ranges confirmed{steps}"
+
+    def finish(self):
+        """The run completed: drop the journal so the next run starts fresh."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._ranges.clear()
+            self._aliases.clear()
+            self._steps.clear()
+        self.resumed = False
+
+    discard = finish
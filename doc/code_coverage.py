@@ -0,0 +1,161 @@
+"""
+Question pool coverage per relationship / intimacy cell.
+
+For every (Rel, SubRel, Level) cell from RelationshipDefinition.md and each type
+prefix (B / T), counts how many published questions get_random_questions would
+match for the app's candidate codes (worst case over the gender pairs the cell
+allows), using one CodeIndex built over the whole bank.
+
+    python doc/code_coverage.py                 # Supabase
+    python doc/code_coverage.py --mirror        # local mirror (doc/mirror.py)
+    python doc/code_coverage.py --csv doc/BalanceQuizData_20280128.csv doc/TruthQuizData_20260128.csv
+    python doc/code_coverage.py --all-levels --json coverage.json --fail-on-thin
+
+(Named code_coverage so it does not shadow the PyPI `coverage` package on sys.path.)
+
+Cells below BOARD_SIZE (25) are flagged '!!', below RPC_LIMIT (40) '!'.
+"""
+import sys
+import json
+import argparse
+
+from codename import CodeIndex, candidate_codes
+from question_loader import iter_payloads
+
+BOARD_SIZE = 25
+RPC_LIMIT = 40
+TYPE_PREFIXES = ('B', 'T')
+GENDERS = ('M', 'F')
+ALL_PAIRS = tuple((h, g) for h in GENDERS for g in GENDERS)
+
+# (Rel, Sub) -> (recommended levels, allowed host/guest gender pairs)
+# Source: doc/RelationshipDefinition.md §2 and the parent-child mapping in GameSession.
+RELATIONSHIPS = {
+    ('B', 'Ar'): (range(2, 6), ALL_PAIRS),
+    ('B', 'Sc'): (range(1, 5), ALL_PAIRS),
+    ('B', 'Or'): (range(1, 5), ALL_PAIRS),
+    ('B', 'Dc'): (range(1, 5), ALL_PAIRS),
+    ('Fa', 'Br'): (range(2, 6), (('M', 'M'),)),
+    ('Fa', 'Si'): (range(2, 6), (('F', 'F'),)),
+    ('Fa', 'Sb'): (range(2, 6), (('M', 'F'), ('F', 'M'))),
+    ('Fa', 'Co'): (range(1, 5), ALL_PAIRS),
+    ('Fa', 'Gp'): (range(2, 6), ALL_PAIRS),
+    ('Fa', 'Fs'): (range(2, 6), (('M', 'M'),)),
+    ('Fa', 'Md'): (range(2, 6), (('F', 'F'),)),
+    ('Fa', 'Ms'): (range(2, 6), (('F', 'M'),)),
+    ('Fa', 'Fd'): (range(2, 6), (('M', 'F'),)),
+    ('Lo', 'Sw'): (range(3, 6), ALL_PAIRS),
+    ('Lo', 'Hw'): (range(4, 6), ALL_PAIRS),
+}
+
+
+def load_index_from_client(supabase):
+    from supabase_client import scan_table
+    rows = scan_table(supabase, 'q_id,code_names,is_published')
+    return CodeIndex.from_rows(rows)
+
+
+def load_index_from_csvs(paths):
+    """CSV banks count as published; the type follows from the file name (as in board_generator --csv)."""
+    index = CodeIndex()
+    for path in paths:
+        for payload in iter_payloads(path, 'Truth' if 'Truth' in path else 'Balance'):
+            if payload.get('q_id'):
+                index.add(payload['q_id'], payload['code_names'])
+    return index
+
+
+def compute_coverage(index, all_levels=False):
+    """
+    [{'rel', 'sub', 'level', 'recommended', 'B': n, 'T': n, 'worst_pair': {...}}, ...]
+    Counts are pool sizes before the RPC's LIMIT.
+    """
+    cells = []
+    for (rel, sub), (levels, pairs) in RELATIONSHIPS.items():
+        for level in range(1, 6):
+            recommended = level in levels
+            if not recommended and not all_levels:
+                continue
+            cell = {'rel': rel, 'sub': sub, 'level': f"L{level}", 'recommended': recommended, 'worst_pair': {}}
+            for prefix in TYPE_PREFIXES:
+                worst = None
+                for host, guest in pairs:
+                    # The RPC is called with the specific codes only (no '*-*-*-*-*')
+                    n = index.count(candidate_codes(host, guest, rel, sub, level), prefix)
+                    if worst is None or n < worst[0]:
+                        worst = (n, f"{host}-{guest}")
+                cell[prefix] = worst[0]
+                cell['worst_pair'][prefix] = worst[1]
+            cells.append(cell)
+    return cells
+
+
+def flag(n):
+    if n < BOARD_SIZE:
+        return '!!'
+    if n < RPC_LIMIT:
+        return '!'
+    return ''
+
+
+def print_matrix(cells):
+    levels = sorted({c['level'] for c in cells})
+    by_key = {(c['rel'], c['sub'], c['level']): c for c in cells}
+    header = f"{'Rel-Sub':<8}" + ''.join(f"{lvl:>14}" for lvl in levels)
+    print(f"Pool size per cell as B/T (worst gender pair; '!!' < {BOARD_SIZE}, '!' < {RPC_LIMIT})")
+    print(header)
+    print('-' * len(header))
+    for rel, sub in RELATIONSHIPS:
+        line = f"{rel + '-' + sub:<8}"
+        for lvl in levels:
+            c = by_key.get((rel, sub, lvl))
+            if c is None:
+                line += f"{'':>14}"
+                continue
+            text = f"{c['B']}{flag(c['B'])}/{c['T']}{flag(c['T'])}"
+            if not c['recommended']:
+                text = f"({text})"
+            line += f"{text:>14}"
+        print(line)
+
+
+def thin_cells(cells, threshold):
+    return [c for c in cells if c['recommended'] and min(c[p] for p in TYPE_PREFIXES) < threshold]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question pool coverage per relationship/intimacy cell.")
+    parser.add_argument('--mirror', action='store_true', help="Read the local SQLite mirror")
+    parser.add_argument('--csv', nargs='+', metavar='PATH', help="Read CSV banks instead of a database")
+    parser.add_argument('--all-levels', action='store_true', help="Include levels outside the recommended range")
+    parser.add_argument('--json', metavar='PATH', help="Also write the cells as JSON")
+    parser.add_argument('--fail-on-thin', action='store_true',
+                        help=f"Exit 1 if a recommended cell has fewer than {BOARD_SIZE} questions")
+    args = parser.parse_args()
+
+    if args.csv:
+        index = load_index_from_csvs(args.csv)
+    else:
+        from mirror import client_for
+        index = load_index_from_client(client_for(['--mirror'] if args.mirror else []))
+    print(f"Indexed {len(index)} published questions, {len(index.postings)} distinct codes.\n")
+
+    cells = compute_coverage(index, args.all_levels)
+    print_matrix(cells)
+
+    board = thin_cells(cells, BOARD_SIZE)
+    limit = thin_cells(cells, RPC_LIMIT)
+    print(f"\n{len(board)} recommended cells below a {BOARD_SIZE}-cell board, {len(limit)} below the RPC limit of {RPC_LIMIT}.")
+    for c in board:
+        print(f"  !! {c['rel']}-{c['sub']}-{c['level']}: B={c['B']} ({c['worst_pair']['B']}), T={c['T']} ({c['worst_pair']['T']})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(cells, f, ensure_ascii=False, indent=2)
+        print(f"Wrote {args.json}")
+
+    if args.fail_on_thin and board:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+CodeName primitives: `MP-CP-Rel-Sub-Lvl` (e.g. '*-*-B-Ar-L3').
+
+- parse() turns a code into an interned, memoized CodeName tuple.
+- candidate_codes() builds the wildcard lattice the app sends as `p_codes`
+  (same permutations as GameSession in app/lib/models/game_session.dart).
+- CodeIndex is an inverted index (code / code part -> question bitset) whose
+  match() gives the same rows as `code_names && p_codes` in get_random_questions.
+
+    >>> parse('*-*-B-Ar-L3')
+    CodeName(mp='*', cp='*', rel='B', sub='Ar', level='L3')
+    >>> candidate_codes('M', 'F', 'B', 'Ar', 3)[:4]
+    ('M-F-B-Ar-L3', 'M-F-B-*-L3', 'M-*-B-Ar-L3', 'M-*-B-*-L3')
+    >>> index = CodeIndex([('B26-00001', ['*-*-B-Ar-L3']), ('T26-00001', ['*-*-*-*-*'])])
+    >>> index.match(candidate_codes('M', 'F', 'B', 'Ar', 3))
+    ['B26-00001']
+    >>> index.match(['*-*-*-*-*'], type_prefix='T')
+    ['T26-00001']
+"""
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+WILDCARD = '*'
+ANY_CODE = '*-*-*-*-*'
+LEVELS = ('L1', 'L2', 'L3', 'L4', 'L5')
+PARTS = ('mp', 'cp', 'rel', 'sub', 'level')
+# Set bit positions of every byte value (CodeIndex.ids_for)
+_BYTE_BITS = tuple(tuple(i for i in range(8) if value >> i & 1) for value in range(256))
+
+
+class CodeName(namedtuple('CodeName', PARTS)):
+    __slots__ = ()
+
+    def __str__(self):
+        return '-'.join(self)
+
+    @property
+    def is_wildcard(self):
+        return WILDCARD in self
+
+
+@lru_cache(maxsize=None)
+def parse(code):
+    """CodeName for a well-formed 5-part code, else None. Results are shared/interned."""
+    parts = code.strip().split('-')
+    if len(parts) != 5 or not all(parts):
+        return None
+    return CodeName(*(sys.intern(p) for p in parts))
+
+
+def split_codes(code_str):
+    """'a, b,,c' -> ['a', 'b', 'c'] (the CSV CodeName cell format)."""
+    if not code_str:
+        return []
+    return [sys.intern(c.strip()) for c in code_str.split(',') if c.strip()]
+
+
+def expand_levels(code_str):
+    """
+    Expand the first code of a CodeName cell to all five levels.
+    'F-F-B-Ar-L2' -> ['F-F-B-Ar-L1', ..., 'F-F-B-Ar-L5']. Codes without an Ln level
+    (or malformed ones) are returned unchanged.
+
+    >>> expand_levels('F-F-B-Ar-L2')[-1]
+    'F-F-B-Ar-L5'
+    """
+    codes = split_codes(code_str)
+    if not codes:
+        return []
+    base = parse(codes[0])
+    if base is None or not base.level.startswith('L'):
+        return codes
+    return list(_level_variants(base[:4]))
+
+
+@lru_cache(maxsize=None)
+def _level_variants(prefix):
+    return tuple(sys.intern('-'.join(prefix + (lvl,))) for lvl in LEVELS)
+
+
+@lru_cache(maxsize=4096)
+def candidate_codes(host_gender, guest_gender, rel, sub, level, include_any=False):
+    """
+    Codes a game with this relationship matches, in the app's priority order:
+    for MP in (host, *), CP in (guest, *): exact sub-relation, then sub-relation wildcard.
+    `level` may be 3 or 'L3'. include_any appends the '*-*-*-*-*' safety net.
+    """
+    lvl = level if str(level).startswith('L') else f"L{level}"
+    codes = []
+    for mp in (host_gender, WILDCARD):
+        for cp in (guest_gender, WILDCARD):
+            for s in (sub, WILDCARD):
+                code = sys.intern(f"{mp}-{cp}-{rel}-{s}-{lvl}")
+                if code not in codes:
+                    codes.append(code)
+    if include_any and ANY_CODE not in codes:
+        codes.append(ANY_CODE)
+    return tuple(codes)
+
+
+class CodeIndex:
+    """
+    Inverted index over questions' code_names.
+    Each question gets a bit position; postings are Python int bitsets, so a
+    candidate overlap is a handful of ORs instead of a scan of the bank.
+    """
+
+    def __init__(self, items=()):
+        self.ids = []              # bit position -> q_id
+        self.postings = {}         # code -> bitset
+        self.parts = {p: {} for p in PARTS}   # part name -> value -> bitset
+        self.prefixes = {}         # q_id first letter (B/T/M) -> bitset
+        for q_id, codes in items:
+            self.add(q_id, codes)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, q_id, codes):
+        bit = 1 << len(self.ids)
+        self.ids.append(q_id)
+        prefix = q_id[:1]
+        self.prefixes[prefix] = self.prefixes.get(prefix, 0) | bit
+        for code in codes or ():
+            self.postings[code] = self.postings.get(code, 0) | bit
+            parsed = parse(code)
+            if parsed is None:
+                continue
+            for name, value in zip(PARTS, parsed):
+                table = self.parts[name]
+                table[value] = table.get(value, 0) | bit
+
+    @classmethod
+    def from_rows(cls, rows, published_only=True):
+        """Build from question dicts (q_id, code_names[, is_published])."""
+        index = cls()
+        for row in rows:
+            if published_only and row.get('is_published') is False:
+                continue
+            if row.get('q_id'):
+                index.add(row['q_id'], row.get('code_names') or [])
+        return index
+
+    def match_bits(self, codes, type_prefix=None):
+        """Bitset of questions whose code_names overlap `codes`."""
+        bits = 0
+        postings = self.postings
+        for code in codes:
+            bits |= postings.get(code, 0)
+        if type_prefix:
+            bits &= self.prefixes.get(type_prefix, 0)
+        return bits
+
+    def part_bits(self, part, value):
+        """Bitset of questions having any code with `part` == value (e.g. ('rel', 'B'))."""
+        return self.parts[part].get(value, 0)
+
+    def ids_for(self, bits):
+        """
+        q_ids of the set bits, in index order. The bitset is decoded a byte at a time
+        through _BYTE_BITS (clearing bits one by one copies the whole int per hit).
+
+        >>> CodeIndex((q_id, []) for q_id in 'abcdefghijklm').ids_for(0b1000000000101)
+        ['a', 'c', 'm']
+        """
+        if not bits:
+            return []
+        ids = self.ids
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        return [ids[base + i] for base, byte in zip(range(0, len(data) * 8, 8), data) if byte
+                for i in _BYTE_BITS[byte]]
+
+    def match(self, codes, type_prefix=None):
+        """q_ids whose code_names overlap `codes` (in index order)."""
+        return self.ids_for(self.match_bits(codes, type_prefix))
+
+    def count(self, codes, type_prefix=None):
+        return self.match_bits(codes, type_prefix).bit_count()
@@ -0,0 +1,155 @@
+"""
+Fuzzy record linking of question text (CSV rows -> server rows).
+
+canonical_key() is the comparison form of a question: NFC (so NFD jamo from macOS
+exports compose back into syllables), casefolded, punctuation/symbols removed and
+whitespace collapsed. ContentMatcher indexes server rows by (type, canonical key)
+for exact hits and by character trigrams for everything else. A lookup takes the
+few rows sharing the most trigrams and scores them with difflib's ratio over the
+compact keys (trigram Jaccard is too harsh for short Korean questions: one inserted
+syllable costs three grams); the best one at or above the threshold wins.
+
+    >>> canonical_key('  여행  갈 때,\\n 스타일은?? ')
+    '여행 갈 때 스타일은'
+    >>> m = ContentMatcher([{'q_id': 'B26-00001', 'type': 'B', 'content': '애인과 여행갈 때 스타일은?'}])
+    >>> m.match('애인과 여행 갈 때의 스타일은', 'B').row['q_id']
+    'B26-00001'
+
+A lookup is per row, so two CSV rows can land on the same server row; assign_unique()
+keeps one link per server q_id (the best score) and turns the rest into 'ambiguous'.
+
+    >>> links = assign_unique([m.match('애인과 여행갈 때 스타일은?', 'B'), m.match('애인과 여행 갈 때 스타일', 'B')])
+    >>> [link.method for link in links]
+    ['exact', 'ambiguous']
+"""
+import unicodedata
+from difflib import SequenceMatcher
+from collections import Counter
+
+THRESHOLD = 0.85
+TOP_CANDIDATES = 8          # trigram-count leaders that get a full similarity score
+MAX_POSTING = 5000          # trigrams shared by more rows carry no signal
+
+
+def canonical_key(text):
+    """NFC, casefold, punctuation/symbols dropped, whitespace collapsed."""
+    text = unicodedata.normalize('NFC', text or '').casefold()
+    kept = ''.join(ch if unicodedata.category(ch)[0] in 'LN' else ' ' for ch in text)
+    return ' '.join(kept.split())
+
+
+def trigrams(key):
+    compact = key.replace(' ', '')
+    if len(compact) < 3:
+        return {compact} if compact else set()
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+class Match:
+    """Outcome of one lookup. method is 'exact', 'fuzzy', 'ambiguous' or 'none'."""
+
+    __slots__ = ('row', 'score', 'method', 'candidates')
+
+    def __init__(self, row=None, score=0.0, method='none', candidates=()):
+        self.row = row
+        self.score = score
+        self.method = method
+        self.candidates = candidates
+
+    def __bool__(self):
+        return self.method in ('exact', 'fuzzy')
+
+    def __repr__(self):
+        q_id = self.row.get('q_id') if self.row else None
+        return f"Match({q_id!r}, {self.score:.2f}, {self.method!r})"
+
+
+class ContentMatcher:
+    """Exact-key and trigram index over rows with q_id, type and content."""
+
+    def __init__(self, rows=(), threshold=THRESHOLD):
+        self.threshold = threshold
+        self.rows = []
+        self.keys = []             # compact keys (no spaces) for scoring
+        self.exact = {}            # (type, key) -> [row index]
+        self.postings = {}         # type -> trigram -> [row index]
+        for row in rows:
+            self.add(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row):
+        index = len(self.rows)
+        key = canonical_key(row.get('content'))
+        grams = trigrams(key)
+        self.rows.append(row)
+        self.keys.append(key.replace(' ', ''))
+        self.exact.setdefault((row.get('type'), key), []).append(index)
+        postings = self.postings.setdefault(row.get('type'), {})
+        for gram in grams:
+            postings.setdefault(gram, []).append(index)
+
+    def match(self, text, q_type=None):
+        """Best server row for `text` (restricted to rows of q_type when given)."""
+        key = canonical_key(text)
+        if not key:
+            return Match()
+
+        hits = self.exact.get((q_type, key), [])
+        if hits:
+            rows = [self.rows[i] for i in hits]
+            if len({r.get('q_id') for r in rows}) > 1:
+                return Match(score=1.0, method='ambiguous', candidates=rows)
+            return Match(rows[0], 1.0, 'exact')
+
+        compact = key.replace(' ', '')
+        tables = [self.postings.get(q_type, {})] if q_type is not None else list(self.postings.values())
+        counts = Counter()
+        for gram in trigrams(key):
+            for table in tables:
+                posting = table.get(gram)
+                if posting and len(posting) <= MAX_POSTING:
+                    counts.update(posting)
+
+        best, best_score, tied = None, 0.0, []
+        scorer = SequenceMatcher(autojunk=False)
+        scorer.set_seq2(compact)
+        for index, _ in counts.most_common(TOP_CANDIDATES):
+            row = self.rows[index]
+            scorer.set_seq1(self.keys[index])
+            score = scorer.ratio()
+            if score > best_score:
+                best, best_score, tied = row, score, [row]
+            elif score == best_score and best is not None and row.get('q_id') != best.get('q_id'):
+                tied.append(row)
+
+        if best is None or best_score < self.threshold:
+            return Match(score=best_score)
+        if len(tied) > 1:
+            return Match(score=best_score, method='ambiguous', candidates=tied)
+        return Match(best, best_score, 'fuzzy')
+
+
+def assign_unique(matches):
+    """
+    One CSV row per server q_id: among matches that link to the same q_id the best
+    score keeps it and the others become 'ambiguous' (with the contested server row
+    as candidate); a tie for the best score leaves all of them ambiguous.
+    Returns a new list in the same order.
+    """
+    claims = {}
+    for i, match in enumerate(matches):
+        if match:
+            claims.setdefault(match.row.get('q_id'), []).append(i)
+
+    out = list(matches)
+    for indexes in claims.values():
+        if len(indexes) < 2:
+            continue
+        best = max(matches[i].score for i in indexes)
+        winners = [i for i in indexes if matches[i].score == best]
+        for i in indexes:
+            if len(winners) > 1 or i != winners[0]:
+                out[i] = Match(score=matches[i].score, method='ambiguous', candidates=[matches[i].row])
+    return out
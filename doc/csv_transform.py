@@ -0,0 +1,223 @@
+"""
+Streaming CSV transforms with an atomic commit.
+
+transform_csv() reads a CSV row by row (question_loader.QuestionCsv, so header
+typos/BOM are repaired), passes every row through a chain of transforms and writes
+the result to a temp file in the same directory. The temp file is fsynced and
+renamed over the original with os.replace, so a crash leaves either the old or the
+new file, never half of one. Memory stays constant, and fieldnames and column order
+are kept (transforms may append columns via `add_fields`). A file whose rows did not
+change is left untouched, and so is one with rows wider than its header (rewriting
+it would drop the extra cells); those lines are reported in `overlong`.
+
+A transform is fn(row) -> row: it may edit the dict in place or return a new one;
+returning DROP removes the row.
+
+    python doc/csv_transform.py doc/Restored_TruthQuizData.csv --nfc --strip --expand-levels
+    python doc/csv_transform.py new_batch.csv --strip --dry-run
+"""
+import os
+import csv
+import shutil
+import argparse
+import tempfile
+import unicodedata
+
+from question_loader import QuestionCsv
+from profiling import phase, profiled
+
+DROP = object()
+
+
+class TransformResult:
+    __slots__ = ('path', 'rows_in', 'rows_out', 'changed', 'written', 'overlong')
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_in = 0
+        self.rows_out = 0
+        self.changed = 0
+        self.written = False
+        self.overlong = []
+
+    def __repr__(self):
+        return (f"TransformResult({self.path!r}, in={self.rows_in}, out={self.rows_out}, "
+                f"changed={self.changed}, written={self.written})")
+
+
+def _fsync_dir(path):
+    # Make the rename itself durable (not supported on every platform)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicFile:
+    """
+    Text file written to a temp file next to `path`; commit() fsyncs and renames it
+    over `path`, abort() (or an exception inside `with`) removes it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+        self._file = os.fdopen(fd, 'w', newline='', encoding='utf-8')
+        self._done = False
+
+    def write(self, text):
+        self._file.write(text)
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if os.path.exists(self.path):
+            shutil.copymode(self.path, self.tmp_path)
+        os.replace(self.tmp_path, self.path)
+        _fsync_dir(self.path)
+        self._done = True
+
+    def abort(self):
+        if not self._done:
+            self._file.close()
+            os.remove(self.tmp_path)
+            self._done = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.abort()
+        return False
+
+
+class AtomicCsvWriter(AtomicFile):
+    """AtomicFile with a csv.DictWriter on top (the header is written up front)."""
+
+    def __init__(self, path, fieldnames):
+        super().__init__(path)
+        self.fieldnames = fieldnames
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def writerow(self, row):
+        self._writer.writerow(row)
+
+    def writerows(self, rows):
+        self._writer.writerows(rows)
+
+
+def write_csv_atomic(path, fieldnames, rows):
+    """Write an iterable of row dicts to `path` atomically."""
+    with AtomicCsvWriter(path, fieldnames) as writer:
+        writer.writerows(rows)
+        writer.commit()
+
+
+def transform_csv(path, transforms, add_fields=(), dry_run=False):
+    """Stream `path` through `transforms` in one pass. Returns a TransformResult."""
+    result = TransformResult(path)
+    write = phase('csv_transform.write')
+    with QuestionCsv(path) as source:
+        fieldnames = list(source.fieldnames)
+        fieldnames += [f for f in add_fields if f not in fieldnames]
+        repaired = bool(source.repaired)
+
+        writer = None if dry_run else AtomicCsvWriter(path, fieldnames)
+        try:
+            for row in profiled(source, 'csv_transform.read'):
+                result.rows_in += 1
+                before = dict(row)
+                for fn in transforms:
+                    row = fn(row)
+                    if row is DROP:
+                        break
+                if row is DROP:
+                    result.changed += 1
+                    continue
+                if row != before:
+                    result.changed += 1
+                result.rows_out += 1
+                if writer:
+                    with write:
+                        writer.writerow(row)
+        except BaseException:
+            if writer:
+                writer.abort()
+            raise
+
+    result.overlong = source.overlong
+    if result.overlong:
+        print(f"  ! {path}: {source.describe_overlong()}; fix them first, the file is not rewritten")
+    if writer:
+        if result.overlong:
+            writer.abort()
+        elif result.changed or repaired or len(fieldnames) != len(source.fieldnames):
+            with write:
+                writer.commit()
+            result.written = True
+        else:
+            writer.abort()
+    return result
+
+
+# --- Reusable transforms -------------------------------------------------------------
+
+def strip_cells(row):
+    return {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+
+
+def nfc_cells(row):
+    return {k: (unicodedata.normalize('NFC', v) if isinstance(v, str) else v) for k, v in row.items()}
+
+
+def expand_codename(row):
+    from codename import expand_levels
+    row['CodeName'] = ",".join(expand_levels(row.get('CodeName', '')))
+    return row
+
+
+CLI_TRANSFORMS = {
+    'strip': strip_cells,
+    'nfc': nfc_cells,
+    'expand_levels': expand_codename,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply streaming transforms to CSV files in place (atomically).")
+    parser.add_argument('paths', nargs='+', help="CSV files")
+    parser.add_argument('--strip', action='store_true', help="Trim whitespace in every cell")
+    parser.add_argument('--nfc', action='store_true', help="NFC-normalize every cell (composes NFD jamo)")
+    parser.add_argument('--expand-levels', action='store_true', help="Expand CodeName to all five levels")
+    parser.add_argument('--dry-run', action='store_true', help="Count changes without writing")
+    args = parser.parse_args()
+
+    # Chain in a fixed order so the result does not depend on flag order
+    chain = [fn for name, fn in CLI_TRANSFORMS.items() if getattr(args, name)]
+    if not chain:
+        parser.error("no transform selected")
+    for path in args.paths:
+        if not os.path.exists(path):
+            print(f"Skipping {path} (Not found)")
+            continue
+        result = transform_csv(path, chain, dry_run=args.dry_run)
+        if result.written:
+            state = 'written'
+        elif args.dry_run:
+            state = 'dry run'
+        else:
+            state = 'not written, over-long rows' if result.overlong else 'unchanged'
+        print(f"{path}: {result.rows_in} rows, {result.changed} changed ({state})")
+
+if __name__ == "__main__":
+    main()
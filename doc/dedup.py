@@ -0,0 +1,261 @@
+"""
+Near-duplicate question detection across CSV sources (MinHash + LSH banding).
+
+Each question text is normalized (NFC, casefold, whitespace and punctuation removed),
+shingled into character n-grams and summarized by a NUM_PERM-value MinHash signature.
+Signatures use one-permutation hashing: every shingle is hashed once, the top bits
+pick one of NUM_PERM bins and each bin keeps its minimum; empty bins borrow from the
+next filled bin (rotation densification). That is one hash per shingle instead of
+NUM_PERM, with the same LSH behaviour.
+
+Signatures are cut into BANDS bands; questions that share any band bucket become
+candidate pairs, are confirmed by exact shingle Jaccard, and are merged into
+clusters with union-find. Work is linear in the number of questions plus the
+number of candidate pairs, instead of n^2 comparisons.
+
+With BANDS=16 x ROWS=4 a pair is caught with probability 1 - (1 - J^4)^16:
+~50% at J=0.5, ~96% at J=0.7, >99.9% at J=0.85.
+
+    python doc/dedup.py                                  # default sources, threshold 0.7
+    python doc/dedup.py doc/TruthQuizData_20260128.csv Q_builder/src/doc/new_data_2026-01-18.csv
+    python doc/dedup.py --threshold 0.6 --json doc/build/dedup.json
+
+Inputs: any question_loader layout (q_id/content) or the Q_builder output
+(Type,SourceCode,Topic,Context,Question,Choices/Answers).
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+
+from question_loader import QuestionCsv
+from content_matcher import canonical_key
+
+DEFAULT_SOURCES = [
+    'doc/Restored_BalanceQuizData.csv',
+    'doc/Restored_TruthQuizData.csv',
+    'doc/BalanceQuizData_20280128.csv',
+    'doc/TruthQuizData_20260128.csv',
+    'Q_builder/src/doc/new_data_2026-01-18.csv',
+]
+NGRAM = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.7
+MAX_BUCKET = 500          # buckets larger than this are boilerplate, not duplicates
+
+_MASK64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15                 # Fibonacci hashing spreads crc32 over 64 bits
+_BIN_SHIFT = 64 - (NUM_PERM - 1).bit_length()
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_ROTATION = 1 << _BIN_SHIFT               # offset per bin borrowed during densification
+
+
+def normalize(text):
+    """content_matcher.canonical_key without spaces: NFC, casefold, letters and digits only."""
+    return canonical_key(text).replace(' ', '')
+
+
+def shingles(text, n=NGRAM):
+    """Set of character n-grams of the normalized text (the whole text if shorter)."""
+    norm = normalize(text)
+    if len(norm) <= n:
+        return {norm} if norm else set()
+    return {norm[i:i + n] for i in range(len(norm) - n + 1)}
+
+
+def minhash(shingle_set):
+    """NUM_PERM-value MinHash signature (tuple) of a shingle set, stable across runs."""
+    bins = [None] * NUM_PERM
+    for shingle in shingle_set:
+        h = (zlib.crc32(shingle.encode('utf-8')) * _MIX) & _MASK64
+        b = h >> _BIN_SHIFT
+        v = h & _VALUE_MASK
+        current = bins[b]
+        if current is None or v < current:
+            bins[b] = v
+    if None not in bins or not shingle_set:
+        return tuple(bins)
+
+    signature = list(bins)
+    for i in range(NUM_PERM):
+        if signature[i] is None:
+            step = 1
+            while bins[(i + step) % NUM_PERM] is None:
+                step += 1
+            signature[i] = bins[(i + step) % NUM_PERM] + step * _ROTATION
+    return tuple(signature)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class Item:
+    __slots__ = ('source', 'key', 'type', 'text', 'shingles')
+
+    def __init__(self, source, key, type, text):
+        self.source = source
+        self.key = key
+        self.type = type
+        self.text = text
+        self.shingles = shingles(text)
+
+    def as_dict(self):
+        return {'source': self.source, 'key': self.key, 'type': self.type, 'text': self.text}
+
+
+def _type_of(q_id, path, raw_type=''):
+    raw = (raw_type or '').strip().lower()
+    if raw.startswith('b') or raw.startswith('t'):
+        return raw[0].upper()
+    if q_id[:1] in ('B', 'T', 'M'):
+        return q_id[:1]
+    return 'T' if 'Truth' in os.path.basename(path) else 'B'
+
+
+def load_items(path, field='content'):
+    """Items from one CSV. The same (q_id, normalized text) is kept once per call."""
+    items = []
+    seen = set()
+    with QuestionCsv(path) as source:
+        builder = 'Question' in source.fieldnames
+        for line, row in enumerate(source, start=2):
+            if builder:
+                text = row.get('Question', '')
+                key = f"{os.path.basename(path)}:{line}"
+                q_type = _type_of('', path, row.get('Type'))
+            else:
+                text = row.get(field, '')
+                q_id = (row.get('q_id') or '').strip()
+                key = q_id or f"{os.path.basename(path)}:{line}"
+                q_type = _type_of(q_id, path)
+            marker = (key, normalize(text))
+            if not marker[1] or marker in seen:
+                continue
+            seen.add(marker)
+            items.append(Item(path, key, q_type, text))
+    return items
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def candidate_pairs(signatures, bands=BANDS, rows=ROWS, max_bucket=MAX_BUCKET):
+    """Set of (i, j) index pairs sharing at least one LSH band bucket."""
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        lo = band * rows
+        for i, sig in enumerate(signatures):
+            buckets.setdefault(sig[lo:lo + rows], []).append(i)
+        for members in buckets.values():
+            if len(members) < 2 or len(members) > max_bucket:
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def find_clusters(items, threshold=THRESHOLD):
+    """
+    Near-duplicate clusters: [{'members': [Item, ...], 'similarity': min confirmed J, 'cross_type': bool}].
+    Clusters whose members all carry the same q_id (one question in several files) are dropped.
+    """
+    signatures = [minhash(item.shingles) for item in items]
+    pairs = candidate_pairs(signatures)
+    uf = UnionFind(len(items))
+    confirmed = {}
+    for i, j in pairs:
+        score = jaccard(items[i].shingles, items[j].shingles)
+        if score >= threshold:
+            uf.union(i, j)
+            confirmed[(i, j)] = score
+
+    groups = {}
+    for i in range(len(items)):
+        groups.setdefault(uf.find(i), []).append(i)
+    lowest = {}
+    for (i, j), score in confirmed.items():
+        root = uf.find(i)
+        lowest[root] = min(lowest.get(root, 1.0), score)
+
+    clusters = []
+    for root, members in groups.items():
+        if len(members) < 2 or len({items[i].key for i in members}) < 2:
+            continue
+        cluster_items = [items[i] for i in members]
+        clusters.append({
+            'members': cluster_items,
+            'similarity': round(lowest.get(root, 1.0), 3),
+            'cross_type': len({it.type for it in cluster_items}) > 1,
+        })
+    clusters.sort(key=lambda c: (-len(c['members']), c['similarity']))
+    return clusters, len(pairs)
+
+
+def print_clusters(clusters, limit=30):
+    for n, cluster in enumerate(clusters[:limit], start=1):
+        flag = ' [B/T]' if cluster['cross_type'] else ''
+        print(f"\n#{n} ({len(cluster['members'])} questions, J >= {cluster['similarity']}){flag}")
+        for item in cluster['members']:
+            print(f"  {item.type} {item.key:<24} {item.text.strip()[:50]}  ({os.path.basename(item.source)})")
+    if len(clusters) > limit:
+        print(f"\n... {len(clusters) - limit} more clusters (use --json for the full list)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate questions across CSV sources.")
+    parser.add_argument('paths', nargs='*', help="CSV files (default: the known bank sources)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help=f"Jaccard threshold (default {THRESHOLD})")
+    parser.add_argument('--field', default='content', help="Column to compare for bank CSVs (e.g. content_en)")
+    parser.add_argument('--json', metavar='PATH', help="Write the clusters as JSON")
+    args = parser.parse_args()
+
+    items = []
+    for path in args.paths or DEFAULT_SOURCES:
+        if not os.path.exists(path):
+            print(f"Skipping {path} (Not found)")
+            continue
+        loaded = load_items(path, args.field)
+        print(f"Read {len(loaded)} questions from {path}")
+        items.extend(loaded)
+    if not items:
+        sys.exit("No questions to compare.")
+
+    started = time.perf_counter()
+    clusters, pair_count = find_clusters(items, args.threshold)
+    elapsed = time.perf_counter() - started
+    print(f"\n🔍 {len(items)} questions, {pair_count} LSH candidate pairs, "
+          f"{len(clusters)} near-duplicate clusters in {elapsed:.2f}s")
+    print_clusters(clusters)
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([dict(c, members=[m.as_dict() for m in c['members']]) for c in clusters],
+                      f, ensure_ascii=False, indent=2)
+        print(f"Wrote {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,168 @@
-import os
+"""
+Incident diagnostics: "the app shows no questions".
+
+Runs a matrix of probes concurrently (per table, per key role, per question type):
+head-only exact counts, a code_names sample and the app's two question RPCs
+(get_random_questions for the cell's codes, get_random_wildcard_questions),
+then prints the anon-vs-service (RLS) picture with per-probe latency.
+
+    python doc/diagnose_remote.py            # table report
+    python doc/diagnose_remote.py --json     # structured report on stdout
+"""
+import sys
+import json
+import time
 import asyncio
-from supabase import create_client, Client
-
-# Manual .env loader since python-dotenv might not be installed
-def load_env():
-    env_path = os.path.join(os.path.dirname(__file__), '../app/.env')
-    if not os.path.exists(env_path):
-        print(f"❌ .env file not found at: {env_path}")
-        return {}
-    
-    env = {}
-    with open(env_path, 'r') as f:
-        for line in f:
-            if line.strip() and not line.startswith('#'):
-                parts = line.strip().split('=', 1)
-                if len(parts) == 2:
-                    env[parts[0].strip()] = parts[1].strip()
-    return env
-
-async def main():
-    env = load_env()
-    url = env.get('SUPABASE_URL')
-    anon_key = env.get('SUPABASE_ANON_KEY')
-    service_key = env.get('SUPABASE_SERVICE_ROLE_KEY')
-
-    if not url or not anon_key:
-        print("❌ Missing SUPABASE_URL or SUPABASE_ANON_KEY in .env")
-        return
-
-    print(f"🔍 Checking Supabase project: {url}")
-
-    # 1. Check with Anon Key (what the app sees)
-    print("\n--- [1] Checking with ANON_KEY (User View) ---")
+from concurrent.futures import ThreadPoolExecutor
+from supabase_client import get_client, get_setting, load_env, MAX_CONNECTIONS
+from codename import candidate_codes
+
+TABLES = ['questions', 'game_sessions', 'profiles', 'logs', 'reports', 'inquiries']
+QUESTION_TYPES = ['B', 'T', 'M']
+PROBE_TIMEOUT = 10.0     # seconds per probe
+# Representative board cell (host M, guest F, relationship B-Ar, level 3; see code_coverage.RELATIONSHIPS)
+RPC_CELL = ('M', 'F', 'B', 'Ar', 3)
+
+
+def _count(client, table, where=None):
+    query = client.table(table).select('*', count='exact', head=True)
+    if where:
+        query = where(query)
+    return {'count': query.execute().count}
+
+
+def _sample(client):
+    rows = client.table('questions').select('q_id, code_names').limit(5).execute().data or []
+    return {'count': len(rows), 'sample': rows}
+
+
+def _rpc(client, type_prefix):
+    # Same call shape the app uses: the cell's specific codes only (game_session.dart
+    # drops '*-*-*-*-*' here and fetches it through get_random_wildcard_questions)
+    rows = client.rpc('get_random_questions', {
+        'p_codes': list(candidate_codes(*RPC_CELL)),
+        'p_type_prefix': type_prefix,
+        'p_limit': 5,
+    }).execute().data or []
+    return {'count': len(rows)}
+
+
+def _wildcard_rpc(client, type_prefix):
+    rows = client.rpc('get_random_wildcard_questions', {
+        'p_type_prefix': type_prefix,
+        'p_limit': 5,
+    }).execute().data or []
+    return {'count': len(rows)}
+
+
+def build_probes():
+    """[(name, role, fn, args)] for every role that has a key configured."""
+    roles = [r for r in ('anon', 'service') if get_setting(r)]
+    probes = []
+    for role in roles:
+        for table in TABLES:
+            probes.append((f"count {table}", role, _count, (table,)))
+        for q_type in QUESTION_TYPES:
+            probes.append((f"count questions type={q_type}", role, _count,
+                           ('questions', lambda q, t=q_type: q.eq('type', t))))
+        probes.append(("count questions published", role, _count,
+                       ('questions', lambda q: q.eq('is_published', True))))
+        probes.append(("sample questions code_names", role, _sample, ()))
+        for prefix in ('B', 'T'):
+            probes.append((f"rpc get_random_questions {prefix}", role, _rpc, (prefix,)))
+            probes.append((f"rpc get_random_wildcard_questions {prefix}", role, _wildcard_rpc, (prefix,)))
+    return probes
+
+
+async def run_probe(name, role, fn, args):
+    started = time.perf_counter()
+    result = {'probe': name, 'role': role, 'ok': True, 'count': None, 'error': None}
     try:
-        anon_client: Client = create_client(url, anon_key)
-        # Try to count rows
-        response = anon_client.table('questions').select('*', count='exact').execute()
-        print(f"✅ Data Count: {len(response.data)} rows visible via Anon Key")
+        client = get_client(role)
+        result.update(await asyncio.wait_for(asyncio.to_thread(fn, client, *args), PROBE_TIMEOUT))
     except Exception as e:
-        print(f"❌ Anon Key Error: {e}")
+        result['ok'] = False
+        result['error'] = str(e) or type(e).__name__
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
 
-    # 2. Check with Service Role Key (Admin View)
-    print("\n--- [2] Checking with SERVICE_ROLE_KEY (Admin View) ---")
-    if not service_key:
-        print("⚠️  SKIPPING: SUPABASE_SERVICE_ROLE_KEY not found in .env")
-        print("   -> Please add it to check for hidden data.")
-    else:
-        try:
-            # Service role bypasses RLS
-            admin_client: Client = create_client(url, service_key)
-            response = admin_client.table('questions').select('*', count='exact').execute()
-            count = len(response.data)
-            print(f"✅ Data Count: {count} rows visible via Service Role Key")
-            
-            if count > 0:
-                print(f"🎉 FOUND {count} QUESTIONS! They are hidden from the app due to RLS policies.")
-            else:
-                print("❌ Count is 0 even with Admin Key. Data might be permanently deleted.")
-                
-        except Exception as e:
-            print(f"❌ Service Key Error: {e}")
 
-if __name__ == '__main__':
-    # Check if asyncio run is needed or standard sync
-    # supabase-py recent versions are sync by default but support async. 
-    # Let's use standard sync for simplicity if library allows, but import implies sync usage usually.
-    # Re-writing for standard sync usage based on typical python usage
-    
-    env = load_env()
-    url = env.get('SUPABASE_URL')
-    anon_key = env.get('SUPABASE_ANON_KEY')
-    service_key = env.get('SUPABASE_SERVICE_ROLE_KEY')
-    
-    if not url:
-        print("Error: URL not found")
-        exit(1)
-
-    print(f"Target: {url}")
-    
-    # Anon
-    try:
-        client = create_client(url, anon_key)
-        
-        # FETCH SAMPLE DATA WITH CODE NAMES
-        print("\n--- CHECKING CODE NAMES (First 5 Rows) ---")
-        data_res = client.table('questions').select('q_id, code_names').limit(5).execute()
-        
-        if not data_res.data:
-            print("No data found.")
-        
-        for row in data_res.data:
+async def diagnose():
+    probes = build_probes()
+    # Build the cached clients up front so probes don't race to create them
+    for role in {role for _, role, _, _ in probes}:
+        get_client(role)
+    # One worker per probe (bounded by the shared connection pool size)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=min(len(probes), MAX_CONNECTIONS)))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_probe(*p) for p in probes))
+    return {
+        'url': get_setting('url'),
+        'roles': sorted({r['role'] for r in results}),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'probes': results,
+        'findings': findings(results),
+    }
+
+
+def findings(results):
+    """Plain-language conclusions from comparing anon and service counts."""
+    by_key = {(r['probe'], r['role']): r for r in results}
+    notes = []
+    if not any(role == 'service' for _, role in by_key):
+        notes.append("SUPABASE_SERVICE_ROLE_KEY not set: cannot tell RLS-hidden rows from deleted ones.")
+
+    for probe in sorted({p for p, _ in by_key}):
+        anon = by_key.get((probe, 'anon'))
+        admin = by_key.get((probe, 'service'))
+        if anon and not anon['ok']:
+            notes.append(f"anon '{probe}' failed: {anon['error']}")
+        if anon and admin and anon['ok'] and admin['ok'] and anon['count'] is not None and admin['count'] is not None:
+            if admin['count'] > anon['count']:
+                notes.append(f"'{probe}': service sees {admin['count']}, anon sees {anon['count']} "
+                             f"-> {admin['count'] - anon['count']} rows hidden by RLS")
+
+    admin_total = by_key.get(('count questions', 'service'))
+    if admin_total and admin_total['ok'] and admin_total['count'] == 0:
+        notes.append("questions is empty even with the service key: data was deleted.")
+    published = by_key.get(('count questions published', 'service')) or by_key.get(('count questions published', 'anon'))
+    if published and published['ok'] and published['count'] == 0:
+        notes.append("No rows have is_published = true: get_random_questions filters them all out.")
+    return notes
+
+
+def print_report(report):
+    print(f"🔍 Supabase project: {report['url']}  ({len(report['probes'])} probes in {report['elapsed_ms']} ms)")
+    print(f"\n{'probe':<36}{'role':<9}{'result':>10}{'latency':>11}")
+    print('-' * 66)
+    for r in sorted(report['probes'], key=lambda r: (r['probe'], r['role'])):
+        value = r['count'] if r['ok'] else 'ERROR'
+        print(f"{r['probe']:<36}{r['role']:<9}{str(value):>10}{r['latency_ms']:>9.0f}ms")
+        if not r['ok']:
+            print(f"    ❌ {r['error']}")
+
+    sample = next((r for r in report['probes'] if r['probe'].startswith('sample') and r['ok']), None)
+    if sample:
+        print("\n--- CODE NAMES (first 5 rows, " + sample['role'] + ") ---")
+        for row in sample.get('sample', []):
             print(f"ID: {row.get('q_id')} | CodeNames: {row.get('code_names')}")
 
-    except Exception as e:
-        print(f"Error: {e}")
+    print("\n--- Findings ---")
+    for note in report['findings'] or ["No anon/service discrepancies found."]:
+        print(f"• {note}")
 
-    except Exception as e:
-        print(f"Anon Error: {e}")
-
-    # Admin
-    if service_key:
-        try:
-            admin = create_client(url, service_key)
-            res = admin.table('questions').select('id', count='exact', head=True).execute()
-            print(f"\nAdmin (Real) View Count: {res.count}")
-        except Exception as e:
-            print(f"Admin Error: {e}")
+
+def main():
+    if not get_setting('url') or not (get_setting('anon') or get_setting('service')):
+        print("❌ Missing SUPABASE_URL or keys in .env")
+        print(f"Loaded Env Keys: {sorted(k for k in load_env() if 'SUPABASE' in k)}")
+        sys.exit(1)
+
+    report = asyncio.run(diagnose())
+    if '--json' in sys.argv:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
     else:
-        print("\n>>> Need Service Key to check hidden data.")
-        # Debug env
-        print(f"Loaded Env Keys: {list(env.keys())}")
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -1,104 +1,311 @@
-import os
 import csv
+import sys
 import json
-from supabase import create_client, Client
-
-# Manual .env loader
-def load_env():
-    env_path = os.path.join(os.path.dirname(__file__), '../app/.env')
-    env = {}
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    parts = line.strip().split('=', 1)
-                    if len(parts) == 2:
-                        env[parts[0].strip()] = parts[1].strip()
-    return env
+import queue
+import argparse
+import threading
+from supabase_client import get_client, get_setting, scan_table
+from profiling import phase, profiled, file_bytes, add_profile_argument, enable
+from csv_transform import AtomicCsvWriter, AtomicFile
+
+# Only the columns the exports need (no SELECT *)
+RESTORE_COLUMNS = 'q_id,legacy_q_id,type,content,details,code_names'
+SNAPSHOT_COLUMNS = ('q_id,legacy_q_id,type,content,content_en,details,details_en,'
+                    'code_names,gender_variants,gender_variants_en,is_published,created_at,updated_at')
+
+EXPORT_WORKERS = 4
+PAGE_SIZE = 1000
+QUEUE_PAGES = 8          # pages buffered between scanners and the writer
+
+TRUTH_FIELDS = ['CodeName', 'Order', 'q_id', 'content', 'answers']
+BALANCE_FIELDS = ['CodeName', 'Order', 'q_id', 'content', 'choice_a', 'choice_b']
+
+_DONE = object()
+
+
+class ExportIncomplete(RuntimeError):
+    """The rows exported do not add up to the count the server reported."""
+
+
+def count_rows(supabase, where=None):
+    query = supabase.table('questions').select('q_id', count='exact', head=True)
+    if where:
+        query = where(query)
+    return query.execute().count or 0
+
+
+def split_key_space(supabase, workers, total, where=None):
+    """
+    Cut the q_id key space of the rows matching `where` into `workers` ranges of
+    roughly equal size. Returns [(lower, upper), ...] for scan_table (lower exclusive,
+    upper inclusive). Each boundary costs one single-row OFFSET probe (workers - 1 in
+    total); the scans themselves never use OFFSET.
+    """
+    if workers <= 1 or total <= PAGE_SIZE:
+        return [(None, None)]
+
+    bounds = []
+    for k in range(1, workers):
+        offset = total * k // workers
+        probe = supabase.table('questions').select('q_id')
+        if where:
+            probe = where(probe)
+        res = probe.order('q_id').range(offset, offset).execute()
+        if res.data and res.data[0].get('q_id') and res.data[0]['q_id'] not in bounds:
+            bounds.append(res.data[0]['q_id'])
+
+    ranges = []
+    lower = None
+    for bound in bounds:
+        ranges.append((lower, bound))
+        lower = bound
+    ranges.append((lower, None))
+    return ranges
+
+
+def export_rows(supabase, columns, sink, workers=EXPORT_WORKERS, where=None):
+    """
+    Stream every `questions` row into sink(row).
+    Key ranges are scanned in parallel (keyset pagination on q_id); rows reach the sink
+    on the calling thread as pages arrive, so memory is bounded by QUEUE_PAGES pages.
+    Rows with a NULL q_id are fetched in a final pass. `where` adds filters to every query.
+    Returns the number of rows exported; raises ExportIncomplete when that differs from
+    the server's count (the table changed during the export, or a page went missing).
+    """
+    with phase('export_rows.plan'):
+        total = count_rows(supabase, where)
+        ranges = split_key_space(supabase, workers, total, where)
+    pages = queue.Queue(maxsize=QUEUE_PAGES)
+    errors = []
+
+    def scan(lower, upper):
+        try:
+            page = []
+            rows = scan_table(supabase, columns, page_size=PAGE_SIZE, where=where, lower=lower, upper=upper)
+            for row in profiled(rows, 'export_rows.fetch'):
+                page.append(row)
+                if len(page) >= PAGE_SIZE:
+                    pages.put(page)
+                    page = []
+            if page:
+                pages.put(page)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pages.put(_DONE)
+
+    threads = [threading.Thread(target=scan, args=r, daemon=True) for r in ranges]
+    for t in threads:
+        t.start()
+
+    exported = 0
+    running = len(threads)
+    waiting = phase('export_rows.wait')
+    while running:
+        with waiting:
+            page = pages.get()
+        if page is _DONE:
+            running -= 1
+            continue
+        with phase('export_rows.write', rows=len(page)):
+            for row in page:
+                sink(row)
+        exported += len(page)
+
+    if errors:
+        raise errors[0]
+
+    # Keyset ranges skip NULL keys
+    orphan_query = supabase.table('questions').select(columns).is_('q_id', 'null')
+    if where:
+        orphan_query = where(orphan_query)
+    with phase('export_rows.orphans') as p:
+        orphans = orphan_query.execute().data or []
+        for row in orphans:
+            sink(row)
+        p.add(rows=len(orphans))
+    exported += len(orphans)
+
+    if exported != total:
+        raise ExportIncomplete(f"Exported {exported} rows but the server reports {total} "
+                               f"(table changed during export?)")
+    return exported
+
+
+class CsvSink:
+    """
+    Writes mapped rows to a CSV file as they arrive (a temp file that close() renames
+    over `path`). With keep_empty=False a sink that got no rows leaves `path` as it was.
+    """
+
+    def __init__(self, path, fieldnames, mapper=None, keep_empty=True):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.count = 0
+        self.keep_empty = keep_empty
+        self._mapper = mapper
+        self._writer = None
+
+    def __call__(self, row):
+        if self._writer is None:
+            self._writer = AtomicCsvWriter(self.path, self.fieldnames)
+        if self._mapper:
+            row = self._mapper(row)
+        self._writer.writerow({k: _csv_value(v) for k, v in row.items()})
+        self.count += 1
+
+    def close(self):
+        if self._writer is None:
+            if not self.keep_empty:
+                return
+            self._writer = AtomicCsvWriter(self.path, self.fieldnames)
+        self._writer.commit()
+
+    def abort(self):
+        """Drop the rows written so far; `path` is left as it was."""
+        if self._writer is not None:
+            self._writer.abort()
+
+
+class JsonlSink:
+    """Writes raw rows as JSON lines (a temp file that close() renames over `path`)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = AtomicFile(path)
+
+    def __call__(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def close(self):
+        self._file.commit()
+
+    def abort(self):
+        """Drop the rows written so far; `path` is left as it was."""
+        self._file.abort()
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _details(row):
+    # Details is JSON dict usually, but older rows may hold it as a string
+    details = row.get('details') or {}
+    if isinstance(details, str):
+        try:
+            details = json.loads(details)
+        except ValueError:
+            details = {}
+    return details
+
+
+def _restore_common(row):
+    code_names = row.get('code_names') or []
+    details = _details(row)
+    return {
+        'CodeName': ",".join(code_names) if isinstance(code_names, list) else str(code_names),
+        # In import script: details['order'] = order
+        'Order': details.get('order', ''),
+        'q_id': row.get('q_id') or row.get('legacy_q_id') or '',
+        'content': row.get('content', ''),
+    }, details
+
+
+def truth_row(row):
+    out, details = _restore_common(row)
+    out['answers'] = details.get('answers', '')
+    return out
+
+
+def balance_row(row):
+    out, details = _restore_common(row)
+    out['choice_a'] = details.get('choice_a', '')
+    out['choice_b'] = details.get('choice_b', '')
+    return out
+
+
+def export_restore_csvs(supabase, workers):
+    """
+    Write doc/Restored_{Truth,Balance}QuizData.csv from the server. A type with no rows
+    (or a failed export) leaves its existing file untouched.
+    """
+    truth = CsvSink('doc/Restored_TruthQuizData.csv', TRUTH_FIELDS, truth_row, keep_empty=False)
+    balance = CsvSink('doc/Restored_BalanceQuizData.csv', BALANCE_FIELDS, balance_row, keep_empty=False)
+
+    def route(row):
+        if row.get('type') == 'T':
+            truth(row)
+        elif row.get('type') == 'B':
+            balance(row)
+
+    with phase('export_restore_csvs') as p:
+        try:
+            total = export_rows(supabase, RESTORE_COLUMNS, route, workers)
+        except BaseException:
+            truth.abort()
+            balance.abort()
+            raise
+        truth.close()
+        balance.close()
+        p.add(rows=total, bytes=file_bytes(truth.path) + file_bytes(balance.path))
+
+    print(f"✅ FETCHED {total} rows.")
+    for sink, label in ((truth, 'Truth'), (balance, 'Balance')):
+        if sink.count:
+            print(f"🎉 Exported {sink.count} {label} questions to {sink.path}")
+        else:
+            print(f"No {label} questions on the server; {sink.path} not written.")
+
+
+def export_snapshot(supabase, path, workers):
+    """Full backup of `questions` (JSONL, or CSV with JSON-encoded columns)."""
+    if path.endswith('.csv'):
+        sink = CsvSink(path, SNAPSHOT_COLUMNS.split(','))
+    else:
+        sink = JsonlSink(path)
+    with phase('export_snapshot') as p:
+        try:
+            total = export_rows(supabase, SNAPSHOT_COLUMNS, sink, workers)
+        except BaseException:
+            sink.abort()
+            raise
+        sink.close()
+        p.add(rows=total, bytes=file_bytes(path))
+    print(f"🎉 Snapshot of {total} rows written to {path}")
+
 
 def main():
-    env = load_env()
-    url = env.get('SUPABASE_URL')
-    # Use Service Role Key to ensure we get ALL data including any hidden rows
-    key = env.get('SUPABASE_SERVICE_ROLE_KEY') or env.get('SUPABASE_ANON_KEY')
+    parser = argparse.ArgumentParser(description="Export the questions table.")
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help="Write a full backup (.jsonl or .csv) instead of the Restored_* CSVs")
+    parser.add_argument('--workers', type=int, default=EXPORT_WORKERS, help="Parallel key-range scanners")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable(args.profile)
 
-    if not url or not key:
-        print("❌ Missing Supabase credentials in .env")
+    # Use Service Role Key to ensure we get ALL data including any hidden rows
+    try:
+        supabase = get_client()
+    except RuntimeError as e:
+        print(f"❌ {e}")
         return
 
-    print(f"CONNECTING TO: {url}")
-    supabase: Client = create_client(url, key)
-
-    # Fetch all questions (limit 1000 for safety, though we know there are 582)
-    response = supabase.table('questions').select('*').limit(1000).execute()
-    data = response.data
-    
-    print(f"✅ FETCHED {len(data)} rows.")
-
-    truth_rows = []
-    balance_rows = []
-
-    for row in data:
-        q_type = row.get('type')
-        content = row.get('content', '')
-        q_id = row.get('legacy_q_id', '')
-        
-        # Details is JSON dict usually, but supabase-py might return it as dict directly
-        details = row.get('details') or {}
-        if isinstance(details, str):
-            try:
-                details = json.loads(details)
-            except:
-                details = {}
-        
-        # CodeNames
-        code_names = row.get('code_names') or []
-        code_name_str = ",".join(code_names) if isinstance(code_names, list) else str(code_names)
-
-        # Order - seemingly wasn't stored in top level, maybe in details?
-        # In import script: details['order'] = order
-        order = details.get('order', '')
-
-        if q_type == 'T':
-            # Truth Structure: CodeName, Order, q_id, content, answers
-            answers = details.get('answers', '')
-            truth_rows.append({
-                'CodeName': code_name_str,
-                'Order': order,
-                'q_id': q_id,
-                'content': content,
-                'answers': answers
-            })
-        elif q_type == 'B':
-            # Balance Structure: CodeName, Order, q_id, content, choice_a, choice_b
-            choice_a = details.get('choice_a', '')
-            choice_b = details.get('choice_b', '')
-            balance_rows.append({
-                'CodeName': code_name_str,
-                'Order': order,
-                'q_id': q_id,
-                'content': content,
-                'choice_a': choice_a,
-                'choice_b': choice_b
-            })
-
-    # Write Truth CSV
-    if truth_rows:
-        with open('doc/Restored_TruthQuizData.csv', 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['CodeName', 'Order', 'q_id', 'content', 'answers']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(truth_rows)
-        print(f"🎉 Exported {len(truth_rows)} Truth questions to doc/Restored_TruthQuizData.csv")
-
-    # Write Balance CSV
-    if balance_rows:
-        with open('doc/Restored_BalanceQuizData.csv', 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['CodeName', 'Order', 'q_id', 'content', 'choice_a', 'choice_b']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(balance_rows)
-        print(f"🎉 Exported {len(balance_rows)} Balance questions to doc/Restored_BalanceQuizData.csv")
+    print(f"CONNECTING TO: {get_setting('url')}")
+
+    try:
+        if args.snapshot:
+            export_snapshot(supabase, args.snapshot, args.workers)
+        else:
+            export_restore_csvs(supabase, args.workers)
+    except ExportIncomplete as e:
+        print(f"❌ {e}; nothing was written.")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,32 +1,23 @@
+"""
+Re-link the Restored_* CSVs to the server: copy each matched server row's q_id/Order
+and code names into the CSV.
+
+Only exact content matches are applied. Fuzzy matches (content_matcher.THRESHOLD)
+are printed for review and applied only with --apply-fuzzy. Every server q_id is
+given to at most one CSV row; rows that lose it to a better match are reported as
+ambiguous and left as they are.
+
+    python doc/fix_data_integrity.py [--apply-fuzzy] [--profile]
+"""
 import os
-import csv
-from supabase import create_client, Client
-
-def load_env():
-    env_path = os.path.join(os.path.dirname(__file__), '../app/.env')
-    env = {}
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    parts = line.strip().split('=', 1)
-                    if len(parts) == 2:
-                        env[parts[0].strip()] = parts[1].strip()
-    return env
-
-def expand_code_name_str(code_str):
-    """
-    Ensure the code string in CSV is expanded.
-    If it's already "..., L5", keeps it.
-    If it's just "...-L2", expands it.
-    """
-    if 'L1' in code_str and 'L5' in code_str:
-        return [c.strip() for c in code_str.split(',') if c.strip()]
-    
-    # Simple single expansion fallback (if CSV was NOT updated in previous run for some reason)
-    # But we saw it WAS updated. So usually we just parse.
-    codes = [c.strip() for c in code_str.split(',') if c.strip()]
-    return codes
+import sys
+from supabase_client import get_client, scan_table
+from question_loader import QuestionCsv
+from content_matcher import ContentMatcher, assign_unique
+from csv_transform import transform_csv
+from profiling import phase, file_bytes, enable_from_argv
+
+INDEX_COLUMNS = 'id,q_id,type,content,code_names'
 
 def cleanup_bad_rows(supabase):
     print("🧹 Cleaning up rows with empty q_id...")
@@ -46,95 +37,119 @@ def cleanup_bad_rows(supabase):
     except Exception as e:
         print(f"  ! Error cleaning nulls: {e}")
 
-def fix_file(csv_path, quiz_type, supabase):
+def build_content_index(supabase):
+    """
+    Pull the (id, q_id, type, content, code_names) projection once (keyset pages on id)
+    into a ContentMatcher (exact canonical key + trigram index).
+    """
+    with phase('build_content_index') as p:
+        matcher = ContentMatcher(scan_table(supabase, INDEX_COLUMNS, key='id'))
+        p.add(rows=len(matcher))
+    print(f"  -> Indexed {len(matcher)} server rows ({len(matcher.exact)} distinct type/content keys).")
+    return matcher
+
+def match_rows(csv_path, matcher, q_type):
+    """Look up every CSV row (file order) and keep one row per server q_id."""
+    with QuestionCsv(csv_path) as source:
+        return assign_unique([matcher.match(row.get('content'), q_type) for row in source])
+
+def reconcile_row(row, match, result, apply_fuzzy=False):
+    """
+    Copy the server's q_id/Order and code names (source of truth) into a CSV row if
+    `match` links it; fuzzy links only with apply_fuzzy. Outcomes are tallied in
+    `result`: {'matched': n, 'fuzzy': [(row, db_row, score)], 'unmatched': [(row, best_score)],
+     'ambiguous': [(row, db_rows)]}. Several server rows sharing one q_id count as one.
+    """
+    if match.method == 'ambiguous':
+        result['ambiguous'].append((row, match.candidates))
+        return row
+    if not match:
+        result['unmatched'].append((row, match.score))
+        return row
+
+    db_row = match.row
+    if match.method == 'fuzzy':
+        result['fuzzy'].append((dict(row), db_row, match.score))
+        if not apply_fuzzy:
+            return row
+    result['matched'] += 1
+
+    # Update CSV with Supabase Data (Source of Truth)
+    valid_qid = db_row.get('q_id')
+    db_codes = db_row.get('code_names')
+    row['q_id'] = valid_qid
+    row['Order'] = valid_qid
+
+    if db_codes and isinstance(db_codes, list):
+        # Join list back to string for CSV
+        row['CodeName'] = ",".join(db_codes)
+    return row
+
+def fix_file(csv_path, quiz_type, supabase, index=None, apply_fuzzy=False):
     if not os.path.exists(csv_path):
         return
 
     print(f"\nProcessing {csv_path}...")
-    updated_rows = []
-    
-    # Read entire file content first to fix header typo manually if needed
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        content_txt = f.read()
-    
-    if '스CodeName' in content_txt:
-        print("  ! Fixing header typo '스CodeName'...")
-        content_txt = content_txt.replace('스CodeName', 'CodeName')
-        
-    # Re-parse as CSV
-    from io import StringIO
-    f = StringIO(content_txt)
-    reader = csv.DictReader(f)
-    fieldnames = reader.fieldnames
-    
-    if not fieldnames:
-        print("  ! Empty file or invalid csv")
-        return
 
-    if 'CodeName' not in fieldnames and '스CodeName' in fieldnames:
-         # Should have been fixed by string replace, but just in case
-         fieldnames = ['CodeName' if x == '스CodeName' else x for x in fieldnames]
+    with QuestionCsv(csv_path) as source:
+        if not source.fieldnames:
+            print("  ! Empty file or invalid csv")
+            return
+        if source.repaired:
+            # transform_csv reads through the same loader, so the typo is fixed on save
+            print(f"  ! Fixing header typo {source.repaired[0][0]!r}...")
 
-    if 'q_id' not in fieldnames:
-        fieldnames.append('q_id')
-        
-    rows = list(reader)
-    match_count = 0
-    
-    for row in rows:
-        content = row.get('content', '').strip()
-        
-        # Find in Supabase by CONTENT
-        try:
-            # We select ID, Q_ID, and CODE_NAMES to be the SOURCE OF TRUTH
-            res = supabase.table('questions').select('id, q_id, code_names').eq('content', content).eq('type', 'T' if quiz_type=='Truth' else 'B').execute()
-            
-            if res.data:
-                # MATCH FOUND
-                db_row = res.data[0]
-                valid_qid = db_row.get('q_id')
-                db_codes = db_row.get('code_names')
-                
-                # 1. Update CSV with Supabase Data (Source of Truth)
-                row['q_id'] = valid_qid
-                row['Order'] = valid_qid
-                
-                if db_codes and isinstance(db_codes, list):
-                    # Join list back to string for CSV
-                    row['CodeName'] = ",".join(db_codes)
-                
-                match_count += 1
-            else:
-                print(f"  [WARN] No match for content: {content[:20]}...")
-                
-        except Exception as e:
-            print(f"  ! Error processing row: {e}")
-
-        updated_rows.append(row)
-
-    print(f"  -> Matched and synced {match_count} / {len(rows)} rows from Supabase.")
-    
-    # Save back
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(updated_rows)
+    # Match every row locally against one server snapshot (no per-row requests),
+    # then settle rows competing for the same q_id before anything is written
+    if index is None:
+        index = build_content_index(supabase)
+    q_type = 'T' if quiz_type == 'Truth' else 'B'
+    with phase('fix_file.match'):
+        matches = iter(match_rows(csv_path, index, q_type))
+    result = {'matched': 0, 'fuzzy': [], 'unmatched': [], 'ambiguous': []}
+
+    def link(row):
+        return reconcile_row(row, next(matches), result, apply_fuzzy)
+
+    # Stream the rows through the matcher; the file is replaced atomically at the end
+    with phase('fix_file', bytes=file_bytes(csv_path)) as p:
+        stats = transform_csv(csv_path, [link], add_fields=('q_id',))
+        p.add(rows=stats.rows_in)
+
+    label = 'FUZZY' if apply_fuzzy else 'FUZZY, not applied'
+    for row, db_row, score in result['fuzzy']:
+        print(f"  [{label} {score:.2f}] {row.get('content', '').strip()[:20]}... -> {db_row.get('q_id')}: "
+              f"{(db_row.get('content') or '').strip()[:20]}...")
+    for row, score in result['unmatched']:
+        print(f"  [WARN] No match for content (best {score:.2f}): {row.get('content', '').strip()[:20]}...")
+    for row, candidates in result['ambiguous']:
+        q_ids = ", ".join(sorted(str(c.get('q_id')) for c in candidates))
+        print(f"  [WARN] Ambiguous content ({q_ids}): {row.get('content', '').strip()[:20]}...")
+
+    print(f"  -> Linked {result['matched']}, fuzzy {len(result['fuzzy'])}"
+          f"{'' if apply_fuzzy else ' (review, then rerun with --apply-fuzzy)'}, "
+          f"unmatched {len(result['unmatched'])}, ambiguous {len(result['ambiguous'])} / {stats.rows_in} rows; "
+          f"{stats.changed} rows updated{' (file not rewritten)' if stats.overlong else ''}.")
 
 def main():
-    env = load_env()
-    url = env.get('SUPABASE_URL')
-    key = env.get('SUPABASE_SERVICE_ROLE_KEY') or env.get('SUPABASE_ANON_KEY')
-    
-    if not url or not key:
-        print("Missing Credentials")
+    # --profile / --profile=cprofile: per-phase timing and memory report (profiling.py)
+    enable_from_argv()
+    apply_fuzzy = '--apply-fuzzy' in sys.argv
+
+    try:
+        supabase = get_client()
+    except RuntimeError as e:
+        print(f"Missing Credentials: {e}")
         return
-        
-    supabase = create_client(url, key)
     
     cleanup_bad_rows(supabase)
-    
-    fix_file('doc/Restored_BalanceQuizData.csv', 'Balance', supabase)
-    fix_file('doc/Restored_TruthQuizData.csv', 'Truth', supabase)
+
+    # One snapshot of the server serves both files
+    print("\n📥 Indexing server questions...")
+    index = build_content_index(supabase)
+
+    fix_file('doc/Restored_BalanceQuizData.csv', 'Balance', supabase, index, apply_fuzzy)
+    fix_file('doc/Restored_TruthQuizData.csv', 'Truth', supabase, index, apply_fuzzy)
     
     print("\n✅ Integrity Fix Complete.")
 
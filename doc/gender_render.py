@@ -0,0 +1,245 @@
+"""
+Precompiled gender-variant rendering table.
+
+Every turn the app re-resolves a question's text for the attacker/defender gender
+pair and the UI language (GameSession.getLocalizedContent / _resolveQuestionText):
+
+    text = content_en if lang == 'en' and content_en else content
+    variant = (gender_variants_en if lang == 'en' else gender_variants)['var_{attacker}_{defender}']
+    text = variant if variant else text
+
+resolve() is the Python reference of that logic. compile_table() runs it once per
+question for all 8 slots (4 gender pairs x ko/en) and stores the result as a
+deduplicated string table plus one row of 8 string indices per q_id, so a render is
+two list lookups.
+
+    python doc/gender_render.py                        # Supabase -> doc/build/gender_render.json
+    python doc/gender_render.py --mirror --bench
+    python doc/gender_render.py --csv doc/TruthQuizData_v2.csv:Truth doc/BalanceQuizData_v2.csv:Balance
+
+Output format (version 1):
+    {"version": 1, "slots": ["ko:var_m_f", ...], "ids": [q_id, ...],
+     "strings": [...], "table": [row0 slot0, row0 slot1, ..., row1 slot0, ...]}
+"""
+import os
+import json
+import time
+import random
+import argparse
+
+from question_loader import VARIANT_KEYS, iter_payloads
+
+LANGS = ('ko', 'en')
+SLOTS = tuple(f"{lang}:{key}" for lang in LANGS for key in VARIANT_KEYS)
+SLOT_COUNT = len(SLOTS)
+SOURCE_COLUMNS = 'q_id,content,content_en,gender_variants,gender_variants_en'
+DEFAULT_OUT = 'doc/build/gender_render.json'
+FORMAT_VERSION = 1
+
+
+def norm_gender(gender):
+    """'f…'/'female' -> 'f', anything else (including empty) -> 'm', as in the app."""
+    if not gender:
+        return 'm'
+    return 'f' if gender.lower().startswith('f') else 'm'
+
+
+_SLOT_OF = {(key.split('_')[1], key.split('_')[2], lang): i
+            for i, (lang, key) in enumerate((lang, key) for lang in LANGS for key in VARIANT_KEYS)}
+
+
+def slot_index(attacker, defender, lang='ko'):
+    """Slot number for a turn; unknown languages fall back to 'ko'."""
+    a, d = norm_gender(attacker), norm_gender(defender)
+    slot = _SLOT_OF.get((a, d, lang))
+    return _SLOT_OF[(a, d, 'ko')] if slot is None else slot
+
+
+def _variants(value):
+    # JSONB comes back as a dict; older rows / CSV exports may hold a JSON string
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else {}
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def resolve(row, attacker, defender, lang='ko'):
+    """Reference renderer: the text the app shows for this question and turn."""
+    text = row.get('content') or ''
+    is_en = lang == 'en'
+    if is_en and row.get('content_en'):
+        text = row['content_en']
+    variants = _variants(row.get('gender_variants_en' if is_en else 'gender_variants'))
+    variant = variants.get(f"var_{norm_gender(attacker)}_{norm_gender(defender)}")
+    if variant:
+        text = str(variant)
+    return text
+
+
+class RenderTable:
+    """q_id x 8 slots -> resolved text, backed by a deduplicated string table."""
+
+    def __init__(self, ids, strings, table):
+        self.ids = ids
+        self.strings = strings
+        self.table = table
+        self.rows = {q_id: i * SLOT_COUNT for i, q_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def text(self, q_id, attacker, defender, lang='ko'):
+        return self.strings[self.table[self.rows[q_id] + slot_index(attacker, defender, lang)]]
+
+    def slot_text(self, q_id, slot):
+        """Lookup with a precomputed slot number (what a render loop would cache per game)."""
+        return self.strings[self.table[self.rows[q_id] + slot]]
+
+    def to_json(self):
+        return json.dumps({
+            'version': FORMAT_VERSION,
+            'slots': list(SLOTS),
+            'ids': self.ids,
+            'strings': self.strings,
+            'table': self.table,
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        if data.get('version') != FORMAT_VERSION or tuple(data.get('slots', ())) != SLOTS:
+            raise ValueError("Unsupported gender render table format")
+        return cls(data['ids'], data['strings'], data['table'])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_json(f.read())
+
+
+def compile_table(rows):
+    """Resolve every slot of every row once. Later duplicates of a q_id are ignored."""
+    ids, strings, table = [], [], []
+    string_ids = {}
+    seen = set()
+    for row in rows:
+        q_id = row.get('q_id')
+        if not q_id or q_id in seen:
+            continue
+        seen.add(q_id)
+        ids.append(q_id)
+        for lang in LANGS:
+            for key in VARIANT_KEYS:
+                _, attacker, defender = key.split('_')
+                text = resolve(row, attacker, defender, lang)
+                index = string_ids.get(text)
+                if index is None:
+                    index = string_ids[text] = len(strings)
+                    strings.append(text)
+                table.append(index)
+    return RenderTable(ids, strings, table)
+
+
+def validate(render_table, rows):
+    """[(q_id, slot, expected, got)] for every slot where the table disagrees with resolve()."""
+    errors = []
+    seen = set()
+    for row in rows:
+        q_id = row.get('q_id')
+        # Same first-wins rule as compile_table
+        if not q_id or q_id in seen:
+            continue
+        seen.add(q_id)
+        if q_id not in render_table.rows:
+            errors.append((q_id, '*', 'row', 'missing'))
+            continue
+        for lang in LANGS:
+            for key in VARIANT_KEYS:
+                _, attacker, defender = key.split('_')
+                expected = resolve(row, attacker, defender, lang)
+                got = render_table.text(q_id, attacker, defender, lang)
+                if got != expected:
+                    errors.append((q_id, f"{lang}:{key}", expected, got))
+    return errors
+
+
+def benchmark(render_table, rows, turns=200000, seed=7):
+    """Time `turns` random renders through resolve() and through the table. Returns ns/render."""
+    rng = random.Random(seed)
+    by_id = {}
+    for row in rows:
+        if row.get('q_id'):
+            by_id.setdefault(row['q_id'], row)
+    q_ids = list(by_id)
+    genders = ('M', 'F', 'female', '')
+    picks = [(rng.choice(q_ids), rng.choice(genders), rng.choice(genders), rng.choice(LANGS))
+             for _ in range(turns)]
+
+    started = time.perf_counter()
+    for q_id, attacker, defender, lang in picks:
+        resolve(by_id[q_id], attacker, defender, lang)
+    raw = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for q_id, attacker, defender, lang in picks:
+        render_table.text(q_id, attacker, defender, lang)
+    compiled = time.perf_counter() - started
+
+    slots = [(q_id, slot_index(a, d, lang)) for q_id, a, d, lang in picks]
+    started = time.perf_counter()
+    for q_id, slot in slots:
+        render_table.slot_text(q_id, slot)
+    cached = time.perf_counter() - started
+
+    return {name: seconds / turns * 1e9 for name, seconds in
+            (('resolve', raw), ('table', compiled), ('table_cached_slot', cached))}
+
+
+def load_rows(args):
+    if args.csv:
+        rows = []
+        for spec in args.csv:
+            path, _, quiz_type = spec.partition(':')
+            rows.extend(iter_payloads(path, quiz_type or ('Truth' if 'Truth' in path else 'Balance')))
+        return rows
+    from mirror import client_for
+    from supabase_client import scan_table
+    return list(scan_table(client_for(['--mirror'] if args.mirror else []), SOURCE_COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precompiled gender-variant render table.")
+    parser.add_argument('--mirror', action='store_true', help="Read the local SQLite mirror")
+    parser.add_argument('--csv', nargs='+', metavar='PATH[:Truth|Balance]', help="Read CSV banks instead of a database")
+    parser.add_argument('--out', default=DEFAULT_OUT, help=f"Output JSON (default {DEFAULT_OUT})")
+    parser.add_argument('--bench', action='store_true', help="Benchmark table lookups against resolve()")
+    args = parser.parse_args()
+
+    rows = load_rows(args)
+    render_table = compile_table(rows)
+
+    errors = validate(render_table, rows)
+    for q_id, slot, expected, got in errors[:20]:
+        print(f"  ❌ {q_id} {slot}: expected {expected[:30]!r}, table has {got[:30]!r}")
+    if errors:
+        raise SystemExit(f"{len(errors)} slots disagree with the reference renderer; nothing written.")
+
+    render_table.save(args.out)
+    cells = len(render_table) * SLOT_COUNT
+    print(f"✅ {len(render_table)} questions, {cells} slots, {len(render_table.strings)} distinct strings "
+          f"-> {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
+
+    if args.bench:
+        result = benchmark(render_table, rows)
+        print(f"⏱  resolve(): {result['resolve']:.0f} ns/render, table: {result['table']:.0f} ns/render, "
+              f"table with cached slot: {result['table_cached_slot']:.0f} ns/render")
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,128 @@
 import os
-import csv
+import sys
 import json
-from supabase import create_client, Client
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from supabase_client import get_client, get_setting
+from batch_recovery import RejectLog, rejects_path_for, upsert_bisect
+from question_loader import iter_payloads, iter_records
+from profiling import phase, file_bytes, enable_from_argv
+from parallel_import import import_files
 
-# Configuration
-# Read from environment variables
-SUPABASE_URL = os.environ.get("NEXT_PUBLIC_SUPABASE_URL") or os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") # Prefer Service Role for admin tasks
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment.")
-    exit(1) 
+# Streaming import defaults
+STREAM_BATCH_SIZE = 200              # max rows per upsert request
+STREAM_BATCH_BYTES = 512 * 1024      # max JSON payload bytes per upsert request
+STREAM_MAX_IN_FLIGHT = 4             # concurrent upsert requests
 
 class SupabaseImporter:
-    def __init__(self, url, key):
-        self.supabase: Client = create_client(url, key)
+    def __init__(self, supabase=None):
+        # Shared pooled client (Service Role for admin tasks) unless one is injected
+        self.supabase = supabase or get_client()
 
     def import_csv(self, file_path, quiz_type):
         if not os.path.exists(file_path):
             print(f"File not found: {file_path}")
             return
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            rows_to_insert = []
-            
-            for row in reader:
-                data = self._prepare_row_data(row, quiz_type)
-                if data:
-                    rows_to_insert.append(data)
-            
+        with phase('import_csv', bytes=file_bytes(file_path)) as p:
+            rows_to_insert = list(iter_payloads(file_path, quiz_type))
+            p.add(rows=len(rows_to_insert))
+
             if rows_to_insert:
                 # Batch insert/upsert
                 try:
-                    # Using upsert with generic ID generation or mapping 'q_id' to legacy_id if needed
-                    # Assuming table 'questions' exists with columns: 
-                    # type, content, details (jsonb), code_names (text[]), legacy_q_id
-                    
-                    response = self.supabase.table('questions').upsert(rows_to_insert, on_conflict='q_id').execute()
+                    with phase('import_csv.upload', rows=len(rows_to_insert)):
+                        response = self.supabase.table('questions').upsert(rows_to_insert, on_conflict='q_id').execute()
                     print(f"Imported {len(response.data)} rows from {file_path}")
                 except Exception as e:
                     print(f"Error inserting batch: {e}")
 
-    def _prepare_row_data(self, row, quiz_type):
-        q_id = row.get('q_id', '').strip()
-        content = row.get('content', '').strip()
-        content_en = row.get('content_en', '').strip()
-        order = row.get('Order', '').strip()
-        
-        # Parse CodeNames
-        raw_codes = row.get('CodeName', '').split(',')
-        code_names = [c.strip() for c in raw_codes if c.strip()]
-        
-        details = {}
-        details_en = {}
-        
-        if quiz_type == 'Truth':
-            details['answers'] = row.get('answers', '')
-            details_en['answers'] = row.get('answers_en', '')
-        elif quiz_type == 'Balance':
-            details['choice_a'] = row.get('choice_a', '')
-            details['choice_b'] = row.get('choice_b', '')
-            details_en['choice_a'] = row.get('choice_a_en', '')
-            details_en['choice_b'] = row.get('choice_b_en', '')
-        
-        details['order'] = order 
-        if q_id:
-             details['legacy_q_id'] = q_id
-
-        # Parse Gender Variants (Korean)
-        gender_variants = {}
-        for key in ['var_m_f', 'var_f_m', 'var_m_m', 'var_f_f']:
-            val = row.get(key, '').strip()
-            if val: gender_variants[key] = val
-
-        # Parse Gender Variants (English)
-        gender_variants_en = {}
-        for key in ['var_m_f_en', 'var_f_m_en', 'var_m_m_en', 'var_f_f_en']:
-            # Store with simplified keys (e.g., 'var_m_f') inside the EN object, or keep detailed keys?
-            # Decision: Keep consistent logic. If app expects { "var_m_f": ... }, then details_en should mimic structure?
-            # BUT GameSession.dart parses `gender_variants` column. It doesn't look for `gender_variants_en` column yet!
-            # Wait, I proposed adding `gender_variants_en` column to DB.
-            # So I should populate it here.
-            # And keys inside should be `var_m_f` etc (without _en suffix) so the logic can be reused?
-            # "key.replace('_en', '')" -> 'var_m_f'
-            val = row.get(key, '').strip()
-            if val: 
-                clean_key = key.replace('_en', '')
-                gender_variants_en[clean_key] = val
-
-        return {
-            'q_id': q_id, 
-            'type': quiz_type.lower(),
-            'content': content,
-            'content_en': content_en,
-            'details': details, 
-            'details_en': details_en,
-            'code_names': code_names,
-            'gender_variants': gender_variants,
-            'gender_variants_en': gender_variants_en
-        }
+    def import_csv_streaming(self, file_path, quiz_type,
+                             batch_size=STREAM_BATCH_SIZE,
+                             max_batch_bytes=STREAM_BATCH_BYTES,
+                             max_in_flight=STREAM_MAX_IN_FLIGHT):
+        """
+        Streaming variant of import_csv.
+        Rows are parsed lazily and cut into batches (by row count and payload bytes).
+        Up to `max_in_flight` upserts run on a worker pool while the next batch is parsed,
+        and memory stays bounded. A failing batch is bisected so only its bad rows are
+        rejected (written to <file>.rejects.jsonl).
+        Returns (imported_rows, failed_rows).
+        """
+        if not os.path.exists(file_path):
+            print(f"File not found: {file_path}")
+            return 0, 0
+
+        print(f"Streaming {file_path} (batch={batch_size} rows / {max_batch_bytes // 1024}KB, in-flight={max_in_flight})...")
+        started = time.perf_counter()
+        imported = 0
+        failed = 0
+        pending = {}
+        rejects = RejectLog(rejects_path_for(file_path))
+
+        def upload(batch):
+            # Runs on the pool: time/rows only (see profiling.py)
+            with phase('import_csv_streaming.upload', rows=len(batch)):
+                return upsert_bisect(self.supabase, batch, rejects=rejects)
+
+        def collect(done):
+            nonlocal imported, failed
+            for future in done:
+                start, size = pending.pop(future)
+                try:
+                    written, rejected = future.result()
+                    imported += written
+                    failed += rejected
+                except Exception as e:
+                    failed += size
+                    print(f"  ! Error upserting rows {start}-{start + size - 1}: {e}")
+            elapsed = time.perf_counter() - started
+            rate = imported / elapsed if elapsed > 0 else 0.0
+            print(f"  > {imported} rows imported ({rate:.0f} rows/s)")
+
+        with phase('import_csv_streaming', bytes=file_bytes(file_path)) as p, \
+                ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            for start, batch in self._iter_batches(file_path, quiz_type, batch_size, max_batch_bytes):
+                p.add(rows=len(batch))
+                # Bound the number of requests in flight; parsing resumes as soon as one finishes
+                if len(pending) >= max_in_flight:
+                    with phase('import_csv_streaming.wait'):
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = pool.submit(upload, batch)
+                pending[future] = (start, len(batch))
+
+            if pending:
+                with phase('import_csv_streaming.wait'):
+                    done, _ = wait(pending)
+                collect(done)
+
+        elapsed = time.perf_counter() - started
+        print(f"Imported {imported} rows from {file_path} in {elapsed:.1f}s ({failed} failed)")
+        if rejects.count:
+            print(f"  ! Rejected rows written to {rejects.path}")
+        return imported, failed
+
+    def _iter_batches(self, file_path, quiz_type, batch_size, max_batch_bytes):
+        """Yield (first_row_index, rows) batches without reading the whole file."""
+        batch = []
+        batch_bytes = 0
+        start = 0
+        for index, record in enumerate(iter_records(file_path, quiz_type, require_q_id=False)):
+            if not record.q_id:
+                continue
+            data = record.payload()
+            row_bytes = len(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+            if batch and (len(batch) >= batch_size or batch_bytes + row_bytes > max_batch_bytes):
+                yield start, batch
+                batch = []
+                batch_bytes = 0
+            if not batch:
+                start = index
+            batch.append(data)
+            batch_bytes += row_bytes
+        if batch:
+            yield start, batch
 
 if __name__ == "__main__":
     try:
@@ -108,11 +131,26 @@ if __name__ == "__main__":
         print("Supabase client not found. Please install it using: pip install supabase")
         exit(1)
 
-    importer = SupabaseImporter(SUPABASE_URL, SUPABASE_KEY)
+    if not get_setting('url') or not get_setting('service'):
+        print("Error: SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set (environment, app/.env or app/assets/env_config).")
+        exit(1)
+
+    # --profile / --profile=cprofile: per-phase timing and memory report (profiling.py)
+    enable_from_argv()
 
-    # Import Truth Quiz
-    importer.import_csv('doc/TruthQuizData_v2.csv', 'Truth')
-    
-    # Import Balance Quiz
-    importer.import_csv('doc/BalanceQuizData_v2.csv', 'Balance')
+    files = [
+        ('doc/TruthQuizData_v2.csv', 'Truth'),
+        ('doc/BalanceQuizData_v2.csv', 'Balance'),
+    ]
+    importer = SupabaseImporter()
 
+    if '--serial' in sys.argv or '--stream' in sys.argv:
+        # --serial: one upsert per file; --stream: batched, pipelined upserts, one file at a time
+        import_file = importer.import_csv_streaming if '--stream' in sys.argv else importer.import_csv
+        for file_path, quiz_type in files:
+            import_file(file_path, quiz_type)
+    else:
+        # Default: all files at once (parse processes + shared upload pool, see parallel_import.py)
+        results = import_files(files, importer.supabase)
+        if not all(r.ok for r in results):
+            exit(1)
@@ -0,0 +1,221 @@
+"""
+Request-count and latency instrumentation for the Supabase client.
+
+RequestRecorder hooks into supabase_client.add_request_hook and records every
+PostgREST call: method, table or RPC, filter shape (column=operator, no values),
+request/response bytes, row count, status, retries and latency. The summary groups
+calls by (method, target), so round trips per script can be compared before and
+after a change.
+
+Set TALKBINGO_TRACE to record any doc/ script without editing it; get_client()
+turns the recorder on and the summary is printed and written when the script ends:
+
+    TALKBINGO_TRACE=1 python doc/fix_data_integrity.py                 # doc/build/traces/<script>-<time>.json
+    TALKBINGO_TRACE=/tmp/run.json python doc/fix_long_questions.py
+
+Or scope it in code:
+
+    with RequestRecorder() as recorder:
+        fix_file(...)
+    print(recorder.totals()['calls'])
+
+Only HTTP clients are seen; MirrorClient reads SQLite directly (use the PostgREST
+stand-in, doc/postgrest_stub.py, to trace a script offline).
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from datetime import datetime
+
+from supabase_client import add_request_hook, remove_request_hook
+
+TRACE_ENV = 'TALKBINGO_TRACE'
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build', 'traces')
+REST_PREFIX = '/rest/v1/'
+# Query parameters that shape the response rather than filter rows
+CONTROL_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+_active = None
+
+
+def describe(request):
+    """(kind, target, filters) for a PostgREST request: ('table', 'questions', ('q_id=in',))."""
+    path = request.url.path
+    name = path.split(REST_PREFIX, 1)[1] if REST_PREFIX in path else path
+    kind, target = ('rpc', name[4:]) if name.startswith('rpc/') else ('table', name)
+    filters = tuple(sorted(f"{key}={value.split('.', 1)[0]}" for key, value in request.url.params.multi_items()
+                           if key not in CONTROL_PARAMS))
+    return kind, target, filters
+
+
+def _request_bytes(request):
+    try:
+        return len(request.content)
+    except Exception:
+        # Streaming body that was never buffered
+        return 0
+
+
+def _row_count(request, response):
+    """Rows returned: from Content-Range ('0-49/*') when present, else the JSON body."""
+    if request.method == 'HEAD':
+        return 0
+    content_range = response.headers.get('content-range', '')
+    span = content_range.split('/', 1)[0]
+    if '-' in span:
+        lo, hi = span.split('-', 1)
+        if lo.isdigit() and hi.isdigit():
+            return int(hi) - int(lo) + 1
+    if span == '*' or not response.content:
+        return 0
+    try:
+        body = response.json()
+    except ValueError:
+        return 0
+    return len(body) if isinstance(body, list) else 1
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class RequestRecorder:
+    """Collects one record per HTTP request while registered (thread-safe)."""
+
+    def __init__(self):
+        self.calls = []
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def __call__(self, request, response, elapsed, attempts):
+        kind, target, filters = describe(request)
+        record = {
+            'method': request.method,
+            'kind': kind,
+            'target': target,
+            'filters': filters,
+            'status': response.status_code if response is not None else None,
+            'request_bytes': _request_bytes(request),
+            'response_bytes': len(response.content) if response is not None else 0,
+            'rows': _row_count(request, response) if response is not None and response.status_code < 400 else 0,
+            'ms': round(elapsed * 1000, 3),
+            'attempts': attempts,
+        }
+        with self._lock:
+            self.calls.append(record)
+
+    def start(self):
+        add_request_hook(self)
+        return self
+
+    def stop(self):
+        remove_request_hook(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def summary(self):
+        """[{'method', 'target', 'calls', 'errors', 'retries', 'rows', 'request_bytes',
+        'response_bytes', 'total_ms', 'p50_ms', 'p95_ms', 'max_ms', 'filters'}] by total time."""
+        with self._lock:
+            calls = list(self.calls)
+        groups = {}
+        for call in calls:
+            target = f"rpc/{call['target']}" if call['kind'] == 'rpc' else call['target']
+            groups.setdefault((call['method'], target), []).append(call)
+
+        out = []
+        for (method, target), group in groups.items():
+            times = sorted(c['ms'] for c in group)
+            shapes = {}
+            for c in group:
+                shape = '&'.join(c['filters']) or '(none)'
+                shapes[shape] = shapes.get(shape, 0) + 1
+            out.append({
+                'method': method,
+                'target': target,
+                'calls': len(group),
+                'errors': sum(1 for c in group if c['status'] is None or c['status'] >= 400),
+                'retries': sum(c['attempts'] - 1 for c in group),
+                'rows': sum(c['rows'] for c in group),
+                'request_bytes': sum(c['request_bytes'] for c in group),
+                'response_bytes': sum(c['response_bytes'] for c in group),
+                'total_ms': round(sum(times), 3),
+                'p50_ms': _percentile(times, 0.5),
+                'p95_ms': _percentile(times, 0.95),
+                'max_ms': times[-1],
+                'filters': shapes,
+            })
+        out.sort(key=lambda s: -s['total_ms'])
+        return out
+
+    def totals(self):
+        summary = self.summary()
+        keys = ('calls', 'errors', 'retries', 'rows', 'request_bytes', 'response_bytes', 'total_ms')
+        return {k: round(sum(s[k] for s in summary), 3) for k in keys}
+
+    def print_summary(self, out=None):
+        out = out or sys.stderr
+        summary = self.summary()
+        totals = self.totals()
+        print(f"\n📡 {totals['calls']} requests, {totals['rows']} rows, "
+              f"{totals['request_bytes'] / 1024:.1f} KiB up / {totals['response_bytes'] / 1024:.1f} KiB down, "
+              f"{totals['total_ms'] / 1000:.2f}s in flight", file=out)
+        for s in summary:
+            flags = f"  ({s['errors']} errors, {s['retries']} retries)" if s['errors'] or s['retries'] else ''
+            print(f"  {s['method']:<6} {s['target']:<32} {s['calls']:>6} calls {s['rows']:>8} rows "
+                  f"p50 {s['p50_ms']:8.1f} ms  p95 {s['p95_ms']:8.1f} ms  total {s['total_ms'] / 1000:7.2f}s{flags}",
+                  file=out)
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        report = {
+            'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            'argv': sys.argv[1:],
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'wall_s': round(time.time() - self.started, 3),
+            'totals': self.totals(),
+            'summary': self.summary(),
+            'calls': self.calls,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        return path
+
+
+def default_trace_path():
+    script = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ''))[0].strip('-') or 'python'
+    return os.path.join(TRACE_DIR, f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def enable(path=None):
+    """Record every request of this process; print and write the summary at exit. Idempotent."""
+    global _active
+    if _active is not None:
+        return _active
+    _active = RequestRecorder().start()
+    target = path or default_trace_path()
+
+    def finish():
+        _active.print_summary()
+        print(f"📝 Request trace -> {_active.write(target)}", file=sys.stderr)
+
+    atexit.register(finish)
+    return _active
+
+
+def enable_from_env():
+    """enable() if TALKBINGO_TRACE is set ('1'/'true' for the default path, else a file path)."""
+    value = os.environ.get(TRACE_ENV, '').strip()
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return None
+    return enable(None if value.lower() in ('1', 'true', 'yes') else value)
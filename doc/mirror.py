@@ -0,0 +1,386 @@
+"""
+Local SQLite mirror of the `questions` table for offline analysis.
+
+    python doc/mirror.py sync          # incremental (rows with newer updated_at)
+    python doc/mirror.py sync --full   # full refresh, also drops rows deleted on the server
+    python doc/mirror.py stats
+
+Incremental syncs rely on updated_at moving on every change
+(supabase/migrations/20261019_questions_updated_at_trigger.sql). Writes that slip
+past it (a server without the trigger, a transaction that commits after a later
+watermark was read) are caught by a fallback: a sync becomes full when the last full
+one is older than FULL_SYNC_DAYS, or when the mirror's row count no longer matches
+the server's after the incremental pass.
+
+Analyzers accept `--mirror` and then read from the mirror through MirrorClient,
+which answers the subset of the supabase-py query API they use
+(select / eq / in_ / overlaps / order / limit / range / execute).
+
+Side table `question_codes` holds one row per code_names element, so overlap
+queries are index lookups. The file lives in doc/.mirror/ (override with
+TALKBINGO_MIRROR) and needs no keys or network once synced.
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mirror', 'questions.sqlite')
+
+COLUMNS = ['q_id', 'id', 'type', 'content', 'content_en', 'details', 'details_en', 'code_names',
+           'gender_variants', 'gender_variants_en', 'is_published', 'content_hash', 'created_at', 'updated_at']
+JSON_COLUMNS = {'details', 'details_en', 'code_names', 'gender_variants', 'gender_variants_en'}
+SYNC_COLUMNS = ','.join(COLUMNS)
+# Columns added to SCHEMA after mirrors were first created (added in place by connect())
+ADDED_COLUMNS = {'content_hash': 'TEXT'}
+# Incremental syncs turn full once the last full sync is this old
+FULL_SYNC_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    q_id TEXT PRIMARY KEY,
+    id TEXT,
+    type TEXT,
+    content TEXT,
+    content_en TEXT,
+    details TEXT,
+    details_en TEXT,
+    code_names TEXT,
+    gender_variants TEXT,
+    gender_variants_en TEXT,
+    is_published INTEGER,
+    content_hash TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_questions_type ON questions (type);
+CREATE INDEX IF NOT EXISTS idx_questions_updated_at ON questions (updated_at);
+
+CREATE TABLE IF NOT EXISTS question_codes (
+    code TEXT NOT NULL,
+    q_id TEXT NOT NULL REFERENCES questions (q_id) ON DELETE CASCADE,
+    PRIMARY KEY (code, q_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_question_codes_q_id ON question_codes (q_id);
+
+CREATE TABLE IF NOT EXISTS mirror_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def mirror_path():
+    return os.environ.get('TALKBINGO_MIRROR') or DEFAULT_PATH
+
+
+def connect(path=None):
+    path = path or mirror_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.executescript(SCHEMA)
+    present = {row[1] for row in conn.execute('PRAGMA table_info(questions)')}
+    for column, kind in ADDED_COLUMNS.items():
+        if column not in present:
+            conn.execute(f'ALTER TABLE questions ADD COLUMN {column} {kind}')
+    return conn
+
+
+def _get_meta(conn, key):
+    row = conn.execute('SELECT value FROM mirror_meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO mirror_meta (key, value) VALUES (?, ?)', (key, value))
+
+
+def _encode(row):
+    values = []
+    for col in COLUMNS:
+        value = row.get(col)
+        if col in JSON_COLUMNS and value is not None and not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        elif col == 'is_published' and value is not None:
+            value = 1 if value else 0
+        values.append(value)
+    return values
+
+
+def _decode(row, columns):
+    out = {}
+    for col, value in zip(columns, row):
+        if col in JSON_COLUMNS and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        elif col == 'is_published' and value is not None:
+            value = bool(value)
+        out[col] = value
+    return out
+
+
+def store_rows(conn, rows):
+    """Upsert server rows (and their code index entries) into the mirror."""
+    placeholders = ','.join('?' for _ in COLUMNS)
+    count = 0
+    for row in rows:
+        q_id = row.get('q_id')
+        if not q_id:
+            continue
+        conn.execute(f"INSERT OR REPLACE INTO questions ({','.join(COLUMNS)}) VALUES ({placeholders})", _encode(row))
+        conn.execute('DELETE FROM question_codes WHERE q_id = ?', (q_id,))
+        codes = row.get('code_names') or []
+        conn.executemany('INSERT OR IGNORE INTO question_codes (code, q_id) VALUES (?, ?)',
+                         [(code, q_id) for code in codes])
+        count += 1
+    return count
+
+
+def server_count(supabase):
+    """Rows on the server the mirror can hold (q_id set)."""
+    query = supabase.table('questions').select('q_id', count='exact', head=True).not_.is_('q_id', 'null')
+    return query.execute().count or 0
+
+
+def full_sync_due(conn, now=None):
+    """True when no full sync is recorded within FULL_SYNC_DAYS."""
+    last = _get_meta(conn, 'full_synced_at')
+    if not last:
+        return True
+    now = now or datetime.now(timezone.utc)
+    return now - datetime.fromisoformat(last) > timedelta(days=FULL_SYNC_DAYS)
+
+
+def sync(supabase, conn=None, full=False):
+    """
+    Pull server changes into the mirror.
+    Incremental runs fetch rows with updated_at newer than the last sync; a full run
+    re-reads everything and removes rows that no longer exist on the server. An
+    incremental run falls back to a full one when one is due (FULL_SYNC_DAYS) or when
+    the row counts disagree afterwards.
+    """
+    from supabase_client import scan_table
+
+    conn = conn or connect()
+    if not full and _get_meta(conn, 'updated_at_watermark') and full_sync_due(conn):
+        print(f"🪞 Last full sync is more than {FULL_SYNC_DAYS} days old; running a full sync.")
+        full = True
+    watermark = None if full else _get_meta(conn, 'updated_at_watermark')
+    where = (lambda q: q.gt('updated_at', watermark)) if watermark else None
+
+    seen = set()
+    newest = watermark
+    fetched = 0
+    page = []
+    for row in scan_table(supabase, SYNC_COLUMNS, where=where):
+        page.append(row)
+        seen.add(row.get('q_id'))
+        if row.get('updated_at') and (newest is None or row['updated_at'] > newest):
+            newest = row['updated_at']
+        if len(page) >= 500:
+            fetched += store_rows(conn, page)
+            page = []
+    fetched += store_rows(conn, page)
+
+    removed = 0
+    now = datetime.now(timezone.utc).isoformat()
+    if not watermark:
+        stale = [q for (q,) in conn.execute('SELECT q_id FROM questions') if q not in seen]
+        conn.executemany('DELETE FROM questions WHERE q_id = ?', [(q,) for q in stale])
+        removed = len(stale)
+        _set_meta(conn, 'full_synced_at', now)
+
+    if newest:
+        _set_meta(conn, 'updated_at_watermark', newest)
+    _set_meta(conn, 'synced_at', now)
+    conn.commit()
+    mode = 'incremental' if watermark else 'full'
+    print(f"🪞 Mirror {mode} sync: {fetched} rows updated, {removed} removed -> {mirror_path()}")
+
+    if watermark:
+        local = conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+        remote = server_count(supabase)
+        if local != remote:
+            print(f"⚠️  Mirror holds {local} rows but the server has {remote}; running a full sync.")
+            more, removed = sync(supabase, conn, full=True)
+            fetched += more
+    return fetched, removed
+
+
+class MirrorResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class MirrorQuery:
+    """Read-only query builder over the mirror, shaped like supabase-py's."""
+
+    def __init__(self, conn, table):
+        if table != 'questions':
+            raise ValueError(f"Mirror only holds the 'questions' table (got '{table}')")
+        self._conn = conn
+        self._columns = COLUMNS
+        self._where = []
+        self._params = []
+        self._order = None
+        self._limit = None
+        self._offset = None
+        self._count = None
+        self._head = False
+
+    def select(self, columns='*', count=None, head=False):
+        if columns.strip() != '*':
+            self._columns = [c.strip() for c in columns.split(',') if c.strip()]
+            unknown = set(self._columns) - set(COLUMNS)
+            if unknown:
+                raise ValueError(f"Columns not in mirror: {sorted(unknown)}")
+        self._count = count
+        self._head = head
+        return self
+
+    def _column(self, name):
+        if name not in COLUMNS:
+            raise ValueError(f"Column not in mirror: {name}")
+        return name
+
+    def eq(self, column, value):
+        self._where.append(f"{self._column(column)} = ?")
+        self._params.append(value)
+        return self
+
+    def neq(self, column, value):
+        self._where.append(f"{self._column(column)} != ?")
+        self._params.append(value)
+        return self
+
+    def gt(self, column, value):
+        self._where.append(f"{self._column(column)} > ?")
+        self._params.append(value)
+        return self
+
+    def lte(self, column, value):
+        self._where.append(f"{self._column(column)} <= ?")
+        self._params.append(value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self._where.append(f"{self._column(column)} IN ({','.join('?' for _ in values)})" if values else '0')
+        self._params.extend(values)
+        return self
+
+    def is_(self, column, value):
+        if value in (None, 'null'):
+            self._where.append(f"{self._column(column)} IS NULL")
+        else:
+            self._where.append(f"{self._column(column)} = ?")
+            self._params.append(1 if value in (True, 'true') else 0)
+        return self
+
+    def overlaps(self, column, values):
+        if column != 'code_names':
+            raise ValueError("Mirror supports overlaps() on code_names only")
+        values = list(values)
+        marks = ','.join('?' for _ in values)
+        self._where.append(f"q_id IN (SELECT q_id FROM question_codes WHERE code IN ({marks}))" if values else '0')
+        self._params.extend(values)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = f"{self._column(column)} {'DESC' if desc else 'ASC'}"
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def range(self, start, end):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self):
+        where = f" WHERE {' AND '.join(self._where)}" if self._where else ''
+        count = None
+        if self._count:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM questions{where}", self._params).fetchone()[0]
+        if self._head:
+            return MirrorResponse([], count)
+
+        sql = f"SELECT {','.join(self._columns)} FROM questions{where}"
+        if self._order:
+            sql += f" ORDER BY {self._order}"
+        if self._limit is not None or self._offset is not None:
+            sql += f" LIMIT {int(self._limit if self._limit is not None else -1)} OFFSET {int(self._offset or 0)}"
+        rows = [_decode(r, self._columns) for r in self._conn.execute(sql, self._params)]
+        return MirrorResponse(rows, count)
+
+
+class MirrorClient:
+    """
+    Stand-in for a Supabase client that reads the local mirror.
+    Each thread gets its own connection, so parallel scanners (export_rows) can share it.
+    """
+
+    def __init__(self, path=None):
+        path = path or mirror_path()
+        if not os.path.exists(path):
+            raise RuntimeError(f"No mirror at {path}. Run: python doc/mirror.py sync")
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def table(self, name):
+        return MirrorQuery(self.conn, name)
+
+
+def client_for(argv=None):
+    """MirrorClient when `--mirror` is on the command line, else the shared Supabase client."""
+    argv = sys.argv if argv is None else argv
+    if '--mirror' in argv:
+        return MirrorClient()
+    from supabase_client import get_client
+    return get_client()
+
+
+def print_stats(conn):
+    total = conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+    print(f"Mirror: {mirror_path()}")
+    print(f"  rows: {total}")
+    for q_type, n in conn.execute('SELECT type, COUNT(*) FROM questions GROUP BY type ORDER BY type'):
+        print(f"  type {q_type}: {n}")
+    codes = conn.execute('SELECT COUNT(DISTINCT code) FROM question_codes').fetchone()[0]
+    print(f"  distinct codes: {codes}")
+    print(f"  synced_at: {_get_meta(conn, 'synced_at')}")
+    print(f"  full_synced_at: {_get_meta(conn, 'full_synced_at')}")
+    print(f"  updated_at watermark: {_get_meta(conn, 'updated_at_watermark')}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Local SQLite mirror of the questions table.")
+    parser.add_argument('command', choices=['sync', 'stats'])
+    parser.add_argument('--full', action='store_true', help="Full refresh (also prunes deleted rows)")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command == 'sync':
+        from supabase_client import get_client
+        sync(get_client(), conn, full=args.full)
+    print_stats(conn)
+
+if __name__ == "__main__":
+    main()
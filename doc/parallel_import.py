@@ -0,0 +1,368 @@
+"""
+Parallel multi-file import: parse CSVs in a process pool, upload from a thread pool.
+
+Every file is parsed in its own worker process (CSV reading, header repair and
+payload building are CPU-bound and would serialize on the GIL). Workers cut the
+payloads into batches (by rows and JSON bytes) and put them on one shared, bounded
+queue; when the queue is full, parsing pauses. The main process takes batches off the
+queue and hands them to a thread pool of uploaders. A global cap on requests in
+flight applies across all files, so adding files adds parse processes but never
+more load on the server. A failing batch is bisected (batch_recovery), and rejected
+rows go to the file's own <file>.rejects.jsonl. With a checkpoint.Checkpoint, every
+fully written batch is journaled and batches confirmed by an earlier, interrupted run
+are skipped.
+
+    python doc/parallel_import.py                                     # the v2 Truth + Balance banks
+    python doc/parallel_import.py doc/Restored_TruthQuizData.csv:Truth doc/Restored_BalanceQuizData.csv:Balance
+    python doc/parallel_import.py --max-in-flight 8 --batch-size 500 --profile
+
+From a script:
+
+    results = import_files([('doc/TruthQuizData_v2.csv', 'Truth'),
+                            ('doc/BalanceQuizData_v2.csv', 'Balance')], supabase)
+
+A reader is fn(path, quiz_type, emit) that calls emit(payload) for every row. It
+runs in the worker process, so it must be a module-level function. It may return a
+short note (str) that is shown in the file's result line. The default is
+read_payloads (question_loader.iter_payloads).
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from supabase_client import get_client
+from batch_recovery import RejectLog, rejects_path_for, upsert_bisect
+from question_loader import iter_payloads
+from checkpoint import file_sha256
+from profiling import phase, file_bytes, add_profile_argument, enable
+
+DEFAULT_FILES = [
+    ('doc/TruthQuizData_v2.csv', 'Truth'),
+    ('doc/BalanceQuizData_v2.csv', 'Balance'),
+]
+
+BATCH_SIZE = 200                # max rows per upsert request
+BATCH_BYTES = 512 * 1024        # max JSON payload bytes per upsert request
+MAX_IN_FLIGHT = 8               # concurrent upsert requests, all files together
+QUEUE_BATCHES_PER_SLOT = 2      # parsed batches waiting per in-flight slot
+PROGRESS_INTERVAL = 2.0         # seconds between progress lines per file
+POLL_SECONDS = 0.5
+
+# Spawned (not forked) workers: the main process already runs HTTP pool threads
+_CONTEXT = multiprocessing.get_context('spawn')
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+class FileResult:
+    """Per-file progress and outcome, updated while the import runs."""
+
+    __slots__ = ('path', 'quiz_type', 'key', 'parsed', 'imported', 'skipped', 'failed', 'batches', 'parsing',
+                 'error', 'note', 'parse_seconds', 'started', 'finished', 'rejects', 'last_report')
+
+    def __init__(self, path, quiz_type):
+        self.path = path
+        self.quiz_type = quiz_type
+        self.key = None
+        self.parsed = 0
+        self.imported = 0
+        self.skipped = 0
+        self.failed = 0
+        self.batches = 0
+        self.parsing = True
+        self.error = None
+        self.note = None
+        self.parse_seconds = 0.0
+        self.started = time.perf_counter()
+        self.finished = None
+        self.rejects = RejectLog(rejects_path_for(path))
+        self.last_report = 0.0
+
+    @property
+    def label(self):
+        return f"{self.quiz_type}:{os.path.basename(self.path)}"
+
+    @property
+    def ok(self):
+        return self.error is None and self.failed == 0
+
+    def __repr__(self):
+        return (f"FileResult({self.path!r}, parsed={self.parsed}, imported={self.imported}, "
+                f"skipped={self.skipped}, failed={self.failed}, error={self.error!r})")
+
+
+def read_payloads(path, quiz_type, emit):
+    """Default reader: the canonical payloads of question_loader."""
+    for payload in iter_payloads(path, quiz_type):
+        emit(payload)
+
+
+def _put(shared, stop, message):
+    # Blocks while the queue is full (back-pressure), but gives up once the import is cancelled
+    while True:
+        if stop.is_set():
+            raise ImportCancelled()
+        try:
+            shared.put(message, timeout=POLL_SECONDS)
+            return
+        except queue.Full:
+            pass
+
+
+def parse_file(index, path, quiz_type, reader, shared, stop, batch_size, max_batch_bytes):
+    """Worker process: run `reader` over one file and queue its payloads in batches."""
+    started = time.perf_counter()
+    batch = []
+    batch_bytes = 0
+    start = 0
+    parsed = 0
+
+    def emit(payload):
+        nonlocal batch, batch_bytes, start, parsed
+        row_bytes = len(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        if batch and (len(batch) >= batch_size or batch_bytes + row_bytes > max_batch_bytes):
+            _put(shared, stop, ('batch', index, start, batch))
+            batch = []
+            batch_bytes = 0
+        if not batch:
+            start = parsed
+        batch.append(payload)
+        batch_bytes += row_bytes
+        parsed += 1
+
+    try:
+        note = reader(path, quiz_type, emit)
+        if batch:
+            _put(shared, stop, ('batch', index, start, batch))
+        _put(shared, stop, ('done', index, parsed, time.perf_counter() - started, note))
+    except ImportCancelled:
+        pass
+    except Exception as e:
+        _put(shared, stop, ('error', index, parsed, time.perf_counter() - started, f"{type(e).__name__}: {e}"))
+
+
+def _load_file(path, quiz_type):
+    return list(iter_payloads(path, quiz_type))
+
+
+def load_files(files, processes=None):
+    """Parse every (path, quiz_type) in a process pool; returns one payload list per file."""
+    present = [(path, quiz_type) for path, quiz_type in files if os.path.exists(path)]
+    for path, _ in files:
+        if not os.path.exists(path):
+            print(f"File not found: {path}")
+    if not present:
+        return [[] for _ in files]
+
+    workers = processes or min(len(present), os.cpu_count() or 1)
+    with phase('load_files', bytes=sum(file_bytes(path) for path, _ in present)) as p, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=_CONTEXT) as pool:
+        loaded = dict(zip(present, pool.map(_load_file, *zip(*present))))
+        p.add(rows=sum(len(payloads) for payloads in loaded.values()))
+
+    out = []
+    for path, quiz_type in files:
+        payloads = loaded.get((path, quiz_type), [])
+        if (path, quiz_type) in loaded:
+            print(f"Read {len(payloads)} rows from {path}.")
+        out.append(payloads)
+    return out
+
+
+def _report(result, force=False):
+    now = time.perf_counter()
+    if not force and now - result.last_report < PROGRESS_INTERVAL:
+        return
+    result.last_report = now
+    state = 'parsing' if result.parsing else f"{result.parsed} parsed"
+    skipped = f", {result.skipped} already done" if result.skipped else ''
+    print(f"  > [{result.label}] {result.imported} imported{skipped}, {result.failed} failed ({state}, "
+          f"{now - result.started:.1f}s)")
+
+
+def print_results(results, elapsed):
+    imported = sum(r.imported for r in results)
+    skipped = sum(r.skipped for r in results)
+    failed = sum(r.failed for r in results)
+    resumed = f", {skipped} skipped (checkpoint)" if skipped else ''
+    print(f"\n📊 {len(results)} files, {imported} rows imported{resumed}, {failed} failed in {elapsed:.1f}s")
+    for r in results:
+        took = f"{r.finished - r.started:.1f}s" if r.finished else '-'
+        mark = '✅' if r.ok else '❌'
+        print(f"  {mark} {r.path}: {r.parsed} parsed, {r.imported} imported, {r.skipped} skipped, {r.failed} failed "
+              f"(parse {r.parse_seconds:.1f}s, done {took})")
+        if r.note:
+            print(f"     {r.note}")
+        if r.error:
+            print(f"     ! {r.error}")
+        if r.rejects.count:
+            print(f"     ! {r.rejects.count} rows rejected -> {r.rejects.path}")
+
+
+def import_files(files, supabase, reader=read_payloads, batch_size=BATCH_SIZE, max_batch_bytes=BATCH_BYTES,
+                 max_in_flight=MAX_IN_FLIGHT, processes=None, queue_batches=None, checkpoint=None):
+    """
+    Import several (path, quiz_type) CSVs at once. Returns one FileResult per file, in
+    order. Missing files are reported and skipped (error='not found'). With a
+    `checkpoint`, confirmed batches are journaled and skipped on a rerun.
+    """
+    started = time.perf_counter()
+    results = [FileResult(path, quiz_type) for path, quiz_type in files]
+    jobs = []
+    for index, result in enumerate(results):
+        if os.path.exists(result.path):
+            jobs.append(index)
+            if checkpoint is not None:
+                result.key = file_sha256(result.path)
+        else:
+            print(f"File not found: {result.path}")
+            result.parsing = False
+            result.error = 'not found'
+    if not jobs:
+        return results
+
+    workers = processes or min(len(jobs), os.cpu_count() or 1)
+    queue_batches = queue_batches or max_in_flight * QUEUE_BATCHES_PER_SLOT
+    print(f"Importing {len(jobs)} files ({workers} parse processes, batch={batch_size} rows / "
+          f"{max_batch_bytes // 1024}KB, in-flight={max_in_flight})...")
+    if checkpoint is not None and checkpoint.resumed:
+        print(f"Resuming from {checkpoint.path}: {checkpoint.describe()}")
+
+    # Global in-flight cap: a batch leaves the queue only when an upload slot is free
+    slots = threading.BoundedSemaphore(max_in_flight)
+    lock = threading.Lock()
+
+    def upload(result, start, batch):
+        try:
+            with phase('parallel_import.upload', rows=len(batch)):
+                written, rejected = upsert_bisect(supabase, batch, rejects=result.rejects)
+        except Exception as e:
+            written, rejected = 0, len(batch)
+            print(f"  ! [{result.label}] Error upserting rows {start}-{start + len(batch) - 1}: {e}")
+        if checkpoint is not None and rejected == 0:
+            checkpoint.record(result.key, start, start + len(batch), result.path)
+        with lock:
+            result.imported += written
+            result.failed += rejected
+            result.batches -= 1
+            finish = not result.parsing and result.batches == 0
+            if finish:
+                result.finished = time.perf_counter()
+            _report(result, force=finish)
+
+    def release(_):
+        slots.release()
+
+    with phase('parallel_import', bytes=sum(file_bytes(results[i].path) for i in jobs)) as p, \
+            _CONTEXT.Manager() as manager, \
+            ThreadPoolExecutor(max_workers=max_in_flight) as uploaders:
+        shared = manager.Queue(maxsize=queue_batches)
+        stop = manager.Event()
+        open_files = set(jobs)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_CONTEXT) as parsers:
+            try:
+                futures = {parsers.submit(parse_file, i, results[i].path, results[i].quiz_type, reader, shared,
+                                          stop, batch_size, max_batch_bytes): i for i in jobs}
+                while open_files:
+                    try:
+                        with phase('parallel_import.wait'):
+                            message = shared.get(timeout=POLL_SECONDS)
+                    except queue.Empty:
+                        # A worker that died without a last message (crash, unpicklable reader)
+                        for future, i in futures.items():
+                            if i in open_files and future.done() and future.exception():
+                                results[i].error = f"parse worker failed: {future.exception()!r}"
+                                with lock:
+                                    results[i].parsing = False
+                                    if results[i].batches == 0:
+                                        results[i].finished = time.perf_counter()
+                                open_files.discard(i)
+                        continue
+
+                    kind, i = message[0], message[1]
+                    result = results[i]
+                    if kind == 'batch':
+                        start, batch = message[2], message[3]
+                        p.add(rows=len(batch))
+                        if checkpoint is not None and checkpoint.covered(result.key, start, start + len(batch)):
+                            result.skipped += len(batch)
+                            continue
+                        with phase('parallel_import.wait'):
+                            slots.acquire()
+                        with lock:
+                            result.batches += 1
+                        uploaders.submit(upload, result, start, batch).add_done_callback(release)
+                        continue
+
+                    parsed, result.parse_seconds = message[2], message[3]
+                    if kind == 'done':
+                        result.note = message[4]
+                        if checkpoint is not None:
+                            # A reader that rewrote its input (fix_and_import's backup) gives the
+                            # same payloads on a rerun; journal the new hash as the old one
+                            checkpoint.alias(file_sha256(result.path), result.key, result.path)
+                    else:
+                        result.error = message[4]
+                        print(f"  ! [{result.label}] Parse failed after {parsed} rows: {result.error}")
+                    with lock:
+                        result.parsed = parsed
+                        result.parsing = False
+                        if result.batches == 0:
+                            result.finished = time.perf_counter()
+                            _report(result, force=True)
+                    open_files.discard(i)
+            except BaseException:
+                # Unblock workers waiting on a full queue before the pool shuts down
+                stop.set()
+                raise
+
+    print_results(results, time.perf_counter() - started)
+    return results
+
+
+def parse_file_arg(value):
+    path, _, quiz_type = value.rpartition(':')
+    if not path or not quiz_type:
+        raise argparse.ArgumentTypeError(f"expected PATH:TYPE (e.g. doc/TruthQuizData_v2.csv:Truth), got {value!r}")
+    return path, quiz_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import question CSVs in parallel (process-pool parsing, "
+                                                 "thread-pool uploads).")
+    parser.add_argument('files', nargs='*', type=parse_file_arg,
+                        help="PATH:TYPE pairs (default: the v2 Truth and Balance banks)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f"Rows per upsert (default {BATCH_SIZE})")
+    parser.add_argument('--batch-kb', type=int, default=BATCH_BYTES // 1024,
+                        help=f"Max KB per upsert (default {BATCH_BYTES // 1024})")
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT,
+                        help=f"Concurrent upsert requests over all files (default {MAX_IN_FLIGHT})")
+    parser.add_argument('--processes', type=int, help="Parse processes (default one per file, up to the CPU count)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable(args.profile)
+
+    try:
+        supabase = get_client()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    results = import_files(args.files or DEFAULT_FILES, supabase, batch_size=args.batch_size,
+                           max_batch_bytes=args.batch_kb * 1024, max_in_flight=args.max_in_flight,
+                           processes=args.processes)
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
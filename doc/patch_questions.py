@@ -0,0 +1,211 @@
+"""
+Declarative, batched patches for the `questions` table.
+
+A patch file lists edits per q_id; keys are columns or JSONB paths (`details.choice_a`).
+All targeted rows are fetched with one `in_('q_id', ...)` query per 200 ids, edits are
+merged in memory, and the result goes back as one bulk upsert. Every payload carries
+the same full column set (WRITE_COLUMNS, from the fetched row) plus a recomputed
+content_hash: a bulk upsert writes NULL into any listed column a row lacks, and the
+diff-sync (sync_questions.py) must see the patched content.
+
+JSON / YAML:
+    [
+      {"q_id": "B26-00337", "set": {"details.choice_a": "길에서 본 SNS 친구"}},
+      {"q_id": "T26-00362", "set": {"content_en": "..."}, "expect": {"content_en": "old text"}}
+    ]
+CSV (header required):
+    q_id,path,value,expect
+
+`expect` (optional) is checked against the fetched snapshot; mismatching rows are
+reported as conflicts and skipped unless --force.
+
+    python doc/patch_questions.py doc/patches/20260201_long_questions.json --dry-run
+"""
+import os
+import csv
+import json
+import argparse
+
+from batch_recovery import upsert_bisect
+from sync_questions import row_content_hash
+
+EDITABLE_COLUMNS = {'content', 'content_en', 'details', 'details_en', 'code_names',
+                    'gender_variants', 'gender_variants_en', 'is_published'}
+JSON_COLUMNS = {'details', 'details_en', 'gender_variants', 'gender_variants_en'}
+# Always sent with an upsert so the INSERT half of ON CONFLICT satisfies NOT NULL columns
+REQUIRED_COLUMNS = ('q_id', 'type', 'content')
+# Fetched and written back for every patched row, so all payloads share one key set
+WRITE_COLUMNS = REQUIRED_COLUMNS + tuple(sorted(EDITABLE_COLUMNS - set(REQUIRED_COLUMNS)))
+FETCH_CHUNK = 200
+WRITE_CHUNK = 500
+
+_MISSING = object()
+
+
+def _split_path(path):
+    parts = path.split('.')
+    column = parts[0]
+    if column not in EDITABLE_COLUMNS:
+        raise ValueError(f"Column '{column}' is not editable by patches")
+    if len(parts) > 1 and column not in JSON_COLUMNS:
+        raise ValueError(f"'{path}': only JSONB columns take a path")
+    return column, parts[1:]
+
+
+def load_patch(path):
+    """Read a patch file into {q_id: [(path, value, expect), ...]} (expect may be _MISSING)."""
+    ext = os.path.splitext(path)[1].lower()
+    edits = {}
+
+    def add(q_id, key, value, expect=_MISSING):
+        _split_path(key)
+        edits.setdefault(q_id.strip(), []).append((key, value, expect))
+
+    if ext == '.csv':
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                expect = row.get('expect')
+                add(row['q_id'], row['path'], row['value'], expect if expect not in (None, '') else _MISSING)
+        return edits
+
+    with open(path, 'r', encoding='utf-8') as f:
+        if ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("YAML patches need PyYAML: pip install pyyaml")
+            entries = yaml.safe_load(f) or []
+        else:
+            entries = json.load(f)
+
+    for entry in entries:
+        expect = entry.get('expect') or {}
+        for key, value in (entry.get('set') or {}).items():
+            add(entry['q_id'], key, value, expect.get(key, _MISSING))
+    return edits
+
+
+def get_path(row, path):
+    column, keys = _split_path(path)
+    value = row.get(column)
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def set_path(row, path, value):
+    column, keys = _split_path(path)
+    if not keys:
+        row[column] = value
+        return
+    node = row.get(column)
+    if not isinstance(node, dict):
+        node = {}
+        row[column] = node
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def fetch_rows(supabase, q_ids, columns=WRITE_COLUMNS):
+    """{q_id: row} for the targeted ids, one in_() request per FETCH_CHUNK ids."""
+    rows = {}
+    q_ids = sorted(q_ids)
+    select = ','.join(sorted(set(REQUIRED_COLUMNS) | set(columns)))
+    for i in range(0, len(q_ids), FETCH_CHUNK):
+        res = supabase.table('questions').select(select).in_('q_id', q_ids[i:i + FETCH_CHUNK]).execute()
+        for row in res.data or []:
+            rows[row['q_id']] = row
+    return rows
+
+
+def apply_edits(snapshot, edits):
+    """
+    Merge edits into copies of the fetched rows.
+    Returns (payloads, diffs, conflicts, missing):
+      diffs:     [(q_id, path, old, new)] for values that actually change
+      conflicts: [(q_id, path, expected, actual)]
+    """
+    payloads, diffs, conflicts, missing = [], [], [], []
+    for q_id, row_edits in edits.items():
+        current = snapshot.get(q_id)
+        if current is None:
+            missing.append(q_id)
+            continue
+
+        row_conflicts = [(q_id, path, expect, get_path(current, path))
+                         for path, _, expect in row_edits
+                         if expect is not _MISSING and get_path(current, path) != expect]
+        if row_conflicts:
+            conflicts.extend(row_conflicts)
+            continue
+
+        updated = json.loads(json.dumps(current))   # deep copy of JSON data
+        touched = set()
+        for path, value, _ in row_edits:
+            old = get_path(updated, path)
+            if old == value:
+                continue
+            set_path(updated, path, value)
+            touched.add(_split_path(path)[0])
+            diffs.append((q_id, path, old, value))
+
+        if touched:
+            payload = {k: updated.get(k) for k in WRITE_COLUMNS}
+            payload['content_hash'] = row_content_hash(payload)
+            payloads.append(payload)
+    return payloads, diffs, conflicts, missing
+
+
+def print_report(diffs, conflicts, missing):
+    for q_id, path, old, new in diffs:
+        print(f"  ~ {q_id} {path}: {old!r} -> {new!r}")
+    for q_id, path, expected, actual in conflicts:
+        print(f"  ! CONFLICT {q_id} {path}: expected {expected!r}, server has {actual!r}")
+    for q_id in missing:
+        print(f"  ❌ ID not found: {q_id}")
+    print(f"{len(diffs)} changes, {len(conflicts)} conflicts, {len(missing)} missing ids.")
+
+
+def apply_patch(supabase, edits, dry_run=False, force=False):
+    """Fetch, merge and write back one patch. Returns the number of rows written."""
+    snapshot = fetch_rows(supabase, edits.keys())
+
+    if force:
+        edits = {q: [(p, v, _MISSING) for p, v, _ in e] for q, e in edits.items()}
+    payloads, diffs, conflicts, missing = apply_edits(snapshot, edits)
+    print_report(diffs, conflicts, missing)
+
+    if dry_run:
+        print("Dry run: nothing written.")
+        return 0
+
+    written = 0
+    for i in range(0, len(payloads), WRITE_CHUNK):
+        batch_written, _ = upsert_bisect(supabase, payloads[i:i + WRITE_CHUNK])
+        written += batch_written
+    print(f"✅ Updated {written} rows.")
+    return written
+
+
+def apply_patch_file(path, dry_run=False, force=False, supabase=None):
+    if supabase is None:
+        from supabase_client import get_client
+        supabase = get_client()
+    edits = load_patch(path)
+    print(f"Applying {sum(len(e) for e in edits.values())} edits to {len(edits)} rows from {path}...")
+    return apply_patch(supabase, edits, dry_run=dry_run, force=force)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a declarative patch file to the questions table.")
+    parser.add_argument('patch', help="Patch file (.json, .yaml/.yml or .csv)")
+    parser.add_argument('--dry-run', action='store_true', help="Show the diff without writing")
+    parser.add_argument('--force', action='store_true', help="Ignore `expect` conflicts")
+    args = parser.parse_args()
+    apply_patch_file(args.patch, dry_run=args.dry_run, force=args.force)
+
+if __name__ == "__main__":
+    main()
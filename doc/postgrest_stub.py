@@ -0,0 +1,701 @@
+"""
+Local PostgREST stand-in backed by SQLite, for running and profiling doc/ scripts
+offline.
+
+    python doc/postgrest_stub.py --seed-mirror                  # copy the mirror's questions in
+    python doc/postgrest_stub.py --latency 40 --jitter 15       # ~ production round trips
+    python doc/postgrest_stub.py --fail-rate 0.05               # exercise retries / bisection
+
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=stub \\
+        TALKBINGO_TRACE=1 python doc/fix_data_integrity.py
+
+`questions` uses the mirror schema (mirror.SCHEMA, code_names indexed in
+question_codes); any other table (logs, reports, ...) is kept as JSON documents.
+Like the real table, created_at/updated_at are only defaults: an update or upsert
+keeps the stored value unless the request sets the column. The BEFORE UPDATE
+triggers of supabase/migrations are emulated in QUESTION_TRIGGERS, each only if
+its migration file is present.
+Supported: GET/HEAD with select, eq/neq/gt/gte/lt/lte/like/ilike/in/is/ov/cs and
+not.<op> filters, order, limit/offset (or Range) and `Prefer: count=exact`;
+POST inserts and upserts (`on_conflict`, resolution=merge-duplicates /
+ignore-duplicates, `columns`: listed keys a row lacks are written as NULL, as
+PostgREST does; without `columns` all objects must have the same keys); PATCH and DELETE with filters; `return=representation`; and
+the RPCs get_random_questions, get_random_wildcard_questions, get_board_questions
+and get_board.
+Embedded resources, aliases and or=/and= filters are rejected with a 400.
+
+Every request sleeps --latency ms (+ uniform --jitter) before it is answered, and
+fails with a 503 at --fail-rate, so round trips cost what they cost in production.
+"""
+import os
+import csv
+import json
+import math
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+from mirror import COLUMNS, connect, store_rows, _decode, mirror_path
+
+DEFAULT_PORT = 54321
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mirror', 'postgrest_stub.sqlite')
+REST_PREFIX = '/rest/v1/'
+CONTROL_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+# In schema.sql / doc/migration_flatten_questions.sql but not mirrored: selectable,
+# always NULL, ignored on write
+SERVER_ONLY_COLUMNS = ('legacy_q_id', 'choice_a', 'choice_b', 'answers', 'choice_a_en', 'choice_b_en', 'answers_en')
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'supabase', 'migrations')
+# Columns whose change makes a stored content_hash stale (the trigger's column list)
+HASHED_COLUMNS = ('type', 'content', 'content_en', 'details', 'details_en', 'code_names',
+                  'gender_variants', 'gender_variants_en')
+BOARD_COLUMNS = ['id', 'q_id', 'type', 'content', 'content_en', 'details', 'details_en',
+                 'gender_variants', 'gender_variants_en']
+
+DOCUMENTS = """
+CREATE TABLE IF NOT EXISTS stub_documents (
+    tbl TEXT NOT NULL,
+    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stub_documents_tbl ON stub_documents (tbl);
+"""
+
+
+class ApiError(Exception):
+    """Answered as a PostgREST error body ({code, message, details, hint})."""
+
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_list(text, open_char='(', close_char=')'):
+    """'(a,"b,c")' -> ['a', 'b,c'] (PostgREST list literal; '{...}' for arrays)."""
+    text = text.strip()
+    if not (text.startswith(open_char) and text.endswith(close_char)):
+        raise ApiError(400, 'PGRST100', f"malformed list: {text}")
+    inner = text[1:-1]
+    if not inner:
+        return []
+    return next(csv.reader([inner], skipinitialspace=True))
+
+
+def parse_columns(text):
+    """'"q_id","content"' (the `columns` query parameter) -> ['q_id', 'content']."""
+    return [c.strip().strip('"') for c in next(csv.reader([text], skipinitialspace=True)) if c.strip()]
+
+
+def shape_rows(rows, columns=None):
+    """
+    Rows as PostgREST reads a bulk body: with `columns`, exactly those keys (NULL where
+    a row lacks one); without, every object must have the same keys.
+    """
+    if columns:
+        return [{c: row.get(c) for c in columns} for row in rows]
+    if rows and any(set(row) != set(rows[0]) for row in rows[1:]):
+        raise ApiError(400, 'PGRST102', "All object keys must match")
+    return rows
+
+
+def invalidate_content_hash(old, new):
+    """20261019_questions_content_hash_trigger.sql: content changed, hash did not -> NULL."""
+    if new.get('content_hash') == old.get('content_hash') and any(new.get(c) != old.get(c) for c in HASHED_COLUMNS):
+        new['content_hash'] = None
+    return new
+
+
+def touch_updated_at(old, new):
+    """20261019_questions_updated_at_trigger.sql: row changed, updated_at not given -> now()."""
+    if new.get('updated_at') == old.get('updated_at') and new != old:
+        new['updated_at'] = now_iso()
+    return new
+
+
+# BEFORE UPDATE triggers on `questions` in firing (name) order: (migration that creates it, fn(old, new) -> new)
+QUESTION_TRIGGERS = (
+    ('20261019_questions_content_hash_trigger.sql', invalidate_content_hash),
+    ('20261019_questions_updated_at_trigger.sql', touch_updated_at),
+)
+
+
+def declared_triggers(directory=MIGRATIONS_DIR):
+    """The QUESTION_TRIGGERS whose migration exists, as on a server that ran them."""
+    return [fn for migration, fn in QUESTION_TRIGGERS if os.path.exists(os.path.join(directory, migration))]
+
+
+def _scalar(value):
+    # Document tables compare JSON values: numbers and booleans come back typed
+    if value in ('true', 'false'):
+        return 1 if value == 'true' else 0
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class Table:
+    """SQL fragments for one table: the `questions` table or a JSON document table."""
+
+    def __init__(self, name):
+        self.name = name
+        self.questions = name == 'questions'
+
+    @property
+    def source(self):
+        return 'questions' if self.questions else 'stub_documents'
+
+    def base_where(self):
+        return ([], []) if self.questions else (['tbl = ?'], [self.name])
+
+    def expr(self, column):
+        if not column.replace('_', '').isalnum():
+            raise ApiError(400, 'PGRST100', f"unsupported column expression: {column}")
+        if self.questions:
+            if column in SERVER_ONLY_COLUMNS:
+                return 'NULL'
+            if column not in COLUMNS:
+                raise ApiError(400, '42703', f"column questions.{column} does not exist")
+            return column
+        return f"json_extract(body, '$.\"{column}\"')"
+
+    def value(self, column, raw):
+        if self.questions:
+            return (1 if raw == 'true' else 0) if column == 'is_published' and raw in ('true', 'false') else raw
+        return _scalar(raw)
+
+    def array_members(self, column, values, op):
+        """SQL for ov (any of values) / cs (all of values) on an array column."""
+        marks = ','.join('?' for _ in values)
+        if not values:
+            return ('0' if op == 'ov' else '1'), []
+        if self.questions and column == 'code_names':
+            sub = f"SELECT {{}} FROM question_codes WHERE question_codes.q_id = questions.q_id AND code IN ({marks})"
+            if op == 'ov':
+                return f"EXISTS ({sub.format('1')})", list(values)
+            return f"({sub.format('COUNT(DISTINCT code)')}) = {len(set(values))}", list(values)
+        sub = f"SELECT {{}} FROM json_each({self.expr(column)}) WHERE value IN ({marks})"
+        if op == 'ov':
+            return f"EXISTS ({sub.format('1')})", list(values)
+        return f"({sub.format('COUNT(DISTINCT value)')}) = {len(set(values))}", list(values)
+
+    def condition(self, column, spec):
+        """(sql, params) for one PostgREST filter value such as 'eq.B' or 'not.is.null'."""
+        negate = spec.startswith('not.')
+        if negate:
+            spec = spec[4:]
+        op, _, raw = spec.partition('.')
+        if op in ('ov', 'cs'):
+            sql, params = self.array_members(column, parse_list(raw, '{', '}'), op)
+        else:
+            expr = self.expr(column)
+            if op in ('eq', 'neq', 'gt', 'gte', 'lt', 'lte'):
+                symbol = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}[op]
+                sql, params = f"{expr} {symbol} ?", [self.value(column, raw)]
+            elif op == 'like':
+                sql, params = f"{expr} GLOB ?", [raw.replace('%', '*')]
+            elif op == 'ilike':
+                sql, params = f"{expr} LIKE ?", [raw.replace('*', '%')]
+            elif op == 'in':
+                values = [self.value(column, v) for v in parse_list(raw)]
+                sql = f"{expr} IN ({','.join('?' for _ in values)})" if values else '0'
+                params = values
+            elif op == 'is':
+                if raw == 'null':
+                    sql, params = f"{expr} IS NULL", []
+                elif raw in ('true', 'false'):
+                    sql, params = f"{expr} = ?", [1 if raw == 'true' else 0]
+                else:
+                    raise ApiError(400, 'PGRST100', f"is.{raw} is not supported")
+            else:
+                raise ApiError(400, 'PGRST100', f"operator {op!r} is not supported by the stub")
+        return (f"NOT ({sql})" if negate else sql), params
+
+    def where(self, filters):
+        clauses, params = self.base_where()
+        for column, spec in filters:
+            sql, values = self.condition(column, spec)
+            clauses.append(sql)
+            params.extend(values)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def order_by(self, order):
+        if not order:
+            return ' ORDER BY pk' if not self.questions else ''
+        terms = []
+        for term in order.split(','):
+            parts = term.split('.')
+            direction = 'DESC' if 'desc' in parts[1:] else 'ASC'
+            nulls = ' NULLS FIRST' if 'nullsfirst' in parts[1:] else (' NULLS LAST' if 'nullslast' in parts[1:] else '')
+            terms.append(f"{self.expr(parts[0])} {direction}{nulls}")
+        return ' ORDER BY ' + ', '.join(terms)
+
+    def select_sql(self):
+        return f"SELECT {'*' if self.questions else 'pk, body'} FROM {self.source}"
+
+    def decode(self, cursor_row, names):
+        if self.questions:
+            return _decode(cursor_row, names)
+        return json.loads(cursor_row[1])
+
+
+def project(rows, select, table):
+    """Keep the selected columns ('*' keeps everything)."""
+    select = (select or '*').strip()
+    if select == '*':
+        return rows
+    columns = [c.strip() for c in select.split(',') if c.strip()]
+    for column in columns:
+        if not column.replace('_', '').isalnum():
+            raise ApiError(400, 'PGRST100', f"select {column!r} is not supported by the stub")
+        if table.questions and column not in COLUMNS and column not in SERVER_ONLY_COLUMNS:
+            raise ApiError(400, '42703', f"column questions.{column} does not exist")
+    return [{c: row.get(c) for c in columns} for row in rows]
+
+
+class Store:
+    """SQLite access; one connection per thread, writes serialized."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.write_lock = threading.Lock()
+        self.triggers = declared_triggers()
+        self.conn.executescript(DOCUMENTS)
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+            conn.executescript(DOCUMENTS)
+        return conn
+
+    def find(self, table, filters=(), order=None, limit=None, offset=None):
+        """(rows with their storage keys, total count before limit/offset)."""
+        where, params = table.where(filters)
+        conn = self.conn
+        total = conn.execute(f"SELECT COUNT(*) FROM {table.source}{where}", params).fetchone()[0]
+        sql = table.select_sql() + where + table.order_by(order)
+        if limit is not None or offset:
+            sql += f" LIMIT {int(limit) if limit is not None else -1} OFFSET {int(offset or 0)}"
+        cursor = conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        keys = 'q_id' if table.questions else 'pk'
+        out = []
+        for r in cursor:
+            row = dict(zip(names, r))
+            out.append((row[keys], table.decode(r, names)))
+        return out, total
+
+    def _questions_by_key(self, column, values):
+        table = Table('questions')
+        found, _ = self.find(table, [(column, 'in.(' + ','.join(_quote(v) for v in values) + ')')])
+        return {row.get(column): row for _, row in found}
+
+    def _documents_by_key(self, name, column, values):
+        found, _ = self.find(Table(name), [(column, 'in.(' + ','.join(_quote(v) for v in values) + ')')])
+        return {row.get(column): (pk, row) for pk, row in found}
+
+    def _on_update(self, old, new):
+        for trigger in self.triggers:
+            new = trigger(old, new)
+        return new
+
+    def insert(self, name, rows, on_conflict=None, resolution=None, columns=None):
+        """Insert or upsert; returns the stored rows."""
+        rows = shape_rows(rows, columns)
+        stamp = now_iso()
+        conn = self.conn
+        out = []
+        with self.write_lock:
+            if name == 'questions':
+                key = on_conflict or 'q_id'
+                existing = self._questions_by_key(key, [r.get(key) for r in rows if r.get(key) is not None])
+                for row in rows:
+                    unknown = set(row) - set(COLUMNS) - set(SERVER_ONLY_COLUMNS)
+                    if unknown:
+                        raise ApiError(400, 'PGRST204', f"Could not find the '{sorted(unknown)[0]}' column of 'questions'")
+                    row = {k: v for k, v in row.items() if k not in SERVER_ONLY_COLUMNS}
+                    current = existing.get(row.get(key))
+                    if current is not None:
+                        if resolution == 'ignore-duplicates':
+                            continue
+                        if resolution != 'merge-duplicates':
+                            raise ApiError(409, '23505', f"duplicate key value violates unique constraint ({key})")
+                        merged = self._on_update(current, {**current, **row})
+                    else:
+                        merged = {'id': str(uuid.uuid4()), 'is_published': True, 'created_at': stamp,
+                                  'updated_at': stamp, **row}
+                    if not merged.get('q_id'):
+                        raise ApiError(400, '23502', "null value in column \"q_id\" violates not-null constraint")
+                    store_rows(conn, [merged])
+                    existing[merged.get(key)] = merged
+                    out.append(merged)
+            else:
+                existing = {}
+                if on_conflict:
+                    existing = self._documents_by_key(name, on_conflict, [r.get(on_conflict) for r in rows
+                                                                         if r.get(on_conflict) is not None])
+                for row in rows:
+                    found = existing.get(row.get(on_conflict)) if on_conflict else None
+                    if found is not None:
+                        if resolution == 'ignore-duplicates':
+                            continue
+                        if resolution != 'merge-duplicates':
+                            raise ApiError(409, '23505', f"duplicate key value violates unique constraint ({on_conflict})")
+                        pk, current = found
+                        merged = {**current, **row}
+                        conn.execute('UPDATE stub_documents SET body = ? WHERE pk = ?',
+                                     (json.dumps(merged, ensure_ascii=False), pk))
+                    else:
+                        merged = {'id': str(uuid.uuid4()), 'created_at': stamp, **row}
+                        cursor = conn.execute('INSERT INTO stub_documents (tbl, body) VALUES (?, ?)',
+                                              (name, json.dumps(merged, ensure_ascii=False)))
+                        pk = cursor.lastrowid
+                    if on_conflict:
+                        existing[merged.get(on_conflict)] = (pk, merged)
+                    out.append(merged)
+            conn.commit()
+        return out
+
+    def update(self, table, filters, values):
+        with self.write_lock:
+            found, _ = self.find(table, filters)
+            conn = self.conn
+            out = []
+            for key, row in found:
+                if table.questions:
+                    merged = self._on_update(row, {**row, **values})
+                    if merged.get('q_id') != key:
+                        conn.execute('DELETE FROM questions WHERE q_id = ?', (key,))
+                    store_rows(conn, [merged])
+                else:
+                    merged = {**row, **values}
+                    conn.execute('UPDATE stub_documents SET body = ? WHERE pk = ?',
+                                 (json.dumps(merged, ensure_ascii=False), key))
+                out.append(merged)
+            conn.commit()
+        return out
+
+    def delete(self, table, filters):
+        with self.write_lock:
+            found, _ = self.find(table, filters)
+            conn = self.conn
+            if table.questions:
+                conn.executemany('DELETE FROM questions WHERE q_id = ?', [(key,) for key, _ in found])
+            else:
+                conn.executemany('DELETE FROM stub_documents WHERE pk = ?', [(key,) for key, _ in found])
+            conn.commit()
+        return [row for _, row in found]
+
+
+def _quote(value):
+    text = str(value)
+    return '"' + text.replace('"', '""') + '"' if any(ch in text for ch in ',()"') else text
+
+
+# --- RPCs (same results as supabase/migrations/*_board_*rpc.sql) -------------------
+
+def _published_matches(store, codes, type_prefix):
+    table = Table('questions')
+    filters = [('is_published', 'is.true'), ('q_id', f"like.{type_prefix}*"),
+               ('code_names', 'ov.{' + ','.join(_quote(c) for c in codes) + '}')]
+    found, _ = store.find(table, filters)
+    return [row for _, row in found]
+
+
+def rpc_get_random_questions(store, p_codes, p_type_prefix, p_limit=40):
+    rows = _published_matches(store, p_codes, p_type_prefix)
+    random.shuffle(rows)
+    return rows[:p_limit]
+
+
+def rpc_get_random_wildcard_questions(store, p_type_prefix, p_limit=20):
+    return rpc_get_random_questions(store, ['*-*-*-*-*'], p_type_prefix, p_limit)
+
+
+def rpc_get_board_questions(store, p_codes, p_type_prefix, p_limit=50, p_exclude=()):
+    from board_generator import code_weight
+    wanted = set(p_codes)
+    excluded = set(p_exclude or ())
+    keyed = []
+    for row in _published_matches(store, p_codes, p_type_prefix):
+        weight = max(code_weight(c) for c in row.get('code_names') or () if c in wanted)
+        # -ln(u) / w: weighted sampling without replacement; seen questions go last
+        keyed.append((row.get('q_id') in excluded, -math.log(1.0 - random.random()) / weight, row))
+    keyed.sort(key=lambda k: (k[0], k[1]))
+    return [{c: row.get(c) for c in BOARD_COLUMNS} for _, _, row in keyed[:p_limit]]
+
+
+def rpc_get_board(store, p_codes, p_size=25, p_reserve=25, p_exclude=(), p_truth_ratio=0.52):
+    from board_generator import split_board
+    total = p_size + p_reserve
+    truth = rpc_get_board_questions(store, p_codes, 'T', total, p_exclude)
+    balance = rpc_get_board_questions(store, p_codes, 'B', total, p_exclude)
+    board = split_board(truth, balance, p_size, p_reserve, p_truth_ratio)
+    return [{'slot': slot, 'slot_order': n, **row}
+            for slot in ('main', 'reserve') for n, row in enumerate(board[slot], start=1)]
+
+
+RPCS = {
+    'get_random_questions': rpc_get_random_questions,
+    'get_random_wildcard_questions': rpc_get_random_wildcard_questions,
+    'get_board_questions': rpc_get_board_questions,
+    'get_board': rpc_get_board,
+}
+
+
+# --- HTTP ---------------------------------------------------------------------------
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PostgRESTStub/1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive clients
+    # wait ~40 ms for the delayed ACK on every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # Request parsing
+
+    def _parts(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith(REST_PREFIX):
+            raise ApiError(404, 'PGRST000', f"unknown path {url.path}")
+        params = parse_qsl(url.query, keep_blank_values=True)
+        return url.path[len(REST_PREFIX):], params
+
+    def _prefer(self):
+        prefer = {}
+        for item in self.headers.get('Prefer', '').split(','):
+            key, _, value = item.strip().partition('=')
+            if key:
+                prefer[key] = value
+        return prefer
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, 'PGRST102', "invalid JSON body")
+
+    # Responses
+
+    def _send(self, status, payload=None, headers=None, head=False):
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(0 if head else len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if body and not head:
+            self.wfile.write(body)
+
+    def _handle(self, method):
+        self._body_read = False
+        self.server.inject_latency()
+        try:
+            if self.server.should_fail():
+                raise ApiError(503, 'PGRST503', "injected failure")
+            name, params = self._parts()
+            if name.startswith('rpc/'):
+                if method != 'POST':
+                    raise ApiError(405, 'PGRST101', "RPCs are called with POST")
+                self._rpc(name[4:])
+            else:
+                self._table(method, Table(name), params)
+        except ApiError as e:
+            self._drain()
+            self._send(e.status, {'code': e.code, 'message': str(e), 'details': None, 'hint': None})
+        except sqlite3.Error as e:
+            self._drain()
+            self._send(500, {'code': 'XX000', 'message': str(e), 'details': None, 'hint': None})
+
+    def _drain(self):
+        # Unread request bodies would corrupt the next request on this keep-alive connection
+        length = int(self.headers.get('Content-Length') or 0)
+        if length and not getattr(self, '_body_read', False):
+            self.rfile.read(length)
+        self._body_read = True
+
+    def _rpc(self, name):
+        fn = RPCS.get(name)
+        args = self._body() or {}
+        self._body_read = True
+        if fn is None:
+            raise ApiError(404, 'PGRST202', f"Could not find the function public.{name}")
+        try:
+            result = fn(self.server.store, **args)
+        except TypeError as e:
+            raise ApiError(400, 'PGRST202', f"bad arguments for {name}: {e}")
+        self._send(200, result)
+
+    def _table(self, method, table, params):
+        select = dict(params).get('select')
+        order = dict(params).get('order')
+        filters = [(k, v) for k, v in params if k not in CONTROL_PARAMS]
+        prefer = self._prefer()
+        representation = prefer.get('return') == 'representation'
+
+        if method in ('GET', 'HEAD'):
+            limit = dict(params).get('limit')
+            offset = dict(params).get('offset')
+            ranged = self.headers.get('Range')
+            if ranged and '-' in ranged:
+                lo, hi = ranged.split('-', 1)
+                offset, limit = int(lo), int(hi) - int(lo) + 1
+            found, total = self.server.store.find(table, filters, order, limit, offset)
+            rows = project([row for _, row in found], select, table)
+            start = int(offset or 0)
+            span = f"{start}-{start + len(rows) - 1}" if rows else '*'
+            count = str(total) if prefer.get('count') in ('exact', 'planned', 'estimated') else '*'
+            self._send(200, rows, {'Content-Range': f"{span}/{count}"}, head=(method == 'HEAD'))
+            return
+
+        if method == 'POST':
+            body = self._body()
+            self._body_read = True
+            rows = body if isinstance(body, list) else [body or {}]
+            columns = dict(params).get('columns')
+            stored = self.server.store.insert(table.name, rows, dict(params).get('on_conflict'),
+                                              prefer.get('resolution'), parse_columns(columns) if columns else None)
+        elif method == 'PATCH':
+            body = self._body() or {}
+            self._body_read = True
+            if not filters:
+                raise ApiError(400, '21000', "UPDATE requires a WHERE clause")
+            stored = self.server.store.update(table, filters, body)
+        elif method == 'DELETE':
+            self._drain()
+            if not filters:
+                raise ApiError(400, '21000', "DELETE requires a WHERE clause")
+            stored = self.server.store.delete(table, filters)
+        else:
+            raise ApiError(405, 'PGRST101', f"{method} is not supported")
+
+        status = 201 if method == 'POST' else 200
+        if representation:
+            self._send(status, project(stored, select, table))
+        else:
+            self._send(201 if method == 'POST' else 204)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db_path=DEFAULT_DB, latency_ms=0.0, jitter_ms=0.0, fail_rate=0.0,
+                 verbose=False):
+        super().__init__(address, StubHandler)
+        self.store = Store(db_path)
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject_latency(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self):
+        return self.fail_rate > 0 and random.random() < self.fail_rate
+
+
+def serve_in_thread(db_path=DEFAULT_DB, port=0, **options):
+    """Start a StubServer on 127.0.0.1 (port 0 = any free port) in a daemon thread."""
+    server = StubServer(('127.0.0.1', port), db_path, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_from_mirror(db_path, source=None):
+    """Copy the local mirror's questions into the stub database."""
+    source = source or mirror_path()
+    if not os.path.exists(source):
+        raise SystemExit(f"No mirror at {source}. Run: python doc/mirror.py sync")
+    src = connect(source)
+    dst = connect(db_path)
+    cursor = src.execute(f"SELECT {','.join(COLUMNS)} FROM questions")
+    count = 0
+    while True:
+        batch = cursor.fetchmany(1000)
+        if not batch:
+            break
+        count += store_rows(dst, [_decode(r, COLUMNS) for r in batch])
+    dst.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local PostgREST stand-in backed by SQLite.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port (default {DEFAULT_PORT})")
+    parser.add_argument('--db', default=DEFAULT_DB, help="SQLite file (default doc/.mirror/postgrest_stub.sqlite)")
+    parser.add_argument('--reset', action='store_true', help="Start from an empty database")
+    parser.add_argument('--seed-mirror', action='store_true', help="Copy questions from the local mirror first")
+    parser.add_argument('--latency', type=float, default=0.0, help="Added latency per request in ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random latency, uniform 0..ms")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    if args.reset:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    if args.seed_mirror:
+        print(f"🪞 Seeded {seed_from_mirror(args.db)} questions from {mirror_path()}")
+
+    server = StubServer(('127.0.0.1', args.port), args.db, args.latency, args.jitter, args.fail_rate, args.verbose)
+    print(f"🧪 PostgREST stand-in on {server.url} (db {args.db}, latency {args.latency:g}+{args.jitter:g} ms, "
+          f"fail rate {args.fail_rate:g})")
+    print(f"   SUPABASE_URL={server.url} SUPABASE_SERVICE_ROLE_KEY=stub python doc/<script>.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
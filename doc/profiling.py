@@ -0,0 +1,333 @@
+"""
+Per-phase profiling for the doc/ data scripts.
+
+Scripts mark their phases (CSV read, row preparation, upload, backup write, ...)
+with `with phase('process_file.upload', rows=len(batch)):`. When profiling is off,
+phase() returns a shared no-op context, so the marks cost next to nothing.
+
+Turn it on with TALKBINGO_PROFILE or the scripts' --profile flag:
+
+    TALKBINGO_PROFILE=1 python doc/fix_and_import.py
+    python doc/export_server_data.py --profile
+    TALKBINGO_PROFILE=cprofile python doc/import_supabase.py --stream    # + one .prof per phase
+
+Each phase accumulates over all its entries: calls, wall time, self time (wall
+minus nested phases), CPU time of the entering thread, rows and bytes, and on the
+main thread the tracemalloc peak above the memory in use at phase entry and the net
+allocation. At exit a table is printed and a JSON report is written to
+doc/build/profiles/<script>-<time>.json; with `cprofile`,
+doc/build/profiles/<script>-<time>/<phase>.prof holds the phase's own calls (nested
+phases are profiled separately). Open them with `python -m pstats` or snakeviz.
+
+tracemalloc and cProfile are process-wide, so memory and cProfile figures are only
+taken for phases entered on the main thread; phases in worker threads (upload
+pools, export scanners) report time, rows and bytes.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+
+PROFILE_ENV = 'TALKBINGO_PROFILE'
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build', 'profiles')
+MODES = ('1', 'cprofile')
+
+_profiler = None
+_configured = False
+
+
+class _NullPhase:
+    enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, bytes=0):
+        pass
+
+
+NULL_PHASE = _NullPhase()
+
+
+class PhaseStats:
+    __slots__ = ('name', 'calls', 'wall', 'child_wall', 'cpu', 'rows', 'bytes', 'peak', 'alloc', 'cprofile')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.child_wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.peak = None
+        self.alloc = 0
+        self.cprofile = None
+
+    def as_dict(self):
+        return {
+            'phase': self.name,
+            'calls': self.calls,
+            'wall_s': round(self.wall, 6),
+            'self_s': round(self.wall - self.child_wall, 6),
+            'cpu_s': round(self.cpu, 6),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rows_per_s': round(self.rows / self.wall, 1) if self.wall and self.rows else None,
+            'peak_bytes': self.peak,
+            'alloc_bytes': self.alloc,
+        }
+
+
+class _Frame:
+    __slots__ = ('stats', 'wall', 'cpu', 'memory', 'peak_before', 'child_peak', 'child_wall', 'rows', 'bytes')
+
+
+class Phase:
+    """Reusable context manager for one named phase; `add()` counts rows/bytes inside it."""
+
+    enabled = True
+
+    def __init__(self, profiler, stats, rows=0, bytes=0):
+        self._profiler = profiler
+        self._stats = stats
+        self._rows = rows
+        self._bytes = bytes
+
+    def __enter__(self):
+        self._profiler._enter(self._stats, self._rows, self._bytes)
+        return self
+
+    def __exit__(self, *exc):
+        self._profiler._exit()
+        return False
+
+    def add(self, rows=0, bytes=0):
+        self._profiler._add(rows, bytes)
+
+
+class Profiler:
+    def __init__(self, cprofile=False, memory=True):
+        self.cprofile = cprofile
+        self.memory = memory
+        self.started = time.time()
+        self.phases = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name, rows=0, bytes=0):
+        stats = self.phases.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.phases.setdefault(name, PhaseStats(name))
+        return Phase(self, stats, rows, bytes)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, stats, rows, bytes):
+        stack = self._stack()
+        main = threading.current_thread() is threading.main_thread()
+        if main and self.cprofile:
+            # One active profiler at a time: the innermost phase owns the calls
+            if stack and stack[-1].stats.cprofile:
+                stack[-1].stats.cprofile.disable()
+            if stats.cprofile is None:
+                stats.cprofile = cProfile.Profile()
+            stats.cprofile.enable()
+
+        frame = _Frame()
+        frame.stats = stats
+        frame.rows = rows
+        frame.bytes = bytes
+        frame.child_wall = 0.0
+        frame.child_peak = 0
+        frame.memory = None
+        if main and self.memory and tracemalloc.is_tracing():
+            current, frame.peak_before = tracemalloc.get_traced_memory()
+            frame.memory = current
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        frame.cpu = time.thread_time()
+        frame.wall = time.perf_counter()
+
+    def _exit(self):
+        wall_end = time.perf_counter()
+        cpu_end = time.thread_time()
+        stack = self._stack()
+        frame = stack.pop()
+        stats = frame.stats
+        wall = wall_end - frame.wall
+
+        peak = None
+        alloc = 0
+        if frame.memory is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame.child_peak)
+            alloc = current - frame.memory
+
+        if stats.cprofile is not None and threading.current_thread() is threading.main_thread():
+            stats.cprofile.disable()
+            if stack and stack[-1].stats.cprofile:
+                stack[-1].stats.cprofile.enable()
+
+        with self._lock:
+            stats.calls += 1
+            stats.wall += wall
+            stats.child_wall += frame.child_wall
+            stats.cpu += cpu_end - frame.cpu
+            stats.rows += frame.rows
+            stats.bytes += frame.bytes
+            stats.alloc += alloc
+            if peak is not None:
+                rise = peak - frame.memory
+                stats.peak = rise if stats.peak is None else max(stats.peak, rise)
+
+        if stack:
+            parent = stack[-1]
+            parent.child_wall += wall
+            if peak is not None:
+                # reset_peak() inside this phase hid the parent's earlier peak; carry both up
+                parent.child_peak = max(parent.child_peak, peak, frame.peak_before)
+
+    def _add(self, rows, bytes):
+        stack = self._stack()
+        if stack:
+            stack[-1].rows += rows
+            stack[-1].bytes += bytes
+
+    def report(self):
+        return [stats.as_dict() for stats in list(self.phases.values())]
+
+    def print_report(self, out=None):
+        out = out or sys.stderr
+        print(f"\n⏱️  Profile ({time.time() - self.started:.1f}s)", file=out)
+        print(f"  {'phase':<34} {'calls':>7} {'wall s':>9} {'self s':>9} {'cpu s':>9} {'rows':>9} "
+              f"{'MiB':>8} {'+peak MiB':>9}", file=out)
+        for p in self.report():
+            peak = f"{p['peak_bytes'] / 2**20:9.1f}" if p['peak_bytes'] is not None else f"{'-':>9}"
+            print(f"  {p['phase']:<34} {p['calls']:>7} {p['wall_s']:>9.3f} {p['self_s']:>9.3f} {p['cpu_s']:>9.3f} "
+                  f"{p['rows']:>9} {p['bytes'] / 2**20:>8.1f} {peak}", file=out)
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        dumps = {}
+        if self.cprofile:
+            directory = os.path.splitext(path)[0]
+            os.makedirs(directory, exist_ok=True)
+            for name, stats in self.phases.items():
+                if stats.cprofile is not None:
+                    dumps[name] = os.path.join(directory, name.replace('/', '_') + '.prof')
+                    stats.cprofile.dump_stats(dumps[name])
+        report = {
+            'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            'argv': sys.argv[1:],
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'wall_s': round(time.time() - self.started, 3),
+            'phases': [dict(p, cprofile=dumps.get(p['phase'])) for p in self.report()],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        return path
+
+
+def default_report_path():
+    script = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ''))[0].strip('-') or 'python'
+    return os.path.join(PROFILE_DIR, f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def enable(mode='1', path=None):
+    """Start profiling this process ('1', or 'cprofile' for .prof dumps); idempotent."""
+    global _profiler, _configured
+    _configured = True
+    if _profiler is not None:
+        return _profiler
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode {mode!r} (expected one of {MODES})")
+    _profiler = Profiler(cprofile=(mode == 'cprofile'))
+    target = path or default_report_path()
+
+    def finish():
+        _profiler.print_report()
+        print(f"📝 Profile -> {_profiler.write(target)}", file=sys.stderr)
+
+    atexit.register(finish)
+    return _profiler
+
+
+def enable_from_argv(argv=None):
+    """enable() for a bare `--profile` / `--profile=cprofile` (scripts without argparse)."""
+    argv = sys.argv if argv is None else argv
+    for arg in argv:
+        if arg == '--profile':
+            return enable()
+        if arg.startswith('--profile='):
+            return enable(arg.split('=', 1)[1])
+    return None
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', nargs='?', const='1', choices=MODES,
+                        help="Per-phase timing/memory report ('cprofile' also dumps .prof files)")
+
+
+def get_profiler():
+    """The active Profiler, or None. TALKBINGO_PROFILE is read on first use."""
+    global _configured
+    if not _configured:
+        _configured = True
+        value = os.environ.get(PROFILE_ENV, '').strip().lower()
+        if value in MODES or value in ('true', 'yes'):
+            enable('cprofile' if value == 'cprofile' else '1')
+    return _profiler
+
+
+def phase(name, rows=0, bytes=0):
+    """Context manager for a named phase (a no-op unless profiling is on)."""
+    profiler = _profiler if _configured else get_profiler()
+    if profiler is None:
+        return NULL_PHASE
+    return profiler.phase(name, rows, bytes)
+
+
+def profiled(iterable, name, rows=None):
+    """
+    Iterate `iterable`, timing every next() as phase `name`; rows(item) counts rows
+    per item (default 1). Returns the iterable unchanged when profiling is off.
+    """
+    profiler = _profiler if _configured else get_profiler()
+    if profiler is None:
+        return iterable
+    return _profiled(profiler, iter(iterable), name, rows)
+
+
+def _profiled(profiler, iterator, name, rows):
+    step = profiler.phase(name)
+    while True:
+        with step:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            step.add(rows=rows(item) if rows else 1)
+        yield item
+
+
+def file_bytes(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
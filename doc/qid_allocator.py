@@ -0,0 +1,324 @@
+"""
+q_id allocation and index (QuizDataRules.md: `B26-00001`, `T26-00001`, `M26-00001`).
+
+QidIndex remembers every q_id seen in the quiz CSVs, the local mirror and the server,
+plus the highest sequence per type+year. next_id() is a dict increment, and
+allocated ids are recorded, so an id is never handed out twice even if its row is
+later deleted (q_ids are immutable primary keys).
+
+Each source also keeps a short key of every id's content (content_matcher.canonical_key),
+so the same question in a CSV and on the server is one owner, while an id that two
+sources use for different questions is a collision (`check` reports it, and
+update_qid.py `assign` moves the row to a fresh id).
+
+The index is persisted to doc/.qid_index.json. CSVs whose size and mtime did not
+change since the last refresh are not read again.
+
+    python doc/qid_allocator.py refresh                 # all doc/*QuizData*.csv
+    python doc/qid_allocator.py refresh --mirror        # + local mirror
+    python doc/qid_allocator.py refresh --server        # + Supabase
+    python doc/qid_allocator.py next B -n 5             # B26-00459 ... B26-00463
+    python doc/qid_allocator.py check [--server]        # refresh, then collisions / malformed ids (exit 1)
+    python doc/qid_allocator.py forget /tmp/Old.csv     # drop a source from the index
+    python doc/qid_allocator.py forget --missing        # drop every CSV source no longer on disk
+
+A refresh drops the CSV sources it was not given (or that no longer exist), so a
+deleted or moved file stops owning its ids. Forgetting a source never lowers the
+per-type high-water marks: its ids are still not handed out again.
+"""
+import os
+import re
+import sys
+import glob
+import json
+import hashlib
+import argparse
+from datetime import date
+
+from question_loader import QuestionCsv
+from content_matcher import canonical_key
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.qid_index.json')
+DEFAULT_GLOB = 'doc/*QuizData*.csv'
+QID_RE = re.compile(r'^([BTM])(\d{2})-(\d{5})$')
+QID_TYPES = ('B', 'T', 'M')
+# Sources holding the live rows: an id whose content they confirm stays with it
+CLIENT_SOURCES = ('server', 'mirror')
+
+
+def current_year():
+    return date.today().year % 100
+
+
+def parse_qid(q_id):
+    """('B', 26, 1) for 'B26-00001', None if the id does not follow the rules."""
+    m = QID_RE.match(q_id or '')
+    if not m:
+        return None
+    return m.group(1), int(m.group(2)), int(m.group(3))
+
+
+def format_qid(q_type, year, seq):
+    return f"{q_type}{year:02d}-{seq:05d}"
+
+
+def content_key(text):
+    """Short key of a question's canonical text (same question -> same key)."""
+    return hashlib.sha1(canonical_key(text).encode('utf-8')).hexdigest()[:10]
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def scan_csv(path):
+    """
+    One streaming pass: (ids in file order, {q_id: [row numbers]} for ids seen more than
+    once, {q_id: content_key} of the first row with each id).
+    """
+    ids = []
+    rows = {}
+    keys = {}
+    with QuestionCsv(path) as source:
+        for line, row in enumerate(source, start=2):
+            q_id = (row.get('q_id') or '').strip()
+            if q_id:
+                ids.append(q_id)
+                rows.setdefault(q_id, []).append(line)
+                keys.setdefault(q_id, content_key(row.get('content')))
+    return ids, {q_id: lines for q_id, lines in rows.items() if len(lines) > 1}, keys
+
+
+class QidIndex:
+    """Used q_ids per source plus per type+year high-water marks."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.sources = {}      # source -> {'fingerprint': [...], 'ids': [...], 'duplicates': {...}, 'content': {...}}
+        self.allocated = []    # ids handed out by next_id() that no source has shown yet
+        self.high = {}         # 'B26' -> highest sequence
+        self.used = set()
+        self.owners = {}       # q_id -> {source: content key or None}
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        index = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            index.sources = data.get('sources', {})
+            index.allocated = data.get('allocated', [])
+            index.high = data.get('high', {})
+        index._rebuild()
+        return index
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'sources': self.sources, 'allocated': self.allocated, 'high': self.high}, f)
+        os.replace(tmp, self.path)
+
+    def _rebuild(self):
+        seen = set()
+        self.owners = {}
+        for name, entry in self.sources.items():
+            seen.update(entry['ids'])
+            self._own(name, entry)
+        # Allocations that have since shown up in a source no longer need their own entry
+        self.allocated = [q_id for q_id in self.allocated if q_id not in seen]
+        self.used = seen | set(self.allocated)
+        for q_id in self.used:
+            self._bump(q_id)
+
+    def _bump(self, q_id):
+        parsed = parse_qid(q_id)
+        if parsed:
+            key = f"{parsed[0]}{parsed[1]:02d}"
+            if parsed[2] > self.high.get(key, 0):
+                self.high[key] = parsed[2]
+
+    def _own(self, name, entry):
+        content = entry.get('content') or {}
+        for q_id in entry['ids']:
+            self.owners.setdefault(q_id, {})[name] = content.get(q_id)
+
+    def add_source(self, name, ids, duplicates=None, fingerprint=None, content=None):
+        previous = self.sources.get(name)
+        if previous:
+            for q_id in previous['ids']:
+                self.owners.get(q_id, {}).pop(name, None)
+        entry = {'fingerprint': fingerprint, 'ids': list(ids), 'duplicates': duplicates or {}, 'content': content or {}}
+        self.sources[name] = entry
+        self._own(name, entry)
+        for q_id in ids:
+            self.used.add(q_id)
+            self._bump(q_id)
+
+    def forget(self, name):
+        """Drop source `name` (its ids stay below the high-water marks). Returns True if it was indexed."""
+        if self.sources.pop(name, None) is None:
+            return False
+        self._rebuild()
+        return True
+
+    def prune(self, keep=None):
+        """
+        Forget CSV sources whose file is gone or (with `keep`) that are not among the
+        paths in `keep`. The server and mirror sources are never pruned. Returns the
+        names dropped.
+        """
+        keep = None if keep is None else {os.path.normpath(path) for path in keep}
+        dropped = [name for name in self.sources if name not in CLIENT_SOURCES
+                   and (not os.path.exists(name) or (keep is not None and os.path.normpath(name) not in keep))]
+        for name in dropped:
+            del self.sources[name]
+        if dropped:
+            self._rebuild()
+        return sorted(dropped)
+
+    def refresh_csv(self, path):
+        """Re-read `path` unless it is unchanged since the last refresh. Returns True if read."""
+        fingerprint = _fingerprint(path)
+        entry = self.sources.get(path)
+        # Entries written before content keys existed are read once more
+        if entry and entry.get('fingerprint') == fingerprint and 'content' in entry:
+            return False
+        ids, duplicates, content = scan_csv(path)
+        self.add_source(path, ids, duplicates, fingerprint, content)
+        return True
+
+    def refresh_client(self, name, client):
+        """Record every q_id of a Supabase client or MirrorClient (keyset scan, q_id + content)."""
+        from supabase_client import scan_table
+        counts = {}
+        content = {}
+        for row in scan_table(client, 'q_id,content'):
+            if row.get('q_id'):
+                counts[row['q_id']] = counts.get(row['q_id'], 0) + 1
+                content.setdefault(row['q_id'], content_key(row.get('content')))
+        duplicates = {q_id: n for q_id, n in counts.items() if n > 1}
+        self.add_source(name, counts, duplicates, content=content)
+
+    def claimed_elsewhere(self, q_id, key, source):
+        """
+        Sources other than `source` that use `q_id` for a different question (content
+        key `key`). Empty when the server or mirror already holds this content under it.
+        """
+        owners = self.owners.get(q_id, {})
+        if any(owners.get(name) == key for name in CLIENT_SOURCES):
+            return []
+        return sorted(name for name, other in owners.items() if name != source and other != key)
+
+    def next_id(self, q_type, year=None):
+        """Next free id for type+year (O(1)); it is recorded as allocated."""
+        if q_type not in QID_TYPES:
+            raise ValueError(f"Unknown question type: {q_type!r}")
+        year = current_year() if year is None else year
+        key = f"{q_type}{year:02d}"
+        seq = self.high.get(key, 0) + 1
+        if seq > 99999:
+            raise OverflowError(f"{key} sequence exhausted")
+        self.high[key] = seq
+        q_id = format_qid(q_type, year, seq)
+        self.used.add(q_id)
+        self.allocated.append(q_id)
+        return q_id
+
+    def problems(self):
+        """
+        [(kind, q_id, detail)] for duplicate ids inside one source, ids that sources use
+        for different questions ('collision') and malformed ids.
+        """
+        found = []
+        for q_id, owners in sorted(self.owners.items()):
+            if len(set(owners.values())) > 1:
+                found.append(('collision', q_id, ", ".join(sorted(owners))))
+        for name, entry in sorted(self.sources.items()):
+            for q_id, where in sorted(entry.get('duplicates', {}).items()):
+                found.append(('duplicate', q_id, f"{name}: {where}"))
+            for q_id in entry['ids']:
+                if not parse_qid(q_id):
+                    found.append(('malformed', q_id, name))
+        return found
+
+
+def default_csvs():
+    return sorted(glob.glob(DEFAULT_GLOB))
+
+
+def report_pruned(dropped):
+    for name in dropped:
+        print(f"📇 Forgot {name} (not refreshed or no longer on disk)")
+
+
+def refresh(index, csvs, mirror=False, server=False):
+    read = sum(index.refresh_csv(path) for path in csvs if os.path.exists(path))
+    print(f"📇 {read} of {len(csvs)} CSVs re-read ({len(csvs) - read} unchanged)")
+    report_pruned(index.prune(csvs))
+    if mirror:
+        from mirror import MirrorClient
+        index.refresh_client('mirror', MirrorClient())
+        print("📇 Mirror indexed")
+    if server:
+        from supabase_client import get_client
+        index.refresh_client('server', get_client())
+        print("📇 Server indexed")
+    index.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="q_id index and allocator.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_refresh = sub.add_parser('refresh', help="Index q_ids from CSVs (and the mirror / server)")
+    p_refresh.add_argument('paths', nargs='*', help=f"CSV files (default {DEFAULT_GLOB})")
+    p_refresh.add_argument('--mirror', action='store_true', help="Also index the local mirror")
+    p_refresh.add_argument('--server', action='store_true', help="Also index Supabase")
+
+    p_next = sub.add_parser('next', help="Allocate new q_ids")
+    p_next.add_argument('type', choices=QID_TYPES)
+    p_next.add_argument('-n', type=int, default=1, help="How many ids")
+    p_next.add_argument('--year', type=int, help="Two-digit year (default: current year)")
+
+    p_check = sub.add_parser('check', help="Refresh the index, then report duplicate, colliding and malformed q_ids")
+    p_check.add_argument('paths', nargs='*', help=f"CSV files (default {DEFAULT_GLOB})")
+    p_check.add_argument('--mirror', action='store_true', help="Also index the local mirror")
+    p_check.add_argument('--server', action='store_true', help="Also index Supabase")
+
+    p_forget = sub.add_parser('forget', help="Drop sources (CSV paths, 'mirror' or 'server') from the index")
+    p_forget.add_argument('sources', nargs='*', help="Indexed source names")
+    p_forget.add_argument('--missing', action='store_true', help="Also drop every CSV source no longer on disk")
+    args = parser.parse_args()
+
+    index = QidIndex.load()
+    if args.command == 'refresh':
+        refresh(index, args.paths or default_csvs(), args.mirror, args.server)
+        print(f"✅ {len(index.used)} q_ids known; next sequence per type/year: "
+              + ", ".join(f"{k}-{v + 1:05d}" for k, v in sorted(index.high.items())))
+    elif args.command == 'next':
+        for _ in range(args.n):
+            print(index.next_id(args.type, args.year))
+        index.save()
+    elif args.command == 'check':
+        refresh(index, args.paths or default_csvs(), args.mirror, args.server)
+        found = index.problems()
+        for kind, q_id, detail in found:
+            print(f"  ❌ {kind}: {q_id!r} ({detail})")
+        print(f"{len(found)} problems in {len(index.sources)} indexed sources.")
+        if found:
+            sys.exit(1)
+    elif args.command == 'forget':
+        if not args.sources and not args.missing:
+            parser.error("forget needs source names or --missing")
+        for name in args.sources:
+            if index.forget(name):
+                print(f"📇 Forgot {name}")
+            else:
+                print(f"⚠️  {name} is not indexed (known: {', '.join(sorted(index.sources)) or 'none'})")
+        if args.missing:
+            report_pruned(index.prune())
+        index.save()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+"""
+Compact, pre-indexed question bundle for offline board generation.
+
+Instead of fetching `get_random_questions` rows (SELECT * with JSONB columns) at
+cold start, the app can ship (or fetch statically) one binary file holding every
+published question, already indexed by CodeName:
+
+    python doc/question_bundle.py build                       # the 20260128 CSVs -> doc/build/questions.tbqb
+    python doc/question_bundle.py build --mirror --out app/assets/questions.tbqb
+    python doc/question_bundle.py info doc/build/questions.tbqb
+    python doc/question_bundle.py bench --queries 2000          # size / latency vs. the JSON equivalent
+
+vercel_build.sh publishes it as public/questions.tbqb when BUILD_QUESTION_BUNDLE=1.
+
+Format (little-endian, version 2):
+
+    header     HEADER: magic 'TBQB', version, flags, counts, field mask and section offsets
+    strings    byte length of every string (u16 when FLAG_U16_LENGTHS, else u32), then
+               the UTF-8 blob. Every distinct text is stored once, grouped by field;
+               id 0 is null, id 1 is ''.
+    columns    records sorted by q_id, stored column by column: for every FIELDS entry
+               whose bit is set in the field mask, n_records string ids (u16 when
+               FLAG_U16_STRINGS, else u32); then n_records type bytes (ASCII) and
+               n_records flag bytes (FLAG_PUBLISHED, FLAG_JSON_DETAILS). A field that is
+               null in every record (no gender variants, no uuid in CSV builds) has no column.
+    codes      n_codes x CODE, sorted by code text: string id, first posting, count
+    postings   record numbers per code, ascending; u16 when FLAG_U16_POSTINGS, else u32
+
+Lengths instead of offsets and one column per field keep similar bytes together,
+so the file also gzips well when it is served compressed.
+
+Details are stored by DETAIL_FIELDS slot (answers | choice_a, choice_b); other
+question types keep their details as JSON text in detail_a (FLAG_JSON_DETAILS). A
+gender-variant group whose four slots are all null was absent in the source.
+
+QuestionBundle reads a bundle without unpacking it: the code table and the id
+columns are loaded at open, and rows are decoded on access. match() returns the same
+q_ids as codename.CodeIndex.match() (and the `code_names && p_codes` filter of the RPCs).
+
+What it buys is the cold start, not per-board speed: opening it costs well under a
+millisecond where the JSON equivalent has to be parsed and indexed first (ms, growing
+with the bank), so the first board is ready sooner. Each board then decodes its rows,
+which is slower than reading dicts already parsed from JSON; `bench` prints both.
+On the 20260128 bank (925 questions): 199 KiB (83 KiB gzipped) vs 368 KiB (85 KiB)
+of JSON, open 0.3-0.5 ms vs 5-9 ms, then about 0.7 ms vs 0.1 ms per 50-row board.
+
+    >>> rows = [{'q_id': 'B26-00001', 'type': 'B', 'content': '짜장 vs 짬뽕',
+    ...          'details': {'choice_a': '짜장', 'choice_b': '짬뽕', 'order': '1'},
+    ...          'code_names': ['*-*-B-Ar-L3']},
+    ...         {'q_id': 'T26-00001', 'type': 'T', 'content': '질문', 'details': {'answers': '네', 'order': '2'},
+    ...          'code_names': ['*-*-*-*-*']}]
+    >>> bundle = QuestionBundle(build_bundle(rows))
+    >>> bundle.match(['*-*-B-Ar-L3', '*-*-*-*-*'], type_prefix='T')
+    ['T26-00001']
+    >>> bundle.get('B26-00001')['details']
+    {'choice_a': '짜장', 'choice_b': '짬뽕', 'order': '1'}
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import struct
+import bisect
+import argparse
+import statistics
+from itertools import accumulate
+
+from question_loader import DETAIL_FIELDS, VARIANT_KEYS
+
+MAGIC = b'TBQB'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIIIIIIII')
+CODE = struct.Struct('<III')
+FIELDS = (('q_id', 'id', 'content', 'content_en', 'order', 'detail_a', 'detail_b', 'detail_a_en', 'detail_b_en')
+          + VARIANT_KEYS + tuple(k + '_en' for k in VARIANT_KEYS))
+
+FLAG_U16_POSTINGS = 1
+FLAG_U16_STRINGS = 2
+FLAG_U16_LENGTHS = 4
+FLAG_PUBLISHED = 1
+FLAG_JSON_DETAILS = 2
+NULL, EMPTY = 0, 1
+_NO_VARIANTS = [None] * len(VARIANT_KEYS)
+
+DOC_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSVS = [
+    (os.path.join(DOC_DIR, 'BalanceQuizData_20280128.csv'), 'Balance'),
+    (os.path.join(DOC_DIR, 'TruthQuizData_20260128.csv'), 'Truth'),
+]
+DEFAULT_OUT = os.path.join(DOC_DIR, 'build', 'questions.tbqb')
+# What the JSON equivalent carries: the board columns plus code_names
+JSON_COLUMNS = ('id', 'q_id', 'type', 'content', 'content_en', 'details', 'details_en',
+                'gender_variants', 'gender_variants_en', 'code_names')
+
+
+class BundleError(ValueError):
+    pass
+
+
+class _Strings:
+    def __init__(self):
+        self.ids = {}
+        self.blobs = []
+
+    def add(self, text):
+        if text is None:
+            return NULL
+        if text == '':
+            return EMPTY
+        if not isinstance(text, str):
+            text = str(text)
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.blobs) + 2
+            self.blobs.append(text.encode('utf-8'))
+        return sid
+
+
+def _detail_slots(q_type, details):
+    """(detail_a, detail_b, json) for a details object."""
+    if details is None:
+        return None, None, False
+    fields = DETAIL_FIELDS.get(q_type)
+    if fields is None:
+        return json.dumps(details, ensure_ascii=False, sort_keys=True), None, True
+    values = [details.get(f, '') for f in fields]
+    return values[0], (values[1] if len(values) > 1 else None), False
+
+
+def build_bundle(rows, built_at=None):
+    """Serialize question rows (payload or `questions` dicts) into bundle bytes."""
+    rows = sorted((r for r in rows if r.get('q_id') and r.get('is_published') is not False), key=lambda r: r['q_id'])
+    columns = {f: [] for f in FIELDS}
+    types = bytearray()
+    record_flags = bytearray()
+    postings = {}
+
+    for number, row in enumerate(rows):
+        q_type = row.get('type') or ''
+        details = row.get('details') or {}
+        detail_a, detail_b, as_json = _detail_slots(q_type, details)
+        detail_a_en, detail_b_en, _ = _detail_slots(q_type, row.get('details_en'))
+        values = {
+            'q_id': row['q_id'],
+            'id': row.get('id'),
+            'content': row.get('content') or '',
+            'content_en': row.get('content_en'),
+            'order': None if as_json else details.get('order'),
+            'detail_a': detail_a,
+            'detail_b': detail_b,
+            'detail_a_en': detail_a_en,
+            'detail_b_en': detail_b_en,
+        }
+        for suffix in ('', '_en'):
+            variants = row.get('gender_variants' + suffix)
+            for key in VARIANT_KEYS:
+                values[key + suffix] = None if variants is None else (variants.get(key) or '')
+        for f in FIELDS:
+            columns[f].append(values[f])
+        types.append(ord(q_type[:1] or ' '))
+        record_flags.append(FLAG_PUBLISHED | (FLAG_JSON_DETAILS if as_json else 0))
+        for code in dict.fromkeys(row.get('code_names') or ()):
+            postings.setdefault(code, []).append(number)
+
+    # Strings are numbered column by column, so the blob holds similar text together
+    strings = _Strings()
+    present = [f for f in FIELDS if any(v is not None for v in columns[f])]
+    column_ids = [[strings.add(v) for v in columns[f]] for f in present]
+    field_mask = sum(1 << i for i, f in enumerate(FIELDS) if f in present)
+    codes = sorted(postings)
+    code_ids = [strings.add(code) for code in codes]
+
+    n_records = len(rows)
+    n_strings = len(strings.blobs) + 2
+    lengths = [0, 0] + [len(blob) for blob in strings.blobs]
+    flags = FLAG_U16_POSTINGS if n_records <= 0xFFFF else 0
+    if n_strings <= 0xFFFF:
+        flags |= FLAG_U16_STRINGS
+    if max(lengths) <= 0xFFFF:
+        flags |= FLAG_U16_LENGTHS
+    string_section = (struct.pack(f"<{n_strings}{'H' if flags & FLAG_U16_LENGTHS else 'I'}", *lengths)
+                      + b''.join(strings.blobs))
+
+    sid = 'H' if flags & FLAG_U16_STRINGS else 'I'
+    column_section = b''.join(struct.pack(f'<{n_records}{sid}', *ids) for ids in column_ids)
+    column_section += bytes(types) + bytes(record_flags)
+
+    width = 'H' if flags & FLAG_U16_POSTINGS else 'I'
+    code_section = bytearray()
+    posting_values = []
+    for code, code_sid in zip(codes, code_ids):
+        code_section += CODE.pack(code_sid, len(posting_values), len(postings[code]))
+        posting_values.extend(postings[code])
+    posting_section = struct.pack(f'<{len(posting_values)}{width}', *posting_values)
+
+    strings_off = HEADER.size
+    columns_off = strings_off + len(string_section)
+    codes_off = columns_off + len(column_section)
+    postings_off = codes_off + len(code_section)
+    header = HEADER.pack(MAGIC, VERSION, flags, n_strings, n_records, len(codes), field_mask,
+                         strings_off, columns_off, codes_off, postings_off,
+                         int(built_at if built_at is not None else time.time()))
+    return b''.join([header, string_section, column_section, bytes(code_section), posting_section])
+
+
+class QuestionBundle:
+    """Read-only view over bundle bytes (or a file path)."""
+
+    def __init__(self, source):
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                source = f.read()
+        self.data = source
+        if len(source) < 6:
+            raise BundleError("Truncated bundle")
+        magic, version = struct.unpack_from('<4sH', source, 0)
+        if magic != MAGIC:
+            raise BundleError(f"Not a question bundle (magic {magic!r})")
+        if version != VERSION:
+            raise BundleError(f"Unsupported bundle version {version} (reader is {VERSION})")
+        if len(source) < HEADER.size:
+            raise BundleError("Truncated bundle")
+        (_, _, self.flags, self.n_strings, self.n_records, self.n_codes, self.field_mask, strings_off,
+         columns_off, self._codes, self._postings, self.built_at) = HEADER.unpack_from(source, 0)
+
+        length = 'H' if self.flags & FLAG_U16_LENGTHS else 'I'
+        lengths = struct.unpack_from(f'<{self.n_strings}{length}', source, strings_off)
+        self._offsets = tuple(accumulate(lengths, initial=0))
+        blob = strings_off + struct.calcsize(f'<{self.n_strings}{length}')
+        self._text = source[blob:blob + self._offsets[-1]]
+
+        # One tuple of string ids per field; None for fields without a column (all null)
+        sid = 'H' if self.flags & FLAG_U16_STRINGS else 'I'
+        n = self.n_records
+        offset = columns_off
+        self._columns = []
+        for i in range(len(FIELDS)):
+            if self.field_mask >> i & 1:
+                self._columns.append(struct.unpack_from(f'<{n}{sid}', source, offset))
+                offset += struct.calcsize(f'<{n}{sid}')
+            else:
+                self._columns.append(None)
+        self._present = [(i, column) for i, column in enumerate(self._columns) if column is not None]
+        self._types = source[offset:offset + n]
+        self._record_flags = source[offset + n:offset + 2 * n]
+
+        self._width = 2 if self.flags & FLAG_U16_POSTINGS else 4
+        self._format = '<{}' + ('H' if self._width == 2 else 'I')
+        self.codes = {}
+        for i in range(self.n_codes):
+            code_sid, first, count = CODE.unpack_from(source, self._codes + i * CODE.size)
+            self.codes[self.string(code_sid)] = (first, count)
+        self._q_ids = None
+
+    def __len__(self):
+        return self.n_records
+
+    def string(self, sid):
+        if sid == NULL:
+            return None
+        return self._text[self._offsets[sid]:self._offsets[sid + 1]].decode('utf-8')
+
+    def q_id(self, number):
+        return self.string(self._columns[0][number])
+
+    def postings(self, code):
+        """Record numbers of the questions tagged with `code` (ascending)."""
+        first, count = self.codes.get(code, (0, 0))
+        if not count:
+            return ()
+        return struct.unpack_from(self._format.format(count), self.data, self._postings + first * self._width)
+
+    def _type_range(self, type_prefix):
+        # Records are sorted by q_id, so a q_id prefix is one contiguous range
+        if self._q_ids is None:
+            self._q_ids = [self.q_id(n) for n in range(self.n_records)]
+        lo = bisect.bisect_left(self._q_ids, type_prefix)
+        hi = bisect.bisect_left(self._q_ids, type_prefix[:-1] + chr(ord(type_prefix[-1]) + 1))
+        return lo, hi
+
+    def match_numbers(self, codes, type_prefix=None):
+        numbers = set()
+        for code in codes:
+            numbers.update(self.postings(code))
+        if type_prefix:
+            lo, hi = self._type_range(type_prefix)
+            return sorted(n for n in numbers if lo <= n < hi)
+        return sorted(numbers)
+
+    def match(self, codes, type_prefix=None):
+        """q_ids whose code_names overlap `codes`, in q_id order."""
+        return [self.q_id(n) for n in self.match_numbers(codes, type_prefix)]
+
+    def row(self, number):
+        """The question as a `questions` row dict (BOARD_COLUMNS of board_generator)."""
+        text, offsets = self._text, self._offsets
+        values = [None] * len(FIELDS)
+        for i, column in self._present:
+            sid = column[number]
+            if sid != NULL:
+                values[i] = text[offsets[sid]:offsets[sid + 1]].decode('utf-8')
+        (q_id, uuid, content, content_en, order, detail_a, detail_b, detail_a_en, detail_b_en,
+         *variants) = values
+        q_type, flags = chr(self._types[number]), self._record_flags[number]
+
+        if flags & FLAG_JSON_DETAILS:
+            details = json.loads(detail_a) if detail_a else {}
+            details_en = json.loads(detail_a_en) if detail_a_en else None
+        else:
+            names = DETAIL_FIELDS.get(q_type, ())
+            details = {k: v for k, v in zip(names, (detail_a, detail_b)) if v is not None}
+            if order is not None:
+                details['order'] = order
+            details_en = None
+            if detail_a_en is not None:
+                details_en = {k: v for k, v in zip(names, (detail_a_en, detail_b_en)) if v is not None}
+
+        groups = []
+        for group in (variants[:4], variants[4:]):
+            # All four null: the source had no such columns
+            groups.append(None if group == _NO_VARIANTS else {k: v for k, v in zip(VARIANT_KEYS, group) if v})
+        return {
+            'id': uuid,
+            'q_id': q_id,
+            'type': q_type,
+            'content': content,
+            'content_en': content_en,
+            'details': details,
+            'details_en': details_en,
+            'gender_variants': groups[0],
+            'gender_variants_en': groups[1],
+        }
+
+    def get(self, q_id):
+        if self._q_ids is None:
+            self._q_ids = [self.q_id(n) for n in range(self.n_records)]
+        n = bisect.bisect_left(self._q_ids, q_id)
+        if n < self.n_records and self._q_ids[n] == q_id:
+            return self.row(n)
+        return None
+
+    def rows(self):
+        """Every question with its code_names (input for board_generator.BoardGenerator)."""
+        codes = [[] for _ in range(self.n_records)]
+        for code in sorted(self.codes):
+            for n in self.postings(code):
+                codes[n].append(code)
+        for n in range(self.n_records):
+            row = self.row(n)
+            row['code_names'] = codes[n]
+            yield row
+
+
+def load_rows(csvs=None, mirror=False):
+    """Published question rows from the local mirror or from CSV banks."""
+    if mirror:
+        from mirror import MirrorClient
+        from supabase_client import scan_table
+        return list(scan_table(MirrorClient(), ','.join(JSON_COLUMNS + ('is_published',))))
+    from question_loader import iter_payloads
+    rows = []
+    for path, quiz_type in csvs or DEFAULT_CSVS:
+        rows.extend(iter_payloads(path, quiz_type))
+    return rows
+
+
+def write_bundle(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def json_equivalent(rows):
+    """The same questions as a JSON document (what a static JSON asset would hold)."""
+    return json.dumps([{k: r.get(k) for k in JSON_COLUMNS} for r in rows
+                       if r.get('q_id') and r.get('is_published') is not False],
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _cells():
+    from code_coverage import RELATIONSHIPS
+    return [(host, guest, rel, sub, level)
+            for (rel, sub), (levels, pairs) in RELATIONSHIPS.items()
+            for level in levels for host, guest in pairs]
+
+
+def _best(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def benchmark(rows, queries=1000, repeat=5, seed=7, per_type=25):
+    """
+    Size, cold open and per-board latency of the bundle vs. the JSON equivalent. A
+    board query matches one random cell and materializes `per_type` Truth and
+    Balance rows (the same picks on both sides).
+    """
+    from codename import CodeIndex, candidate_codes
+
+    bundle_data = build_bundle(rows)
+    json_data = json_equivalent(rows)
+    rng = random.Random(seed)
+    cells = [candidate_codes(h, g, rel, sub, lvl, include_any=True) for h, g, rel, sub, lvl in _cells()]
+    picks = [(rng.choice(cells), rng.random()) for _ in range(queries)]
+
+    def open_json():
+        loaded = json.loads(json_data)
+        by_id = {r['q_id']: r for r in loaded}
+        return by_id, CodeIndex((r['q_id'], r['code_names']) for r in loaded)
+
+    json_open, (by_id, index) = _best(open_json, repeat)
+    bundle_open, bundle = _best(lambda: QuestionBundle(bundle_data), repeat)
+
+    def chosen(matched, seed):
+        return random.Random(seed).sample(matched, min(per_type, len(matched)))
+
+    def board_json(codes, seed):
+        return [by_id[q] for prefix in ('T', 'B') for q in chosen(index.match(codes, prefix), seed)]
+
+    def board_bundle(codes, seed):
+        return [bundle.row(n) for prefix in ('T', 'B') for n in chosen(bundle.match_numbers(codes, prefix), seed)]
+
+    def latencies(fn):
+        out = []
+        for codes, seed in picks:
+            started = time.perf_counter()
+            fn(codes, seed)
+            out.append(time.perf_counter() - started)
+        return sorted(out)
+
+    for codes, seed in picks[:50]:
+        if [r['q_id'] for r in board_json(codes, seed)] != [r['q_id'] for r in board_bundle(codes, seed)]:
+            raise BundleError("Bundle and JSON disagree on a board")
+
+    results = {}
+    for name, data, opened, fn in (('json', json_data, json_open, board_json),
+                                   ('bundle', bundle_data, bundle_open, board_bundle)):
+        times = latencies(fn)
+        results[name] = {
+            'bytes': len(data),
+            'gzip_bytes': len(gzip.compress(data, 9)),
+            'open_ms': opened * 1000,
+            'board_p50_us': statistics.median(times) * 1e6,
+            'board_p95_us': times[int(0.95 * (len(times) - 1))] * 1e6,
+        }
+    return results
+
+
+def print_info(bundle, path=None):
+    size = len(bundle.data)
+    print(f"📦 {path or 'bundle'}: {size / 1024:.1f} KiB, version {VERSION}, built "
+          f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(bundle.built_at))}")
+    print(f"  {bundle.n_records} questions, {bundle.n_codes} codes, {bundle.n_strings} strings, "
+          f"{'u16' if bundle.flags & FLAG_U16_STRINGS else 'u32'} string ids, "
+          f"{'u16' if bundle.flags & FLAG_U16_POSTINGS else 'u32'} postings")
+    missing = [f for i, f in enumerate(FIELDS) if not bundle.field_mask >> i & 1]
+    if missing:
+        print(f"  no column (null in every question): {', '.join(missing)}")
+    types = {}
+    for n in range(bundle.n_records):
+        q_id = bundle.q_id(n)
+        types[q_id[:1]] = types.get(q_id[:1], 0) + 1
+    print("  " + ", ".join(f"{t}: {c}" for t, c in sorted(types.items())))
+
+
+def parse_csv_arg(value):
+    path, _, quiz_type = value.rpartition(':')
+    if not path:
+        # Like board_generator --csv: the type follows from the file name
+        path, quiz_type = value, ('Truth' if 'Truth' in os.path.basename(value) else 'Balance')
+    return path, quiz_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, inspect and benchmark the offline question bundle.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_source(p):
+        p.add_argument('--mirror', action='store_true', help="Read the local SQLite mirror")
+        p.add_argument('--csv', nargs='+', type=parse_csv_arg, metavar='PATH[:TYPE]',
+                       help="CSV banks (default: the 20260128 Balance and Truth files)")
+
+    build = sub.add_parser('build', help="Write a bundle")
+    add_source(build)
+    build.add_argument('--out', default=DEFAULT_OUT, help="Output file (default doc/build/questions.tbqb)")
+    build.add_argument('--json', metavar='PATH', help="Also write the JSON equivalent")
+
+    info = sub.add_parser('info', help="Describe a bundle")
+    info.add_argument('path', nargs='?', default=DEFAULT_OUT)
+
+    bench = sub.add_parser('bench', help="Compare size and latency with the JSON equivalent")
+    add_source(bench)
+    bench.add_argument('--queries', type=int, default=1000, help="Random board cells to query (default 1000)")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        try:
+            print_info(QuestionBundle(args.path), args.path)
+        except (OSError, BundleError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+
+    rows = load_rows(args.csv, args.mirror)
+    if not rows:
+        print("❌ No questions found.")
+        sys.exit(1)
+
+    if args.command == 'build':
+        data = build_bundle(rows)
+        write_bundle(args.out, data)
+        print_info(QuestionBundle(data), args.out)
+        if args.json:
+            write_bundle(args.json, json_equivalent(rows))
+            print(f"📝 JSON equivalent -> {args.json}")
+        return
+
+    results = benchmark(rows, args.queries)
+    print(f"⏱  {len(rows)} questions, {args.queries} boards (random cells, 25 Truth + 25 Balance rows)")
+    print(f"  {'':<8} {'KiB':>9} {'gzip KiB':>9} {'open ms':>9} {'board p50 µs':>13} {'p95 µs':>9} {'1st board ms':>13}")
+    for name, r in results.items():
+        print(f"  {name:<8} {r['bytes'] / 1024:>9.1f} {r['gzip_bytes'] / 1024:>9.1f} {r['open_ms']:>9.2f} "
+              f"{r['board_p50_us']:>13.1f} {r['board_p95_us']:>9.1f} {r['open_ms'] + r['board_p50_us'] / 1000:>13.2f}")
+
+if __name__ == "__main__":
+    main()
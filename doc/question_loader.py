@@ -0,0 +1,224 @@
+"""
+One loader for every question CSV layout in doc/.
+
+Known layouts (all handled by the same code path):
+    Restored_*:   CodeName,Order,q_id,content,answers | choice_a,choice_b
+    *_20260128:   ... + content_en, answers_en | choice_a_en, choice_b_en
+    *_v2:         ... + var_m_f,var_f_m,var_m_m,var_f_f (+ *_en)
+
+QuestionCsv streams rows with a repaired header (BOM, the '스CodeName' typo) without
+reading the file into memory; short rows are padded with ''. Rows with more cells than
+the header (usually an unquoted comma, which shifts every later column) are recorded
+in `overlong`, and iter_records() warns about them. QuestionRecord is a
+__slots__ record with interned code tuples, and QuestionRecord.payload() is the one
+place that maps a CSV row to a `questions` upsert payload.
+
+Column groups the file does not have (English text, gender variants) are left out of
+the payload, so an upsert from an older layout never blanks them on the server. Every
+payload carries its content_hash, so whichever script upserts it keeps
+`questions.content_hash` (what sync_questions.py diffs against) current.
+
+    >>> rec = QuestionRecord.from_row({'CodeName': '*-*-B-Ar-L3', 'Order': '1', 'q_id': 'T26-00001',
+    ...                                'content': ' 질문 ', 'answers': '네'}, 'Truth')
+    >>> payload = rec.payload()
+    >>> payload.pop('content_hash') == content_hash(payload)
+    True
+    >>> payload
+    {'q_id': 'T26-00001', 'type': 'T', 'content': '질문', 'details': {'answers': '네', 'order': '1'}, 'code_names': ['*-*-B-Ar-L3']}
+"""
+import csv
+import json
+import hashlib
+from functools import lru_cache
+
+from codename import split_codes
+from profiling import phase, profiled
+
+QUIZ_TYPES = {'Truth': 'T', 'Balance': 'B', 'T': 'T', 'B': 'B'}
+DETAIL_FIELDS = {'T': ('answers',), 'B': ('choice_a', 'choice_b')}
+VARIANT_KEYS = ('var_m_f', 'var_f_m', 'var_m_m', 'var_f_f')
+HEADER_FIXES = {'스CodeName': 'CodeName'}
+# Payload keys that are not part of the content itself
+HASH_EXCLUDE = {'q_id', 'content_hash'}
+# One encoder for every hash (json.dumps builds a new one per call for these options)
+_CANONICAL = json.JSONEncoder(ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def repair_header(fieldnames):
+    """Return (fixed names, [(old, new), ...]) for BOM / whitespace / known typos."""
+    fixed = []
+    changes = []
+    for name in fieldnames:
+        clean = name.replace('﻿', '').strip()
+        clean = HEADER_FIXES.get(clean, clean)
+        if clean != name:
+            changes.append((name, clean))
+        fixed.append(clean)
+    return fixed, changes
+
+
+class QuestionCsv:
+    """
+    Streaming reader over a question CSV.
+
+        with QuestionCsv(path) as source:
+            source.fieldnames    # repaired header
+            for row in source:   # dict per row, every header key present
+                ...
+            source.overlong      # [(line, cells)] of rows wider than the header
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fieldnames = []
+        self.repaired = []
+        self.overlong = []
+        self._file = None
+        self._reader = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'r', newline='', encoding='utf-8-sig')
+        self._reader = csv.reader(self._file)
+        header = next(self._reader, None) or []
+        self.fieldnames, self.repaired = repair_header(header)
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+    def __iter__(self):
+        names = self.fieldnames
+        width = len(names)
+        for values in self._reader:
+            if not values:
+                continue
+            if len(values) < width:
+                values += [''] * (width - len(values))
+            elif len(values) > width:
+                # The extra cells have no column; zip() keeps the first `width`
+                self.overlong.append((self._reader.line_num, len(values)))
+            yield dict(zip(names, values))
+
+    def describe_overlong(self):
+        lines = ", ".join(str(line) for line, _ in self.overlong[:10])
+        more = f" and {len(self.overlong) - 10} more" if len(self.overlong) > 10 else ''
+        return (f"{len(self.overlong)} rows with more cells than the {len(self.fieldnames)}-column header "
+                f"(unquoted comma?), line{'s' if len(self.overlong) > 1 else ''} {lines}{more}")
+
+
+def content_hash(payload):
+    """Stable hash over every payload field except q_id (key order independent)."""
+    body = {k: v for k, v in payload.items() if k not in HASH_EXCLUDE}
+    return hashlib.sha1(_CANONICAL.encode(body).encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def code_tuple(cell):
+    """Interned tuple of the codes in a CodeName cell (identical cells share one tuple)."""
+    return tuple(split_codes(cell))
+
+
+def _variants(row, suffix):
+    keys = [k + suffix for k in VARIANT_KEYS]
+    if not any(k in row for k in keys):
+        return None
+    return tuple((row.get(k) or '').strip() for k in keys)
+
+
+class QuestionRecord:
+    """
+    One question as parsed from a CSV row.
+    details / details_en hold the values of DETAIL_FIELDS[type]; optional groups
+    (content_en, details_en, gender variants) are None when the source has no such columns.
+    """
+
+    __slots__ = ('q_id', 'type', 'order', 'content', 'content_en', 'details', 'details_en',
+                 'code_names', 'gender_variants', 'gender_variants_en')
+
+    def __init__(self, q_id, type, order='', content='', content_en=None, details=(), details_en=None,
+                 code_names=(), gender_variants=None, gender_variants_en=None):
+        self.q_id = q_id
+        self.type = type
+        self.order = order
+        self.content = content
+        self.content_en = content_en
+        self.details = details
+        self.details_en = details_en
+        self.code_names = code_names
+        self.gender_variants = gender_variants
+        self.gender_variants_en = gender_variants_en
+
+    def __repr__(self):
+        return f"QuestionRecord({self.q_id!r}, {self.type!r}, {self.content[:20]!r})"
+
+    @classmethod
+    def from_row(cls, row, quiz_type):
+        """Build from a CSV row dict; `quiz_type` is 'Truth'/'Balance' (or 'T'/'B')."""
+        q_type = QUIZ_TYPES.get(quiz_type)
+        if q_type is None:
+            raise ValueError(f"Unknown quiz type: {quiz_type!r}")
+        fields = DETAIL_FIELDS[q_type]
+
+        en_fields = [f + '_en' for f in fields]
+        details_en = None
+        if any(f in row for f in en_fields):
+            details_en = tuple(row.get(f) or '' for f in en_fields)
+        content_en = (row.get('content_en') or '').strip() if 'content_en' in row else None
+
+        return cls(
+            q_id=(row.get('q_id') or '').strip(),
+            type=q_type,
+            order=(row.get('Order') or '').strip(),
+            content=(row.get('content') or '').strip(),
+            content_en=content_en,
+            details=tuple(row.get(f) or '' for f in fields),
+            details_en=details_en,
+            code_names=code_tuple(row.get('CodeName') or ''),
+            gender_variants=_variants(row, ''),
+            gender_variants_en=_variants(row, '_en'),
+        )
+
+    def payload(self):
+        """The canonical `questions` upsert payload for this record (with its content_hash)."""
+        fields = DETAIL_FIELDS[self.type]
+        details = dict(zip(fields, self.details))
+        details['order'] = self.order
+
+        payload = {'q_id': self.q_id, 'type': self.type, 'content': self.content}
+        if self.content_en is not None:
+            payload['content_en'] = self.content_en
+        payload['details'] = details
+        if self.details_en is not None:
+            payload['details_en'] = dict(zip(fields, self.details_en))
+        payload['code_names'] = list(self.code_names)
+        # Keys inside both variant objects are the base keys (var_m_f, ...), as GameSession expects
+        if self.gender_variants is not None:
+            payload['gender_variants'] = {k: v for k, v in zip(VARIANT_KEYS, self.gender_variants) if v}
+        if self.gender_variants_en is not None:
+            payload['gender_variants_en'] = {k: v for k, v in zip(VARIANT_KEYS, self.gender_variants_en) if v}
+        payload['content_hash'] = content_hash(payload)
+        return payload
+
+
+def iter_records(path, quiz_type, require_q_id=True):
+    """Stream QuestionRecords from a CSV (rows without q_id are skipped unless require_q_id=False)."""
+    prepare = phase('question_loader.prepare')
+    with QuestionCsv(path) as source:
+        if source.repaired:
+            print(f"  ! Repaired header in {path}: " + ", ".join(f"{old!r} -> {new!r}" for old, new in source.repaired))
+        for row in profiled(source, 'question_loader.read'):
+            with prepare:
+                record = QuestionRecord.from_row(row, quiz_type)
+            if record.q_id or not require_q_id:
+                yield record
+        if source.overlong:
+            print(f"  ! {path}: {source.describe_overlong()}; extra cells were ignored")
+
+
+def iter_payloads(path, quiz_type):
+    """Stream canonical upsert payloads from a CSV."""
+    prepare = phase('question_loader.prepare')
+    for record in iter_records(path, quiz_type):
+        with prepare:
+            payload = record.payload()
+        yield payload
@@ -0,0 +1,240 @@
+"""
+Shared Supabase config + client for the doc/ maintenance scripts.
+
+- Config is resolved once: app/assets/env_config, then app/.env, then the process
+  environment (later sources win).
+- Clients are cached per key role and share one keep-alive HTTP connection pool.
+- Requests answered with 429 / 5xx (or dropped connections) are retried with
+  jittered exponential backoff.
+- add_request_hook() registers a callback that receives per-request timings.
+- TALKBINGO_TRACE=1 records every request and prints a summary at exit
+  (instrumentation.py).
+
+Usage:
+    from supabase_client import get_client
+    supabase = get_client()            # service role (falls back to anon)
+    anon = get_client('anon')
+"""
+import os
+import time
+import random
+import threading
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ENV_FILES = [
+    os.path.join(ROOT_DIR, 'app/assets/env_config'),
+    os.path.join(ROOT_DIR, 'app/.env'),
+]
+
+# Accepted aliases for each setting, first match wins
+CONFIG_KEYS = {
+    'url': ['SUPABASE_URL', 'NEXT_PUBLIC_SUPABASE_URL'],
+    'anon': ['SUPABASE_ANON_KEY', 'NEXT_PUBLIC_SUPABASE_ANON_KEY'],
+    'service': ['SUPABASE_SERVICE_ROLE_KEY'],
+}
+
+# HTTP behaviour
+REQUEST_TIMEOUT = 30.0
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE = 10
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5     # seconds
+BACKOFF_CAP = 8.0      # seconds
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+_config = None
+_clients = {}
+_pool = None
+_request_hooks = []
+
+
+def parse_env_file(path):
+    """Parse a KEY=VALUE file, ignoring blanks and comments."""
+    env = {}
+    if not os.path.exists(path):
+        return env
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('=', 1)
+            if len(parts) == 2:
+                env[parts[0].strip()] = parts[1].strip().strip('"').strip("'")
+    return env
+
+
+def load_env():
+    """Merged environment: env files first, process environment overrides."""
+    global _config
+    with _lock:
+        if _config is None:
+            env = {}
+            for path in ENV_FILES:
+                env.update(parse_env_file(path))
+            env.update({k: v for k, v in os.environ.items() if v})
+            _config = env
+    return _config
+
+
+def get_setting(name):
+    env = load_env()
+    for key in CONFIG_KEYS[name]:
+        if env.get(key):
+            return env[key]
+    return None
+
+
+def get_credentials(role='service'):
+    """Return (url, key) for a role. 'service' falls back to the anon key."""
+    url = get_setting('url')
+    if role == 'anon':
+        key = get_setting('anon')
+    else:
+        key = get_setting('service') or get_setting('anon')
+    return url, key
+
+
+def add_request_hook(hook):
+    """
+    Register hook(request, response, elapsed, attempts), called after every HTTP request.
+    `response` is None when the request ultimately raised; its body is already read.
+    """
+    _request_hooks.append(hook)
+
+
+def remove_request_hook(hook):
+    if hook in _request_hooks:
+        _request_hooks.remove(hook)
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_CAP)
+        except ValueError:
+            pass
+    # Full jitter: uniform(0, min(cap, base * 2^attempt))
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _make_transport():
+    import httpx
+
+    class RetryTransport(httpx.BaseTransport):
+        """Keep-alive transport that retries 429/5xx and connection errors."""
+
+        def __init__(self):
+            self._inner = httpx.HTTPTransport(
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                    max_keepalive_connections=MAX_KEEPALIVE),
+            )
+
+        def handle_request(self, request):
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    response = self._inner.handle_request(request)
+                except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError, httpx.TimeoutException):
+                    if attempt > MAX_RETRIES:
+                        _run_hooks(request, None, time.perf_counter() - started, attempt)
+                        raise
+                    time.sleep(_backoff(attempt))
+                    continue
+
+                if response.status_code in RETRY_STATUS and attempt <= MAX_RETRIES:
+                    delay = _backoff(attempt, response.headers.get('retry-after'))
+                    response.close()
+                    print(f"  ~ {request.method} {request.url.path} -> {response.status_code}, retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                if _request_hooks:
+                    response.read()
+                    _run_hooks(request, response, time.perf_counter() - started, attempt)
+                return response
+
+        def close(self):
+            # Shared by every cached client; lives for the whole process
+            pass
+
+    return RetryTransport()
+
+
+def _run_hooks(request, response, elapsed, attempts):
+    for hook in list(_request_hooks):
+        try:
+            hook(request, response, elapsed, attempts)
+        except Exception as e:
+            print(f"  ! request hook failed: {e}")
+
+
+def _shared_transport():
+    global _pool
+    if _pool is None:
+        _pool = _make_transport()
+    return _pool
+
+
+def _attach_pool(client):
+    """Swap the PostgREST session for one backed by the shared pooled transport."""
+    import httpx
+
+    postgrest = client.postgrest
+    old = postgrest.session
+    postgrest.session = httpx.Client(
+        base_url=old.base_url,
+        headers=old.headers,
+        timeout=REQUEST_TIMEOUT,
+        transport=_shared_transport(),
+    )
+    old.close()
+    return client
+
+
+def get_client(role='service'):
+    """Cached Supabase client for 'service' (admin) or 'anon' (app view)."""
+    with _lock:
+        if role in _clients:
+            return _clients[role]
+
+    url, key = get_credentials(role)
+    if not url or not key:
+        raise RuntimeError(f"Missing Supabase credentials for role '{role}' "
+                           "(checked app/assets/env_config, app/.env and environment)")
+
+    if os.environ.get('TALKBINGO_TRACE'):
+        from instrumentation import enable_from_env
+        enable_from_env()
+
+    from supabase import create_client
+    client = _attach_pool(create_client(url, key))
+    with _lock:
+        return _clients.setdefault(role, client)
+
+
+def scan_table(client, columns, table='questions', key='q_id', page_size=1000,
+               where=None, lower=None, upper=None):
+    """
+    Keyset-paginated scan (no OFFSET): yields rows ordered by `key`.
+    `where` is an optional callable that adds filters to each page query,
+    `lower` / `upper` restrict the scan to lower < key <= upper.
+    """
+    last = lower
+    while True:
+        query = client.table(table).select(columns).order(key).limit(page_size)
+        if last is not None:
+            query = query.gt(key, last)
+        if upper is not None:
+            query = query.lte(key, upper)
+        if where:
+            query = where(query)
+        rows = query.execute().data or []
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        last = rows[-1][key]
@@ -0,0 +1,130 @@
+"""
+Incremental diff-sync for the `questions` table.
+
+Instead of deleting every row and re-inserting the whole CSV, each payload gets a
+stable content hash (stored in `questions.content_hash`, see
+supabase/migrations/20261018_questions_content_hash.sql). Only `q_id` + hash are
+fetched from the server, and only inserts, changed rows and explicit deletes are sent.
+
+Rows whose server hash is NULL (never synced) count as changed, so the first run
+backfills the column. The hash is part of every question payload
+(question_loader.QuestionRecord.payload), so the other importers keep it current too,
+and supabase/migrations/20261019_questions_content_hash_trigger.sql NULLs it when a
+row's content changes without a new hash (dashboard edits, other tools). Deletes are limited to the types being synced, and a plan that
+deletes more than `max_deletes` rows is refused unless the caller passes force=True
+(a truncated or mis-typed CSV would otherwise wipe the live table).
+"""
+from supabase_client import scan_table
+from batch_recovery import upsert_bisect
+from question_loader import content_hash, HASH_EXCLUDE  # noqa: F401 (re-exported)
+
+# Columns a question payload can carry (question_loader.QuestionRecord.payload)
+PAYLOAD_COLUMNS = ('q_id', 'type', 'content', 'content_en', 'details', 'details_en', 'code_names',
+                   'gender_variants', 'gender_variants_en')
+WRITE_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 200
+# Largest delete a sync applies without --force
+MAX_DELETES = 50
+
+
+def row_content_hash(row):
+    """
+    content_hash of a `questions` row: NULL columns are left out, as payloads from CSV
+    layouts without them omit the key (is_published and timestamps are not content).
+    """
+    return content_hash({k: row[k] for k in PAYLOAD_COLUMNS if row.get(k) is not None})
+
+
+def fetch_server_hashes(supabase, types):
+    """{q_id: content_hash} for every server row of the given types."""
+    hashes = {}
+    rows = scan_table(supabase, 'q_id,content_hash', where=lambda q: q.in_('type', list(types)))
+    for row in rows:
+        if row.get('q_id'):
+            hashes[row['q_id']] = row.get('content_hash')
+    return hashes
+
+
+def plan_sync(payloads, server_hashes):
+    """
+    Compare local payloads with server hashes.
+    Returns {'insert': [...], 'update': [...], 'delete': [q_id, ...], 'unchanged': n}.
+    """
+    local = {}
+    for payload in payloads:
+        q_id = payload['q_id']
+        if q_id in local:
+            print(f"  ! Duplicate q_id in source data: {q_id} (last row wins)")
+        local[q_id] = dict(payload, content_hash=content_hash(payload))
+
+    plan = {'insert': [], 'update': [], 'delete': [], 'unchanged': 0}
+    for q_id, payload in local.items():
+        if q_id not in server_hashes:
+            plan['insert'].append(payload)
+        elif server_hashes[q_id] != payload['content_hash']:
+            plan['update'].append(payload)
+        else:
+            plan['unchanged'] += 1
+
+    plan['delete'] = sorted(q_id for q_id in server_hashes if q_id not in local)
+    return plan
+
+
+def print_plan(plan, limit=10):
+    print(f"  + insert:    {len(plan['insert'])}")
+    print(f"  ~ update:    {len(plan['update'])}")
+    print(f"  - delete:    {len(plan['delete'])}")
+    print(f"  = unchanged: {plan['unchanged']}")
+    for label, items in (('+', plan['insert']), ('~', plan['update'])):
+        for payload in items[:limit]:
+            print(f"    {label} {payload['q_id']}: {payload.get('content', '')[:30]}")
+    for q_id in plan['delete'][:limit]:
+        print(f"    - {q_id}")
+
+
+def apply_plan(supabase, plan, rejects=None):
+    """Send the upserts and deletes of a plan. Returns (written, deleted)."""
+    written = 0
+    deleted = 0
+    rows = plan['insert'] + plan['update']
+
+    for i in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch_written, _ = upsert_bisect(supabase, rows[i:i + WRITE_BATCH_SIZE], rejects=rejects)
+        written += batch_written
+
+    for i in range(0, len(plan['delete']), DELETE_BATCH_SIZE):
+        chunk = plan['delete'][i:i + DELETE_BATCH_SIZE]
+        try:
+            response = supabase.table('questions').delete().in_('q_id', chunk).execute()
+            deleted += len(response.data) if response.data else 0
+        except Exception as e:
+            print(f"  ! Error deleting batch {i}: {e}")
+
+    return written, deleted
+
+
+def sync_questions(supabase, payloads, types, dry_run=False, rejects=None, max_deletes=MAX_DELETES, force=False):
+    """
+    Diff `payloads` against server rows of `types` and apply the difference.
+    Returns the plan, or None if it deletes more than `max_deletes` rows without `force`.
+    """
+    server_hashes = fetch_server_hashes(supabase, types)
+    plan = plan_sync(payloads, server_hashes)
+
+    print(f"Sync plan ({len(server_hashes)} rows on server, types={','.join(types)}):")
+    print_plan(plan)
+
+    too_many = max_deletes is not None and len(plan['delete']) > max_deletes and not force
+    if dry_run:
+        if too_many:
+            print(f"Note: {len(plan['delete'])} deletes exceed the limit of {max_deletes}; a real run needs --force.")
+        print("Dry run: nothing written.")
+        return plan
+    if too_many:
+        print(f"Refusing to delete {len(plan['delete'])} rows (limit {max_deletes}). "
+              f"Check the input files, then re-run with --force.")
+        return None
+
+    written, deleted = apply_plan(supabase, plan, rejects)
+    print(f"Synced: {written} rows written, {deleted} rows deleted.")
+    return plan
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The doc/ scripts import their siblings by module name (python doc/x.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
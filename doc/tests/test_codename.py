@@ -0,0 +1,76 @@
+from codename import ANY_CODE, CodeIndex, candidate_codes, parse
+from code_coverage import compute_coverage
+
+
+def test_candidate_codes_wildcard_lattice():
+    # App priority: MP in (host, *), CP in (guest, *), exact sub before sub wildcard
+    assert candidate_codes('M', 'F', 'B', 'Ar', 3) == (
+        'M-F-B-Ar-L3', 'M-F-B-*-L3',
+        'M-*-B-Ar-L3', 'M-*-B-*-L3',
+        '*-F-B-Ar-L3', '*-F-B-*-L3',
+        '*-*-B-Ar-L3', '*-*-B-*-L3',
+    )
+
+
+def test_candidate_codes_level_forms_agree():
+    assert candidate_codes('F', 'M', 'Lo', 'Sw', 4) == candidate_codes('F', 'M', 'Lo', 'Sw', 'L4')
+
+
+def test_candidate_codes_dedupes_wildcard_inputs():
+    codes = candidate_codes('*', '*', 'B', '*', 2)
+    assert codes == ('*-*-B-*-L2',)
+
+
+def test_candidate_codes_include_any_split():
+    specific = candidate_codes('M', 'F', 'B', 'Ar', 3)
+    with_any = candidate_codes('M', 'F', 'B', 'Ar', 3, include_any=True)
+    assert ANY_CODE not in specific
+    assert with_any == specific + (ANY_CODE,)
+
+
+def test_candidate_codes_are_well_formed():
+    for code in candidate_codes('M', 'F', 'Fa', 'Sb', 5, include_any=True):
+        assert parse(code) is not None
+
+
+def _index():
+    return CodeIndex([
+        ('B26-00001', ['M-F-B-Ar-L3']),
+        ('T26-00001', ['*-*-B-*-L3']),
+        ('B26-00002', [ANY_CODE]),
+        ('T26-00002', [ANY_CODE, 'F-M-Lo-Sw-L4']),
+        ('M26-00001', ['*-*-B-Ar-L3']),
+    ])
+
+
+def test_match_type_prefix():
+    index = _index()
+    codes = candidate_codes('M', 'F', 'B', 'Ar', 3)
+    assert index.match(codes) == ['B26-00001', 'T26-00001', 'M26-00001']
+    assert index.match(codes, type_prefix='B') == ['B26-00001']
+    assert index.match(codes, type_prefix='T') == ['T26-00001']
+    assert index.match(codes, type_prefix='X') == []
+    assert index.count(codes, 'M') == 1
+
+
+def test_match_any_code_only_with_include_any():
+    # get_random_questions gets the specific codes; '*-*-*-*-*' questions come from
+    # get_random_wildcard_questions, so they must not count as specific matches
+    index = _index()
+    assert index.match(candidate_codes('M', 'F', 'B', 'Ar', 3), 'B') == ['B26-00001']
+    assert index.match(candidate_codes('M', 'F', 'B', 'Ar', 3, include_any=True), 'B') == ['B26-00001', 'B26-00002']
+    assert index.match([ANY_CODE], 'T') == ['T26-00002']
+
+
+def test_coverage_excludes_any_code():
+    index = CodeIndex([(f'B26-{i:05d}', [ANY_CODE]) for i in range(1, 31)])
+    assert all(cell['B'] == 0 and cell['T'] == 0 for cell in compute_coverage(index))
+
+
+def test_match_matches_overlap_scan():
+    # Same rows as `code_names && p_codes`, in index order
+    rows = [(f'T26-{i:05d}', [f'{mp}-{cp}-B-Ar-L{lvl}'])
+            for i, (mp, cp, lvl) in enumerate(((mp, cp, lvl) for mp in 'MF*' for cp in 'MF*' for lvl in range(1, 6)), 1)]
+    index = CodeIndex(rows)
+    codes = candidate_codes('F', 'M', 'B', 'Ar', 2, include_any=True)
+    assert index.match(codes) == [q_id for q_id, code_names in rows if set(code_names) & set(codes)]
@@ -1,20 +1,119 @@
-import csv
-
-def update_csv(file_path, is_truth=False):
-    rows = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        for row in reader:
-            # Update q_id to match Order
-            row['q_id'] = row['Order']
-            rows.append(row)
-
-    with open(file_path, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"Updated {file_path}")
-
-update_csv('/Users/anmijung/Desktop/TalkBingo/doc/TruthQuizData.csv', is_truth=True)
-update_csv('/Users/anmijung/Desktop/TalkBingo/doc/BalanceQuizData.csv', is_truth=False)
+"""
+Fix q_ids in quiz CSVs.
+
+    python doc/update_qid.py assign doc/TruthQuizData_v2.csv            # allocate missing / bad / duplicate ids
+    python doc/update_qid.py assign new_batch.csv --type B --dry-run
+    python doc/update_qid.py from-order doc/TruthQuizData.csv           # legacy: q_id = Order
+
+`assign` gives a fresh id (qid_allocator) to every row whose q_id is empty, does not
+follow QuizDataRules.md, repeats an earlier row of the same file, or is used for a
+different question by another source in the index (other CSVs, and the mirror/server
+once indexed with `qid_allocator.py refresh --mirror/--server`). Other rows are copied
+unchanged, and a file without changes is not rewritten.
+"""
+import os
+import argparse
+
+from csv_transform import transform_csv
+from qid_allocator import QidIndex, parse_qid, default_csvs, content_key, report_pruned
+
+TYPE_BY_NAME = (('Truth', 'T'), ('Balance', 'B'), ('Mini', 'M'))
+
+
+def type_for(path, explicit=None):
+    if explicit:
+        return explicit
+    name = os.path.basename(path)
+    for word, q_type in TYPE_BY_NAME:
+        if word in name:
+            return q_type
+    raise SystemExit(f"Cannot tell the question type of {path}; pass --type B|T|M")
+
+
+def rewrite_csv(path, fix_row, dry_run=False):
+    """
+    Stream `path` through fix_row(row) -> new q_id or None. Only rows that get a new
+    q_id change; the file is replaced (atomically) only if something changed and no
+    row is wider than the header. Returns the changes written (or, dry run, planned).
+    """
+    changes = []
+    line = 1
+
+    def apply(row):
+        nonlocal line
+        line += 1
+        new_id = fix_row(row)
+        if new_id is not None and new_id != row.get('q_id'):
+            changes.append((line, row.get('q_id'), new_id))
+            row['q_id'] = new_id
+        return row
+
+    result = transform_csv(path, [apply], add_fields=('q_id',), dry_run=dry_run)
+    if result.overlong and not dry_run:
+        # transform_csv left the file as it was
+        return []
+    return changes
+
+
+def assign(path, index, q_type, dry_run=False):
+    seen = set()
+
+    def fix_row(row):
+        q_id = (row.get('q_id') or '').strip()
+        if q_id and parse_qid(q_id) and q_id not in seen:
+            others = index.claimed_elsewhere(q_id, content_key(row.get('content')), path)
+            if not others:
+                seen.add(q_id)
+                return None
+            print(f"  {q_id} is used for another question in {', '.join(others)}")
+        new_id = index.next_id(q_type)
+        seen.add(new_id)
+        return new_id
+
+    return rewrite_csv(path, fix_row, dry_run)
+
+
+def from_order(path, dry_run=False):
+    # Update q_id to match Order
+    return rewrite_csv(path, lambda row: row.get('Order'), dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fix q_ids in quiz CSVs.")
+    parser.add_argument('mode', choices=('assign', 'from-order'))
+    parser.add_argument('paths', nargs='+', help="CSV files to update")
+    parser.add_argument('--type', choices=('B', 'T', 'M'), help="Question type (default: from the file name)")
+    parser.add_argument('--dry-run', action='store_true', help="Show the changes without writing")
+    args = parser.parse_args()
+
+    index = None
+    if args.mode == 'assign':
+        index = QidIndex.load()
+        # Every other known CSV counts as used, so new ids never collide with them;
+        # CSVs indexed earlier that are gone or not part of this run no longer claim ids
+        csvs = set(default_csvs()) | set(args.paths)
+        for path in csvs:
+            if os.path.exists(path):
+                index.refresh_csv(path)
+        report_pruned(index.prune(csvs))
+
+    for path in args.paths:
+        if not os.path.exists(path):
+            print(f"Skipping {path} (Not found)")
+            continue
+        if args.mode == 'assign':
+            changes = assign(path, index, type_for(path, args.type), args.dry_run)
+        else:
+            changes = from_order(path, args.dry_run)
+        for line, old, new in changes[:20]:
+            print(f"  line {line}: {old!r} -> {new}")
+        verb = "Would update" if args.dry_run else "Updated"
+        print(f"{verb} {len(changes)} rows in {path}")
+        if index and not args.dry_run:
+            index.refresh_csv(path)
+
+    if index and not args.dry_run:
+        index.save()
+
+if __name__ == "__main__":
+    main()
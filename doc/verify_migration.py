@@ -1,38 +1,162 @@
-import os
-from supabase import create_client, Client
-
-# --- Configuration ---
-ENV_FILE_PATH = os.path.join(os.path.dirname(__file__), '../app/assets/env_config')
-
-def load_env():
-    env = {}
-    if os.path.exists(ENV_FILE_PATH):
-        with open(ENV_FILE_PATH, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    parts = line.strip().split('=', 1)
-                    if len(parts) == 2:
-                        env[parts[0].strip()] = parts[1].strip()
-    return env
+"""
+Row-level verification of the 20260128 migration.
 
-def main():
-    env = load_env()
-    url = env.get('SUPABASE_URL')
-    key = env.get('SUPABASE_SERVICE_ROLE_KEY')
-    
-    if not url or not key:
-        print("Error: Config missing")
-        return
+Every CSV row is turned into the payload migrate_quizzes_20260128.py would send and
+hashed with sync_questions.content_hash. Server rows are streamed with the parallel
+keyset exporter (payload columns only), hashed the same way and compared one by one,
+so the report names missing, extra and differing q_ids, with a field-level diff for
+the differing ones.
+
+    python doc/verify_migration.py                 # full comparison (exit 1 on mismatch)
+    python doc/verify_migration.py --sample 200    # spot-check 200 random rows via in_()
+    python doc/verify_migration.py --counts        # old behaviour: per-type counts only
+    python doc/verify_migration.py --mirror        # against the local SQLite mirror
+"""
+import sys
+import random
+import argparse
+
+from supabase_client import get_setting
+from mirror import client_for
+from sync_questions import content_hash, HASH_EXCLUDE
+from migrate_quizzes_20260128 import MIGRATION_FILES, load_payloads
+from export_server_data import export_rows, ExportIncomplete, EXPORT_WORKERS
 
-    supabase: Client = create_client(url, key)
-    
+TYPES = ('B', 'T')
+PAYLOAD_COLUMNS = ('q_id', 'type', 'content', 'content_en', 'details', 'details_en', 'code_names')
+SAMPLE_CHUNK = 200
+REPORT_LIMIT = 20
+
+
+def print_counts(supabase):
     # Count Balance
-    res_b = supabase.table('questions').select('*', count='exact').eq('type', 'B').execute()
+    res_b = supabase.table('questions').select('q_id', count='exact', head=True).eq('type', 'B').execute()
     print(f"Balance Questions (type='B'): {res_b.count}")
 
     # Count Truth
-    res_t = supabase.table('questions').select('*', count='exact').eq('type', 'T').execute()
+    res_t = supabase.table('questions').select('q_id', count='exact', head=True).eq('type', 'T').execute()
     print(f"Truth Questions (type='T'): {res_t.count}")
 
+
+def load_local():
+    """{q_id: payload} for every migration CSV row (last duplicate wins, as in the sync)."""
+    local = {}
+    for file_path, quiz_type in MIGRATION_FILES:
+        for payload in load_payloads(file_path, quiz_type):
+            if payload['q_id'] in local:
+                print(f"  ! Duplicate q_id in source data: {payload['q_id']}")
+            local[payload['q_id']] = payload
+    return local
+
+
+def server_payload(row, keys):
+    """The server row projected onto the local payload's keys."""
+    return {k: row.get(k) for k in keys}
+
+
+def field_diff(local, remote):
+    """[(field, local value, server value)] for fields that differ."""
+    return [(k, local.get(k), remote.get(k)) for k in local if k not in HASH_EXCLUDE and local.get(k) != remote.get(k)]
+
+
+class Verifier:
+    """Compares streamed server rows against the local payloads as they arrive."""
+
+    def __init__(self, local):
+        self.local = local
+        self.hashes = {q_id: content_hash(p) for q_id, p in local.items()}
+        self.seen = set()
+        self.matched = 0
+        self.differing = []      # (q_id, [(field, local, server)])
+        self.extra = []
+
+    def __call__(self, row):
+        q_id = row.get('q_id')
+        payload = self.local.get(q_id)
+        if payload is None:
+            self.extra.append(q_id)
+            return
+        self.seen.add(q_id)
+        remote = server_payload(row, payload.keys())
+        if content_hash(remote) == self.hashes[q_id]:
+            self.matched += 1
+        else:
+            self.differing.append((q_id, field_diff(payload, remote)))
+
+    def missing(self, expected=None):
+        ids = self.local if expected is None else expected
+        return sorted(q_id for q_id in ids if q_id not in self.seen)
+
+
+def fetch_sample(supabase, q_ids, sink):
+    """Feed the rows for `q_ids` to sink, one in_() request per SAMPLE_CHUNK ids."""
+    columns = ','.join(PAYLOAD_COLUMNS)
+    for i in range(0, len(q_ids), SAMPLE_CHUNK):
+        res = supabase.table('questions').select(columns).in_('q_id', q_ids[i:i + SAMPLE_CHUNK]).execute()
+        for row in res.data or []:
+            sink(row)
+
+
+def _short(value, width=60):
+    text = repr(value)
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def print_report(verifier, missing, checked, limit=REPORT_LIMIT):
+    print(f"\nChecked {checked} local rows:")
+    print(f"  = matching:  {verifier.matched}")
+    print(f"  ~ differing: {len(verifier.differing)}")
+    print(f"  - missing:   {len(missing)}  (in CSV, not on server)")
+    print(f"  + extra:     {len(verifier.extra)}  (on server, not in CSV)")
+
+    for q_id, diffs in sorted(verifier.differing)[:limit]:
+        print(f"    ~ {q_id}")
+        for field, ours, theirs in diffs:
+            print(f"        {field}: csv={_short(ours)} server={_short(theirs)}")
+    for q_id in missing[:limit]:
+        print(f"    - {q_id}")
+    for q_id in sorted(verifier.extra, key=str)[:limit]:
+        print(f"    + {q_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the migrated questions against the source CSVs.")
+    parser.add_argument('--mirror', action='store_true', help="Compare against the local SQLite mirror")
+    parser.add_argument('--counts', action='store_true', help="Only print per-type row counts")
+    parser.add_argument('--sample', type=int, metavar='N', help="Spot-check N random CSV rows instead of a full scan")
+    parser.add_argument('--workers', type=int, default=EXPORT_WORKERS, help="Parallel key-range scanners")
+    args = parser.parse_args()
+
+    # --mirror: read the local SQLite mirror instead of Supabase
+    if not args.mirror and not get_setting('service'):
+        print("Error: Config missing")
+        return
+
+    supabase = client_for(['--mirror'] if args.mirror else [])
+    print_counts(supabase)
+    if args.counts:
+        return
+
+    verifier = Verifier(load_local())
+    if args.sample:
+        q_ids = random.sample(sorted(verifier.local), min(args.sample, len(verifier.local)))
+        fetch_sample(supabase, q_ids, verifier)
+        missing = verifier.missing(q_ids)
+        checked = len(q_ids)
+    else:
+        try:
+            export_rows(supabase, ','.join(PAYLOAD_COLUMNS), verifier, args.workers,
+                        where=lambda q: q.in_('type', list(TYPES)))
+        except ExportIncomplete as e:
+            print(f"❌ {e}; rerun once writes to the table have stopped.")
+            sys.exit(1)
+        missing = verifier.missing()
+        checked = len(verifier.local)
+
+    print_report(verifier, missing, checked)
+    if verifier.differing or missing or verifier.extra:
+        sys.exit(1)
+    print("✅ Server matches the migration CSVs row for row.")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+-- ============================================
+-- Supabase RPC: get_board_questions + get_random_questions (v3)
+-- 가중 랜덤 추출 (Efraimidis-Spirakis) + 이미 본 질문 후순위 + 필요한 컬럼만 반환
+-- Python 기준 구현: doc/board_generator.py
+-- Supabase SQL Editor에서 실행하세요
+-- ============================================
+
+-- 보드용 질문 추출
+--   가중치 = 2 ^ (매칭된 코드 중 MP/CP/Sub 가 '*' 가 아닌 파트 수의 최댓값)
+--   정렬 키 = -ln(random()) / 가중치 (작을수록 먼저)  →  가중치 비례 비복원 추출
+--   p_exclude 의 q_id 는 제외하지 않고 맨 뒤로 (풀이 부족할 때만 사용)
+DROP FUNCTION IF EXISTS get_board_questions(text[], text, int, text[]);
+
+CREATE OR REPLACE FUNCTION get_board_questions(
+  p_codes text[],                       -- code_names 매칭 배열 ('*-*-*-*-*' 포함 가능)
+  p_type_prefix text,                   -- 'B' (밸런스) 또는 'T' (진실)
+  p_limit int DEFAULT 50,               -- 메인 25 + 예비 25
+  p_exclude text[] DEFAULT '{}'         -- 최근에 본 q_id (logs)
+)
+RETURNS TABLE (
+  id uuid,
+  q_id text,
+  type text,
+  content text,
+  content_en text,
+  details jsonb,
+  details_en jsonb,
+  gender_variants jsonb,
+  gender_variants_en jsonb
+)
+LANGUAGE sql
+VOLATILE                                -- random() 사용
+SECURITY DEFINER
+AS $$
+  SELECT q.id, q.q_id, q.type::text, q.content, q.content_en,
+         q.details, q.details_en, q.gender_variants, q.gender_variants_en
+  FROM questions q
+  CROSS JOIN LATERAL (
+    SELECT max(
+             (split_part(c, '-', 1) <> '*')::int
+           + (split_part(c, '-', 2) <> '*')::int
+           + (split_part(c, '-', 4) <> '*')::int
+           ) AS specific
+    FROM unnest(q.code_names) AS c
+    WHERE c = ANY (p_codes)
+  ) w
+  WHERE q.is_published = true
+    AND q.code_names && p_codes                  -- 관계 코드 매칭 (overlap)
+    AND q.q_id LIKE (p_type_prefix || '%')       -- 타입 필터 (B% 또는 T%)
+  ORDER BY (q.q_id = ANY (p_exclude)) ASC,       -- 안 본 질문 먼저
+           -ln(1.0 - random()) / power(2, coalesce(w.specific, 0))
+  LIMIT p_limit;
+$$;
+
+-- 기존 앱 호출용: 시그니처/반환형은 그대로, 최신순 대신 완전 랜덤
+DROP FUNCTION IF EXISTS get_random_questions(text[], text, int);
+
+CREATE OR REPLACE FUNCTION get_random_questions(
+  p_codes text[],           -- code_names 매칭 배열
+  p_type_prefix text,       -- 'B' (밸런스) 또는 'T' (진실)
+  p_limit int DEFAULT 40    -- 가져올 최대 개수
+)
+RETURNS SETOF questions
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+AS $$
+  SELECT *
+  FROM questions
+  WHERE is_published = true
+    AND code_names && p_codes                    -- 관계 코드 매칭 (overlap)
+    AND q_id LIKE (p_type_prefix || '%')         -- 타입 필터 (B% 또는 T%)
+  ORDER BY random()                              -- 세션마다 다른 40개
+  LIMIT p_limit;
+$$;
+
+-- 와일드카드 전용 함수 (범용 질문)
+DROP FUNCTION IF EXISTS get_random_wildcard_questions(text, int);
+
+CREATE OR REPLACE FUNCTION get_random_wildcard_questions(
+  p_type_prefix text,       -- 'B' 또는 'T'
+  p_limit int DEFAULT 20
+)
+RETURNS SETOF questions
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+AS $$
+  SELECT *
+  FROM questions
+  WHERE is_published = true
+    AND code_names @> ARRAY['*-*-*-*-*']::text[] -- 와일드카드 질문만
+    AND q_id LIKE (p_type_prefix || '%')
+  ORDER BY random()
+  LIMIT p_limit;
+$$;
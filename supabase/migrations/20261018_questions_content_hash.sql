@@ -0,0 +1,13 @@
+-- ============================================
+-- questions.content_hash
+-- doc/sync_questions.py 가 계산한 행 단위 해시 (q_id 제외 전체 payload)
+-- 변경된 행만 upsert 하도록 q_id + content_hash 만 조회합니다.
+-- Supabase SQL Editor에서 실행하세요
+-- ============================================
+
+ALTER TABLE questions
+  ADD COLUMN IF NOT EXISTS content_hash text;   -- NULL = 아직 sync 되지 않은 행 (다음 sync 때 갱신)
+
+-- q_id 순 keyset 스캔용 (q_id, content_hash 만 읽는 index-only scan)
+CREATE INDEX IF NOT EXISTS idx_questions_q_id_hash
+  ON questions (q_id) INCLUDE (content_hash, type);
@@ -0,0 +1,83 @@
+-- ============================================
+-- Supabase RPC: get_board (메인 + 예비 보드 한 번에)
+-- get_board_questions 는 타입 하나(B 또는 T)만 뽑으므로 진실/밸런스 섞기는 호출하는 쪽 몫이었습니다.
+-- get_board 는 두 타입을 get_board_questions 로 뽑은 뒤 doc/board_generator.py (split_board) 와
+-- 같은 규칙으로 나눕니다: 메인/예비 각각 ceil(개수 * p_truth_ratio) 칸은 진실, 나머지는 밸런스,
+-- 한쪽이 모자라면 다른 타입으로 채움. 이미 본 질문(p_exclude)은 get_board_questions 에서 이미 후순위.
+-- 선행: 20261018_board_questions_rpc.sql
+-- Supabase SQL Editor에서 실행하세요
+-- ============================================
+
+DROP FUNCTION IF EXISTS get_board(text[], int, int, text[], float8);
+
+CREATE OR REPLACE FUNCTION get_board(
+  p_codes text[],                       -- 앱의 후보 코드 ('*-*-*-*-*' 포함)
+  p_size int DEFAULT 25,                -- 메인 보드 칸 수
+  p_reserve int DEFAULT 25,             -- 예비 질문 수
+  p_exclude text[] DEFAULT '{}',        -- 최근에 본 q_id (logs)
+  p_truth_ratio float8 DEFAULT 0.52     -- 진실 비율 (GameSession.fillList 와 동일)
+)
+RETURNS TABLE (
+  slot text,                            -- 'main' 또는 'reserve'
+  slot_order int,                       -- slot 안에서의 순서 (1부터)
+  id uuid,
+  q_id text,
+  type text,
+  content text,
+  content_en text,
+  details jsonb,
+  details_en jsonb,
+  gender_variants jsonb,
+  gender_variants_en jsonb
+)
+LANGUAGE plpgsql
+VOLATILE                                -- random() 사용 (get_board_questions)
+SECURITY DEFINER
+AS $$
+DECLARE
+  truth_ids text[];
+  balance_ids text[];
+  picked text[] := '{}';
+  slots text[] := '{}';
+  t_next int := 1;
+  b_next int := 1;
+  part record;
+  t_count int;
+  k int;
+BEGIN
+  -- 타입별 추첨 순서 그대로 (가중 랜덤, 안 본 질문 먼저)
+  SELECT coalesce(array_agg(g.q_id ORDER BY g.n), '{}') INTO truth_ids
+  FROM get_board_questions(p_codes, 'T', p_size + p_reserve, p_exclude)
+       WITH ORDINALITY AS g(id, q_id, type, content, content_en, details, details_en,
+                            gender_variants, gender_variants_en, n);
+  SELECT coalesce(array_agg(g.q_id ORDER BY g.n), '{}') INTO balance_ids
+  FROM get_board_questions(p_codes, 'B', p_size + p_reserve, p_exclude)
+       WITH ORDINALITY AS g(id, q_id, type, content, content_en, details, details_en,
+                            gender_variants, gender_variants_en, n);
+
+  FOR part IN SELECT * FROM (VALUES ('main', p_size), ('reserve', p_reserve)) AS v(name, size) LOOP
+    t_count := ceil(part.size * p_truth_ratio);
+    FOR k IN 1 .. part.size LOOP
+      -- 앞 t_count 칸은 진실 우선, 나머지는 밸런스 우선; 모자라면 다른 타입
+      IF (k <= t_count AND t_next <= cardinality(truth_ids)) OR b_next > cardinality(balance_ids) THEN
+        EXIT WHEN t_next > cardinality(truth_ids);   -- 두 타입 모두 소진
+        picked := picked || truth_ids[t_next];
+        t_next := t_next + 1;
+      ELSE
+        picked := picked || balance_ids[b_next];
+        b_next := b_next + 1;
+      END IF;
+      slots := slots || part.name::text;
+    END LOOP;
+  END LOOP;
+
+  RETURN QUERY
+  SELECT p.slot_name,
+         (row_number() OVER (PARTITION BY p.slot_name ORDER BY p.n))::int,
+         q.id, q.q_id, q.type::text, q.content, q.content_en,
+         q.details, q.details_en, q.gender_variants, q.gender_variants_en
+  FROM unnest(picked, slots) WITH ORDINALITY AS p(pick_id, slot_name, n)
+  JOIN questions q ON q.q_id = p.pick_id
+  ORDER BY p.n;
+END;
+$$;
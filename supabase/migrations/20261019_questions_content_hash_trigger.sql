@@ -0,0 +1,33 @@
+-- ============================================
+-- questions.content_hash 무효화 트리거
+-- doc/ 스크립트는 모든 upsert payload 에 content_hash 를 넣지만 (question_loader),
+-- 대시보드 수정이나 다른 도구가 내용만 바꾸면 예전 해시가 남아
+-- doc/sync_questions.py 가 그 행을 "unchanged" 로 건너뜁니다.
+-- 내용 컬럼이 바뀌었는데 content_hash 가 그대로면 NULL 로 만들어 다음 sync 때 다시 쓰이게 합니다.
+-- Supabase SQL Editor에서 실행하세요
+-- ============================================
+
+CREATE OR REPLACE FUNCTION questions_invalidate_content_hash()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.content_hash IS NOT DISTINCT FROM OLD.content_hash
+     AND (NEW.type, NEW.content, NEW.content_en, NEW.details, NEW.details_en,
+          NEW.code_names, NEW.gender_variants, NEW.gender_variants_en)
+         IS DISTINCT FROM
+         (OLD.type, OLD.content, OLD.content_en, OLD.details, OLD.details_en,
+          OLD.code_names, OLD.gender_variants, OLD.gender_variants_en)
+  THEN
+    NEW.content_hash := NULL;           -- NULL = 다음 sync 때 changed 로 처리
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_questions_content_hash ON questions;
+
+CREATE TRIGGER trg_questions_content_hash
+  BEFORE UPDATE ON questions            -- upsert 의 ON CONFLICT DO UPDATE 도 포함
+  FOR EACH ROW
+  EXECUTE FUNCTION questions_invalidate_content_hash();
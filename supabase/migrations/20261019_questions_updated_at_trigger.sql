@@ -0,0 +1,30 @@
+-- ============================================
+-- questions.updated_at 자동 갱신 트리거
+-- doc/mirror.py 의 증분 sync 는 updated_at > 마지막 watermark 인 행만 가져오는데,
+-- upsert/대시보드 수정은 updated_at 을 바꾸지 않아 수정된 행이 미러에 반영되지 않았습니다.
+-- 행 내용이 실제로 바뀌었고 요청이 updated_at 을 직접 지정하지 않았으면 now() 로 갱신합니다.
+-- (내용이 같은 upsert 는 그대로 두어 get_random_questions 의 "최신 업데이트 우선" 정렬이 흔들리지 않게 합니다)
+-- Supabase SQL Editor에서 실행하세요
+-- ============================================
+
+CREATE OR REPLACE FUNCTION questions_touch_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at
+     AND NEW IS DISTINCT FROM OLD
+  THEN
+    NEW.updated_at := now();
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_questions_updated_at ON questions;
+
+-- 트리거는 이름 순으로 실행되므로 trg_questions_content_hash 다음에 실행됩니다
+CREATE TRIGGER trg_questions_updated_at
+  BEFORE UPDATE ON questions            -- upsert 의 ON CONFLICT DO UPDATE 도 포함
+  FOR EACH ROW
+  EXECUTE FUNCTION questions_touch_updated_at();
@@ -37,4 +37,10 @@ echo "Building Flutter Web..."
 # We copy to a root 'public' folder just in case.
 mkdir -p ../public
 cp -r build/web/* ../public/
+
+# Optional: serve the offline question bundle next to the app (doc/question_bundle.py)
+if [ "$BUILD_QUESTION_BUNDLE" = "1" ]; then
+  echo "Building question bundle..."
+  (cd .. && python3 doc/question_bundle.py build --out public/questions.tbqb) || echo "Question bundle skipped (build failed)"
+fi
 echo "Build complete. Output copied to public/"